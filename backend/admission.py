@@ -0,0 +1,202 @@
+"""
+Admission control for /predict.
+
+Requests are admitted before their body is read, so a spike is turned
+away while it costs almost nothing instead of after every upload has been
+buffered. A request is rejected when:
+
+  * max_pending requests are already admitted and unfinished (reading,
+    decoding, queued or running): 429, the server is full;
+  * the model's recent pace says it can't be answered before its deadline:
+    503, it would time out anyway.
+
+Both carry Retry-After. Uploads whose Content-Length is already over the
+size limit get 413 at the same point; bodies without one (chunked) get it
+as soon as the bytes received pass the limit, before the rest is buffered.
+Admitted requests get a deadline in
+scope["state"]["deadline"] (a time.perf_counter() value) that the
+micro-batcher enforces, and the pending count drives degraded mode.
+"""
+import json
+import math
+import time
+
+# -------------------------
+# CONTROLLER
+# -------------------------
+class AdmissionController:
+    def __init__(self, max_pending=64, deadline_ms=10000.0, degrade_at=0.75, estimate_wait_ms=None):
+        """
+        max_pending / deadline_ms of 0 disable that check. estimate_wait_ms(n)
+        returns how long n more images would take through the model.
+        """
+        self.max_pending = max_pending
+        self.deadline_ms = deadline_ms
+        self.degrade_pending = math.ceil(degrade_at * max_pending) if max_pending and degrade_at else 0
+        self.estimate_wait_ms = estimate_wait_ms or (lambda n: 0.0)
+
+        # Only touched from the event loop
+        self.pending = 0
+        self.admitted = 0
+        self.shed = {"queue_full": 0, "deadline": 0, "deadline_expired": 0}
+        # Client errors rather than load: oversized or non-image uploads
+        self.rejected = {"too_large": 0, "unsupported_type": 0}
+
+    def check(self, deadline_ms=None):
+        """None to admit, else (status, reason, retry_after_s)."""
+        if self.max_pending and self.pending >= self.max_pending:
+            return 429, "queue_full", self.retry_after(self.pending)
+
+        if deadline_ms:
+            wait_ms = self.estimate_wait_ms(self.pending + 1)
+            if wait_ms > deadline_ms:
+                return 503, "deadline", self.retry_after(self.pending)
+        return None
+
+    def retry_after(self, queued):
+        return max(1, math.ceil(self.estimate_wait_ms(queued) / 1000.0))
+
+    def request_deadline_ms(self, headers):
+        """The configured deadline, tightened by an X-Deadline-Ms request header."""
+        deadline_ms = self.deadline_ms
+        value = headers.get(b"x-deadline-ms")
+        if value:
+            try:
+                requested = float(value)
+            except ValueError:
+                requested = 0
+            if requested > 0:
+                deadline_ms = min(deadline_ms, requested) if deadline_ms else requested
+        return deadline_ms
+
+    def degraded(self):
+        return bool(self.degrade_pending) and self.pending >= self.degrade_pending
+
+    def stats(self):
+        return {
+            "pending": self.pending,
+            "max_pending": self.max_pending,
+            "deadline_ms": self.deadline_ms,
+            "degrade_pending": self.degrade_pending,
+            "degraded": self.degraded(),
+            "admitted": self.admitted,
+            "shed": dict(self.shed),
+            "rejected": dict(self.rejected)
+        }
+
+# -------------------------
+# ASGI MIDDLEWARE
+# -------------------------
+class AdmissionMiddleware:
+    """
+    Applies the controller to POSTs on the given paths. max_body_bytes (0 =
+    no limit) refuses bodies that declare a larger Content-Length, or that
+    turn out larger while they are being received.
+    """
+
+    def __init__(self, app, controller, paths=("/predict",), max_body_bytes=0):
+        self.app = app
+        self.controller = controller
+        self.paths = set(paths)
+        self.max_body_bytes = max_body_bytes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST" or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+
+        controller = self.controller
+        headers = dict(scope["headers"])
+        deadline_ms = controller.request_deadline_ms(headers)
+
+        length = headers.get(b"content-length", b"")
+        if self.max_body_bytes and length.isdigit() and int(length) > self.max_body_bytes:
+            controller.rejected["too_large"] += 1
+            scope["route_path"] = scope["path"]
+            await self.too_large(send)
+            return
+
+        rejected = controller.check(deadline_ms)
+        if rejected is not None:
+            status, reason, retry_after = rejected
+            controller.shed[reason] += 1
+            # Answered before routing; lets request metrics label it anyway
+            scope["route_path"] = scope["path"]
+            await reject(send, status, reason, retry_after)
+            return
+
+        state = scope.setdefault("state", {})
+        if deadline_ms:
+            state["deadline"] = time.perf_counter() + deadline_ms / 1000.0
+        if self.max_body_bytes:
+            receive, send, answered = self.cap_body(receive, send)
+        else:
+            answered = lambda: False
+
+        controller.pending += 1
+        controller.admitted += 1
+        try:
+            await self.app(scope, receive, send)
+        except Exception:
+            # The app's reaction to the body being cut off; already answered
+            if not answered():
+                raise
+        finally:
+            controller.pending -= 1
+
+    def cap_body(self, receive, send):
+        """
+        Wraps receive to count body bytes. Past max_body_bytes it answers
+        413 itself and tells the app the client disconnected, so the app
+        stops reading; anything the app sends after that is dropped.
+        """
+        received = [0]
+        cut_off = [False]
+        started = [False]
+        answered = [False]
+
+        async def capped_receive():
+            if cut_off[0]:
+                return {"type": "http.disconnect"}
+            message = await receive()
+            if message["type"] == "http.request":
+                received[0] += len(message.get("body", b""))
+                if received[0] > self.max_body_bytes:
+                    cut_off[0] = True
+                    self.controller.rejected["too_large"] += 1
+                    if not started[0]:
+                        answered[0] = True
+                        await self.too_large(send)
+                    return {"type": "http.disconnect"}
+            return message
+
+        async def guarded_send(message):
+            if answered[0]:
+                return
+            if message["type"] == "http.response.start":
+                started[0] = True
+            await send(message)
+
+        return capped_receive, guarded_send, lambda: answered[0]
+
+    async def too_large(self, send):
+        await send_json(send, 413, {"error": "upload too large", "max_bytes": self.max_body_bytes})
+
+async def reject(send, status, reason, retry_after):
+    await send_json(
+        send, status, {"error": "server overloaded", "reason": reason},
+        [(b"retry-after", str(retry_after).encode())]
+    )
+
+async def send_json(send, status, content, headers=()):
+    body = json.dumps(content).encode()
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            *headers
+        ]
+    })
+    await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,213 @@
+"""
+Lazy annotated images.
+
+/predict only records what it needs to draw later: the upload (in the
+content-addressed upload store) and a small record of its detections. The
+JPEG is rendered the first time /outputs/<id>.jpg is asked for (or ahead of
+time by an optional background worker) and kept in a size-bounded render
+cache.
+
+The record is content-addressed too, so <id> is the sha256 of
+{"source": upload digest, "detections": ...}: the same image with the same
+result maps to the same URL and is rendered once.
+
+    <records store>/ab/cd/<id>.json    source digest + detections
+    OUTPUT_DIR/rendered/ab/<id>.jpg    rendered image, evicted oldest-first
+"""
+import json
+import logging
+import os
+import queue
+import re
+import tempfile
+import threading
+from collections import OrderedDict
+
+import cv2
+
+from backend.imaging import decode_image, draw_detections
+
+logger = logging.getLogger(__name__)
+
+ID_RE = re.compile(r"^[0-9a-f]{64}$")
+JPEG_MAGIC = b"\xff\xd8\xff"
+
+# -------------------------
+# ANNOTATION STORE
+# -------------------------
+class Annotator:
+    def __init__(self, output_dir, sources, records, cache_bytes=512 * 1024 * 1024,
+                 prerender=False, queue_size=256):
+        self.output_dir = output_dir
+        self.sources = sources
+        self.records = records
+        self.rendered_dir = os.path.join(output_dir, "rendered")
+        self.cache_bytes = max(0, int(cache_bytes))
+        self.prerender = prerender
+
+        os.makedirs(self.rendered_dir, exist_ok=True)
+
+        self._lock = threading.Lock()
+        # id -> bytes on disk, oldest access first
+        self._rendered = OrderedDict()
+        self._rendered_bytes = 0
+        self._load_rendered()
+
+        self._queue = queue.Queue(maxsize=max(1, queue_size))
+        self._stop = threading.Event()
+        self._thread = None
+
+        self.registered = 0
+        self.renders = 0
+        self.cache_hits = 0
+        self.evictions = 0
+        self.prerender_dropped = 0
+
+    def _load_rendered(self):
+        entries = []
+        for dirpath, _, filenames in os.walk(self.rendered_dir):
+            for name in filenames:
+                if name.endswith(".jpg"):
+                    st = os.stat(os.path.join(dirpath, name))
+                    entries.append((st.st_mtime, name[:-4], st.st_size))
+        for _, ann_id, size in sorted(entries):
+            self._rendered[ann_id] = size
+            self._rendered_bytes += size
+
+    # ---- paths ----
+    @staticmethod
+    def parse_id(filename):
+        ann_id = filename[:-4] if filename.endswith(".jpg") else filename
+        return ann_id if ID_RE.match(ann_id) else None
+
+    def _rendered_path(self, ann_id):
+        return os.path.join(self.rendered_dir, ann_id[:2], f"{ann_id}.jpg")
+
+    def exists(self, url):
+        ann_id = self.parse_id(os.path.basename(url or ""))
+        return ann_id is not None and self.records.exists(ann_id)
+
+    # ---- write side ----
+    def register(self, contents, detections, source_digest=None):
+        """
+        Store what's needed to render later; returns the /outputs URL.
+        Pass source_digest when the upload is already in the source store.
+        """
+        if source_digest is None:
+            source_digest = self.sources.put(contents)
+        record = json.dumps({"source": source_digest, "detections": detections}, sort_keys=True)
+        ann_id = self.records.put(record.encode())
+
+        with self._lock:
+            self.registered += 1
+
+        if self.prerender:
+            try:
+                self._queue.put_nowait(ann_id)
+            except queue.Full:
+                with self._lock:
+                    self.prerender_dropped += 1
+
+        return f"/outputs/{ann_id}.jpg"
+
+    # ---- read side ----
+    def render(self, ann_id):
+        """Path of the rendered JPEG, drawing it first if needed. None if unknown."""
+        path = self._rendered_path(ann_id)
+        with self._lock:
+            if ann_id in self._rendered and os.path.exists(path):
+                self._rendered.move_to_end(ann_id)
+                self.cache_hits += 1
+                return path
+
+        try:
+            record = json.loads(self.records.get(ann_id) or b"")
+            detections, source = record["detections"], record["source"]
+        except (ValueError, KeyError):
+            return None
+
+        # Retention may have evicted the upload since
+        contents = self.sources.get(source)
+        if contents is None:
+            return None
+
+        if not detections and contents[:3] == JPEG_MAGIC:
+            # Nothing to draw: the upload itself is the annotated image
+            return self.sources.path(source)
+
+        image = draw_detections(decode_image(contents), detections)
+        ok, encoded = cv2.imencode(".jpg", image)
+        if not ok:
+            return None
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(encoded.tobytes())
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            self.renders += 1
+            self._rendered_bytes += encoded.nbytes - self._rendered.pop(ann_id, 0)
+            self._rendered[ann_id] = encoded.nbytes
+            self._evict()
+        return path
+
+    def _evict(self):
+        # Keep the image just rendered even if it alone exceeds the budget
+        while self._rendered_bytes > self.cache_bytes and len(self._rendered) > 1:
+            ann_id, size = self._rendered.popitem(last=False)
+            self._rendered_bytes -= size
+            self.evictions += 1
+            try:
+                os.remove(self._rendered_path(ann_id))
+            except FileNotFoundError:
+                pass
+
+    # ---- background pre-rendering ----
+    def _loop(self):
+        if hasattr(os, "nice"):
+            # Linux applies nice per thread, so only this worker is demoted
+            try:
+                os.nice(10)
+            except OSError:
+                pass
+        while not self._stop.is_set():
+            try:
+                ann_id = self._queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            try:
+                self.render(ann_id)
+            except Exception:
+                logger.exception("annotation pre-render failed for %s", ann_id)
+
+    def start(self):
+        if not self.prerender or self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._loop, name="civisense-annotator", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+
+    def stats(self):
+        with self._lock:
+            return {
+                "registered": self.registered,
+                "renders": self.renders,
+                "cache_hits": self.cache_hits,
+                "rendered_images": len(self._rendered),
+                "rendered_bytes": self._rendered_bytes,
+                "cache_bytes": self.cache_bytes,
+                "evictions": self.evictions,
+                "prerender": self.prerender,
+                "prerender_pending": self._queue.qsize(),
+                "prerender_dropped": self.prerender_dropped
+            }
@@ -1,37 +1,69 @@
-from fastapi import FastAPI, UploadFile, File
-from fastapi.responses import JSONResponse
-from fastapi.staticfiles import StaticFiles
+from fastapi import FastAPI, UploadFile, File, Form, Request
+from fastapi.responses import FileResponse, JSONResponse, Response, StreamingResponse
+
+from backend import db
+from backend.db import log_prediction, log_predictions, log_model_health, writer
+from backend.risk_engine import score_results
+from backend.admission import AdmissionController, AdmissionMiddleware
+from backend.batching import BatchScheduler, DeadlineExceeded
+from backend.live_stats import LiveStatsStore
+from backend.result_cache import ResultCache
+from backend.health import HealthLogger, compute_health, load_baseline
+from backend.metrics import (
+    CallbackCounter, Counter, Gauge, HistogramVec, Registry, RequestMetrics, StageMetrics
+)
+from backend.executor import inference_pool, run_cpu, run_inference, run_io, shutdown_pools
+from backend.config import (
+    DATA_DIR, UPLOAD_DIR, OUTPUT_DIR,
+    BASELINE_STATS_PATH, LIVE_STATS_PATH,
+    BATCH_MAX_SIZE, BATCH_MAX_WAIT_MS, STORE_UPLOADS,
+    LIVE_STATS_WINDOW, LIVE_STATS_SNAPSHOT_S, HEALTH_LOG_INTERVAL_S,
+    CONF_THRESHOLD, IOU_THRESHOLD, RESULT_CACHE_SIZE, RESULT_CACHE_DIR,
+    CIVISENSE_CLASSES, TILED_INFERENCE, TILE_SIZE, TILE_OVERLAP,
+    TILE_MIN_SIDE, TILE_INCLUDE_FULL, TILE_MERGE_IOU,
+    VIDEO_MAX_FPS, VIDEO_MIN_FPS, VIDEO_SCENE_DIFF, VIDEO_QUEUE_SIZE,
+    TRACK_IOU, TRACK_MAX_AGE_S, TRACK_MAX_MISSES, TRACK_MIN_HITS, VIDEO_ALLOW_SOURCE_URLS,
+    JOBS_DIR, BATCH_JOB_CHUNK, BATCH_MAX_ENTRY_BYTES,
+    ANNOTATION_CACHE_MB, ANNOTATION_PRERENDER,
+    STORAGE_MAX_AGE_DAYS, UPLOAD_MAX_GB, STORAGE_SWEEP_S,
+    IMG_SIZE, WARMUP_RUNS, PREDICT_MAX_PENDING, PREDICT_DEADLINE_MS,
+    DEGRADE_AT, DEGRADE_SKIP_ANNOTATION, DEGRADE_MODEL_VARIANT,
+    PREDICT_MAX_UPLOAD_BYTES, REDUCED_JPEG_DECODE
+)
+
+from backend.imaging import (
+    UnsupportedImage, UploadTooLarge, decode_image, decode_upload, read_upload
+)
+from backend.annotation import Annotator
+from backend.storage import BlobStore
 
-from backend.db import predictions_col, log_prediction, log_model_health
-from backend.risk_engine import compute_severity
+from backend.inference_backend import load_backend
+from backend.tiling import make_tiles, merge_tiles, needs_tiling
+from backend.video import FrameReader, IoUTracker
+from backend.jobs import JobStore, iter_uploads, take
 
-from ultralytics import YOLO
-from PIL import Image
-import io
+from datetime import datetime
+from typing import List, Optional
+import os
 import json
+import logging
+import queue
+import shutil
+import tempfile
+import time
+import asyncio
+
 import numpy as np
-import os
-import uuid
-import cv2
+
+logger = logging.getLogger(__name__)
 
 # -------------------------
 # PATH SETUP (CRITICAL FIX)
 # -------------------------
-BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-
-DATA_DIR = os.path.join(BASE_DIR, "data", "drift_images")
-UPLOAD_DIR = os.path.join(BASE_DIR, "backend", "uploads")
-OUTPUT_DIR = os.path.join(BASE_DIR, "backend", "outputs")
-MODEL_PATH = os.path.join(BASE_DIR, "models", "damage_detector.pt")
-BASELINE_STATS_PATH = os.path.join(DATA_DIR, "baseline_stats.json")
-LIVE_STATS_PATH = os.path.join(DATA_DIR, "live_stats.json")
-
 os.makedirs(DATA_DIR, exist_ok=True)
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 os.makedirs(OUTPUT_DIR, exist_ok=True)
 
-IMG_SIZE = 640
-
 # -------------------------
 # APP INIT
 # -------------------------
@@ -44,89 +76,315 @@ app = FastAPI(
 # -------------------------
 # LOAD MODEL
 # -------------------------
-model = YOLO(MODEL_PATH)
+# CIVISENSE_INFERENCE_BACKEND picks PyTorch, ONNX Runtime or OpenVINO
+engine = load_backend()
+
+# Concurrent /predict calls share batched forward passes
+batcher = BatchScheduler(
+    engine.predict,
+    max_batch_size=BATCH_MAX_SIZE,
+    max_wait_ms=BATCH_MAX_WAIT_MS,
+    executor=inference_pool
+)
 
-# MUST MATCH TRAINED CLASSES
-CIVISENSE_CLASSES = {
-    0: "Alligator",
-    1: "Edge Cracking",
-    2: "Lateral-Crack",
-    3: "Longitudinal-Crack",
-    4: "Ravelling",
-    5: "Rutting",
-    6: "Striping",
-    7: "pothole"
-}
+# Under load /predict can switch to a cheaper variant (see ADMISSION CONTROL);
+# it shares the inference thread, its batches just cost less
+degraded_engine = degraded_batcher = None
+if DEGRADE_MODEL_VARIANT:
+    degraded_engine = load_backend(variant=DEGRADE_MODEL_VARIANT)
+    degraded_batcher = BatchScheduler(
+        degraded_engine.predict,
+        max_batch_size=BATCH_MAX_SIZE,
+        max_wait_ms=BATCH_MAX_WAIT_MS,
+        executor=inference_pool
+    )
 
 # -------------------------
-# STATIC FILES
+# LIVE STATS
 # -------------------------
-app.mount("/outputs", StaticFiles(directory=OUTPUT_DIR), name="outputs")
+live_stats = LiveStatsStore(
+    LIVE_STATS_PATH,
+    window=LIVE_STATS_WINDOW,
+    snapshot_interval=LIVE_STATS_SNAPSHOT_S
+)
 
 # -------------------------
-# INIT LIVE STATS FILE
+# RESULT CACHE
 # -------------------------
-if not os.path.exists(LIVE_STATS_PATH):
-    with open(LIVE_STATS_PATH, "w") as f:
-        json.dump(
-            {
-                "total_images": 0,
-                "total_detections": 0,
-                "confidences": [],
-                "areas": []
-            },
-            f,
-            indent=4
-        )
+result_cache = ResultCache(
+    engine.model_path,
+    {"backend": engine.name, "conf": CONF_THRESHOLD, "iou": IOU_THRESHOLD},
+    max_entries=RESULT_CACHE_SIZE,
+    disk_dir=RESULT_CACHE_DIR
+)
 
 # -------------------------
-# HELPERS
+# BATCH JOBS
 # -------------------------
-def mean(arr):
-    return float(np.mean(arr)) if arr else 0.0
-
-def update_live_stats(detections):
-    with open(LIVE_STATS_PATH) as f:
-        stats = json.load(f)
+jobs = JobStore(JOBS_DIR)
 
-    stats["total_images"] += 1
-    stats["total_detections"] += len(detections)
+# -------------------------
+# MODEL HEALTH STATE
+# -------------------------
+# Baseline is fixed at runtime: summarize it once
+baseline_summary = load_baseline(BASELINE_STATS_PATH)
+if baseline_summary is None:
+    logger.warning("%s not found; /model-health is unavailable", BASELINE_STATS_PATH)
+health_logger = HealthLogger(log_model_health, interval=HEALTH_LOG_INTERVAL_S)
 
-    for det in detections:
-        stats["confidences"].append(det["confidence"])
-        x1, y1, x2, y2 = det["bbox"]
-        area = ((x2 - x1) * (y2 - y1)) / (IMG_SIZE * IMG_SIZE)
-        stats["areas"].append(area)
+# -------------------------
+# STORAGE
+# -------------------------
+# Uploads are stored once per distinct content; annotation records are tiny
+# and only need the same age limit as the uploads they point at.
+uploads = BlobStore(
+    UPLOAD_DIR,
+    max_age_s=STORAGE_MAX_AGE_DAYS * 86400,
+    max_bytes=int(UPLOAD_MAX_GB * 1024 ** 3),
+    sweep_interval=STORAGE_SWEEP_S
+)
+annotation_records = BlobStore(
+    os.path.join(OUTPUT_DIR, "records"),
+    max_age_s=STORAGE_MAX_AGE_DAYS * 86400,
+    sweep_interval=STORAGE_SWEEP_S,
+    suffix=".json"
+)
 
-    stats["confidences"] = stats["confidences"][-100:]
-    stats["areas"] = stats["areas"][-100:]
+# -------------------------
+# ANNOTATED IMAGES
+# -------------------------
+# Rendered on first view (or by the optional pre-render worker), not per request
+annotator = Annotator(
+    OUTPUT_DIR,
+    uploads,
+    annotation_records,
+    cache_bytes=ANNOTATION_CACHE_MB * 1024 * 1024,
+    prerender=ANNOTATION_PRERENDER
+)
 
-    with open(LIVE_STATS_PATH, "w") as f:
-        json.dump(stats, f, indent=4)
+# -------------------------
+# ADMISSION CONTROL
+# -------------------------
+# Sheds /predict load before uploads are read; see backend/admission.py
+admission = AdmissionController(
+    max_pending=PREDICT_MAX_PENDING,
+    deadline_ms=PREDICT_DEADLINE_MS,
+    degrade_at=DEGRADE_AT,
+    estimate_wait_ms=batcher.estimated_wait_ms
+)
+# The slack is room for the multipart framing around the file itself
+app.add_middleware(
+    AdmissionMiddleware, controller=admission, paths=("/predict",),
+    max_body_bytes=PREDICT_MAX_UPLOAD_BYTES + 64 * 1024 if PREDICT_MAX_UPLOAD_BYTES else 0
+)
 
-def draw_and_save(image_path, detections):
-    image = cv2.imread(image_path)
+# -------------------------
+# METRICS
+# -------------------------
+# Everything here is a lock and an add per event; /metrics does the rest
+STAGE_BUCKETS_MS = [1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000]
+
+registry = Registry(prefix="civisense_")
+stages = StageMetrics(STAGE_BUCKETS_MS, expected=(DeadlineExceeded, UploadTooLarge, UnsupportedImage))
+http_requests = Counter(["method", "route", "status"])
+http_latency = HistogramVec(STAGE_BUCKETS_MS, ["route"])
+http_in_flight = Gauge()
+in_flight = Gauge(["endpoint"])
+images_total = Counter(["source"])
+detections_total = Counter(["class", "risk_level"])
+degraded_total = Counter(["mode"])
+
+app.add_middleware(
+    RequestMetrics, requests=http_requests, latency=http_latency, in_flight=http_in_flight
+)
 
-    for det in detections:
-        x1, y1, x2, y2 = map(int, det["bbox"])
-        label = f'{det["class"]} {det["confidence"]:.2f}'
+def count_detections(source, images, detections):
+    images_total.inc(source, amount=images)
+    tally = {}
+    for d in detections:
+        key = (d["class"], d["risk_level"])
+        tally[key] = tally.get(key, 0) + 1
+    for (cls, level), n in tally.items():
+        detections_total.inc(cls, level, amount=n)
+
+registry.register("http_requests_total", "HTTP requests by method, route and status", http_requests)
+registry.register("http_request_duration_ms", "HTTP request latency by route", http_latency)
+registry.register("http_requests_in_flight", "HTTP requests being handled", http_in_flight)
+registry.register("in_flight", "Predict requests, video streams and batch jobs running", in_flight)
+registry.register("stage_duration_ms", "Wall time of each /predict stage", stages.durations)
+registry.register("stage_errors_total", "Failures by the /predict stage they happened in", stages.errors)
+registry.register("images_total", "Images run through the detector, by source", images_total)
+registry.register("detections_total", "Detections by class and risk level", detections_total)
+registry.register("ready", "1 once warmup has finished", Gauge(fn=lambda: readiness["ready"]))
+registry.register("predict_pending", "/predict requests admitted and unfinished",
+                  Gauge(fn=lambda: admission.pending))
+registry.register("requests_shed_total", "/predict requests turned away, by reason", CallbackCounter(
+    ["reason"], fn=lambda: {(reason,): n for reason, n in admission.shed.items()}
+))
+registry.register("uploads_rejected_total", "/predict uploads refused as too large or not an image",
+                  CallbackCounter(["reason"], fn=lambda: {
+                      (reason,): n for reason, n in admission.rejected.items()
+                  }))
+registry.register("degraded", "1 while /predict runs degraded", Gauge(fn=admission.degraded))
+registry.register("requests_degraded_total", "/predict requests served degraded, by mode", degraded_total)
+
+# Existing component stats, read at scrape time
+registry.register("inference_batch_size", "Images per forward pass", batcher.batch_size_hist)
+registry.register("inference_queue_wait_ms", "Time queued for the micro-batcher", batcher.queue_wait_hist)
+registry.register("inference_batch_duration_ms", "Forward pass wall time", batcher.inference_hist)
+registry.register("inference_queue_depth", "Images waiting for a batch", Gauge(fn=batcher.queue_depth))
+registry.register("result_cache_lookups_total", "Result cache lookups by outcome", CallbackCounter(
+    ["result"], fn=lambda: {("hit",): result_cache.hits, ("miss",): result_cache.misses}
+))
+registry.register("result_cache_entries", "Entries in the in-memory result cache",
+                  Gauge(fn=lambda: result_cache.stats()["entries"]))
+registry.register("db_writes_total", "Documents through the buffered database writer by outcome", CallbackCounter(
+    ["outcome"], fn=lambda: {
+        (k,): v for k, v in writer.stats().items() if k in ("flushed", "failed", "dropped")
+    }
+))
+registry.register("db_writer_pending", "Documents queued for the database writer",
+                  Gauge(fn=lambda: writer.stats()["pending"]))
+registry.register("annotation_renders_total", "Annotated images drawn", CallbackCounter(fn=lambda: annotator.renders))
+registry.register("annotation_cache_hits_total", "Annotated images served from the render cache",
+                  CallbackCounter(fn=lambda: annotator.cache_hits))
+registry.register("storage_bytes", "Bytes held by each blob store", Gauge(
+    ["store"], fn=lambda: {
+        ("uploads",): uploads.stats()["bytes_stored"],
+        ("annotation_records",): annotation_records.stats()["bytes_stored"],
+        ("rendered",): annotator.stats()["rendered_bytes"]
+    }
+))
 
-        cv2.rectangle(image, (x1, y1), (x2, y2), (0, 255, 0), 2)
-        cv2.putText(
-            image,
-            label,
-            (x1, max(y1 - 10, 10)),
-            cv2.FONT_HERSHEY_SIMPLEX,
-            0.6,
-            (0, 255, 0),
-            2
-        )
+# -------------------------
+# WARMUP / READINESS
+# -------------------------
+readiness = {"ready": False, "warmup_ms": None, "error": None}
+# backend/serve.py runs the one-off setup in the parent, before forking, so
+# workers don't race each other through the backfill
+setup_done = False
+
+def run_setup():
+    global setup_done
+    # Indexes, plus one-off backfill of counters/alerts for old predictions
+    db.ensure_derived_collections()
+    setup_done = True
+
+def after_fork(intra_op_threads=0):
+    """
+    Called in each worker forked by backend/serve.py, before it serves.
+    intra_op_threads (0 = as loaded) is this worker's share of the cores.
+    """
+    db.after_fork()
+    for e in (engine, degraded_engine):
+        if e is not None:
+            e.after_fork(intra_op_threads)
+
+async def warm_up():
+    """
+    Runs the first (slow) forward passes on a dummy frame, on the
+    inference thread, so no client request pays for lazy initialization.
+    """
+    started = time.perf_counter()
+    try:
+        dummy = np.full((IMG_SIZE, IMG_SIZE, 3), 114, dtype=np.uint8)
+        pairs = [(e, b) for e, b in ((engine, batcher), (degraded_engine, degraded_batcher)) if e is not None]
+        for _ in range(WARMUP_RUNS):
+            for size in sorted({1, BATCH_MAX_SIZE}):
+                for e, scheduler in pairs:
+                    pass_started = time.perf_counter()
+                    await run_inference(e.predict, [dummy] * size)
+                    # Admission control's wait estimate starts from a full batch
+                    scheduler.recent_batch_ms = (time.perf_counter() - pass_started) * 1000.0
+        readiness["warmup_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        readiness["ready"] = True
+    except Exception as e:
+        readiness["error"] = str(e)
 
-    filename = f"{uuid.uuid4().hex}.jpg"
-    save_path = os.path.join(OUTPUT_DIR, filename)
-    cv2.imwrite(save_path, image)
+# -------------------------
+# LIFECYCLE
+# -------------------------
+@app.on_event("startup")
+async def on_startup():
+    # Serve / and /ready while warming up; /ready stays 503 until done
+    app.state.warmup_task = asyncio.create_task(warm_up())
+    await batcher.start()
+    if degraded_batcher is not None:
+        await degraded_batcher.start()
+    live_stats.start()
+    annotator.start()
+    uploads.start()
+    annotation_records.start()
+    if not setup_done:
+        await run_io(run_setup)
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    await batcher.stop()
+    if degraded_batcher is not None:
+        await degraded_batcher.stop()
+    shutdown_pools()
+    live_stats.stop()
+    annotator.stop()
+    uploads.stop()
+    annotation_records.stop()
+    writer.stop()
 
-    return f"/outputs/{filename}"
+# -------------------------
+# HELPERS
+# -------------------------
+def output_exists(url):
+    if not url:
+        return False
+    # Images from before annotation was lazy sit directly in OUTPUT_DIR
+    return annotator.exists(url) or os.path.exists(os.path.join(OUTPUT_DIR, os.path.basename(url)))
+
+def to_detections_batch(results, image_shapes):
+    """Response dicts for several images, scored in one NumPy pass."""
+    out = []
+    for result, (severity, levels) in zip(results, score_results(results, image_shapes)):
+        out.append([
+            {
+                "class": CIVISENSE_CLASSES.get(cls, "unknown"),
+                "confidence": conf,
+                "severity": sev,
+                "risk_level": level,
+                "bbox": box
+            }
+            for box, conf, cls, sev, level in zip(
+                result.xyxy.tolist(),
+                np.round(result.conf.astype(np.float64), 3).tolist(),
+                result.cls.tolist(),
+                severity.tolist(),
+                levels.tolist()
+            )
+        ])
+    return out
+
+def to_detections(result, image_shape):
+    return to_detections_batch([result], [image_shape])[0]
+
+def to_full_size(result, image, image_shape):
+    """Boxes found on a reduced-resolution decode, in the upload's own pixels."""
+    height, width = image_shape[:2]
+    if (height, width) == image.shape[:2]:
+        return result
+    factor = max(height, width) / max(image.shape[:2])
+    xyxy = np.minimum(result.xyxy * factor, [width, height, width, height])
+    return result._replace(xyxy=xyxy.astype(result.xyxy.dtype))
+
+async def run_model(img, tiled, deadline=None, scheduler=None):
+    """
+    One image through the micro-batcher. Tiled large frames submit every
+    tile at once so they fill shared batches, then merge across tiles.
+    """
+    scheduler = scheduler or batcher
+    if not (tiled and needs_tiling(img, TILE_MIN_SIDE)):
+        return await scheduler.submit(img, deadline)
+
+    crops, offsets = make_tiles(img, TILE_SIZE, TILE_OVERLAP, TILE_INCLUDE_FULL)
+    results = await asyncio.gather(*(scheduler.submit(crop, deadline) for crop in crops))
+    return await run_cpu(merge_tiles, results, offsets, TILE_MERGE_IOU)
 
 # -------------------------
 # ROOT
@@ -135,143 +393,529 @@ def draw_and_save(image_path, detections):
 def root():
     return {"status": "CIVISENSE backend running"}
 
+@app.get("/ready")
+def ready():
+    # Liveness is "/"; this is for load balancers during rolling restarts
+    return JSONResponse(status_code=200 if readiness["ready"] else 503, content=readiness)
+
 # -------------------------
 # PREDICT
 # -------------------------
 @app.post("/predict")
-async def predict(image: UploadFile = File(...)):
+async def predict(
+    request: Request,
+    image: UploadFile = File(...),
+    tiled: Optional[bool] = None,
+    annotate: bool = True
+):
+    in_flight.inc("predict")
     try:
-        contents = await image.read()
-        pil_img = Image.open(io.BytesIO(contents)).convert("RGB")
-
-        upload_path = os.path.join(
-            UPLOAD_DIR, f"{uuid.uuid4().hex}_{image.filename}"
-        )
-        pil_img.save(upload_path)
-
-        results = model(pil_img)
-        detections = []
-
-        for r in results:
-            if r.boxes is None:
-                continue
-
-            for box in r.boxes:
-                cls = int(box.cls.item())
-                conf = float(box.conf.item())
-                x1, y1, x2, y2 = box.xyxy[0].tolist()
-
-                class_name = CIVISENSE_CLASSES.get(cls, "unknown")
-                severity, level = compute_severity(conf, [x1, y1, x2, y2], class_name)
-
-                detections.append({
-                    "class": class_name,
-                    "confidence": round(conf, 3),
-                    "severity": round(severity, 4),
-                    "risk_level": level,
-                    "bbox": [x1, y1, x2, y2]
+        # Set by the admission middleware
+        deadline = request.scope.get("state", {}).get("deadline")
+        tiled = TILED_INFERENCE if tiled is None else tiled
+        degraded = admission.degraded()
+        scheduler = batcher
+        model_path = None
+        # Tiles need every pixel; otherwise the model shrinks to IMG_SIZE anyway
+        decode_side = IMG_SIZE if REDUCED_JPEG_DECODE and not tiled else None
+        variant = "tiled" if tiled else ""
+        if decode_side:
+            # Boxes from a reduced decode can differ slightly from full-size ones
+            variant += "|reduced"
+        if degraded:
+            if annotate and DEGRADE_SKIP_ANNOTATION:
+                annotate = False
+                degraded_total.inc("skip_annotation")
+            if degraded_batcher is not None:
+                scheduler = degraded_batcher
+                model_path = degraded_engine.model_path
+                variant += f"|{DEGRADE_MODEL_VARIANT}"
+                degraded_total.inc("model_variant")
+
+        with stages.time("read"):
+            contents = await run_io(read_upload, image.file, PREDICT_MAX_UPLOAD_BYTES)
+
+        cache_key = None
+        if result_cache.enabled:
+            with stages.time("cache_lookup"):
+                cache_key = await run_cpu(result_cache.key, contents, variant, model_path)
+                cached = await run_io(result_cache.get, cache_key)
+            if cached is not None:
+                detections = cached["detections"]
+                annotated_image = cached.get("annotated_image")
+                if not annotate:
+                    annotated_image = None
+                elif not output_exists(annotated_image):
+                    with stages.time("annotate"):
+                        annotated_image = await run_io(annotator.register, contents, detections)
+                    cached = {**cached, "annotated_image": annotated_image}
+                    await run_io(result_cache.put, cache_key, cached)
+
+                with stages.time("live_stats"):
+                    live_stats.record(detections, cached.get("image_shape"))
+                with stages.time("db_log"):
+                    await run_io(log_prediction, image.filename, detections)
+                count_detections("predict_cached", 1, detections)
+                return {
+                    "num_detections": len(detections),
+                    "detections": detections,
+                    "annotated_image": annotated_image,
+                    "cached": True,
+                    "degraded": degraded
+                }
+
+        with stages.time("decode"):
+            img, image_shape = await run_cpu(decode_upload, contents, decode_side)
+
+        # Persist the original bytes while the model runs (annotation needs them too)
+        save_task = None
+        if STORE_UPLOADS or annotate:
+            save_task = asyncio.ensure_future(
+                stages.timed("upload_store", run_io(uploads.put, contents))
+            )
+
+        upload_digest = None
+        try:
+            with stages.time("inference"):
+                result = await run_model(img, tiled, deadline, scheduler)
+        finally:
+            if save_task is not None:
+                upload_digest = await save_task
+        with stages.time("scoring"):
+            detections = to_detections(to_full_size(result, img, image_shape), image_shape)
+
+        with stages.time("live_stats"):
+            live_stats.record(detections, image_shape)
+
+        annotated_image = None
+        if annotate:
+            _, annotated_image = await asyncio.gather(
+                stages.timed("db_log", run_io(log_prediction, image.filename, detections)),
+                stages.timed("annotate", run_io(annotator.register, contents, detections, upload_digest))
+            )
+        else:
+            with stages.time("db_log"):
+                await run_io(log_prediction, image.filename, detections)
+
+        if cache_key is not None:
+            with stages.time("cache_store"):
+                await run_io(result_cache.put, cache_key, {
+                    "detections": detections,
+                    "annotated_image": annotated_image,
+                    "image_shape": list(image_shape)
                 })
 
-        update_live_stats(detections)
-        log_prediction(image.filename, detections)
-
-        annotated_image = draw_and_save(upload_path, detections)
-
+        count_detections("predict", 1, detections)
         return {
             "num_detections": len(detections),
             "detections": detections,
-            "annotated_image": annotated_image
+            "annotated_image": annotated_image,
+            "cached": False,
+            "degraded": degraded
         }
 
+    except UploadTooLarge as e:
+        admission.rejected["too_large"] += 1
+        return JSONResponse(
+            status_code=413, content={"error": str(e), "max_bytes": PREDICT_MAX_UPLOAD_BYTES}
+        )
+    except UnsupportedImage as e:
+        admission.rejected["unsupported_type"] += 1
+        return JSONResponse(status_code=415, content={"error": str(e)})
+    except DeadlineExceeded:
+        admission.shed["deadline_expired"] += 1
+        return JSONResponse(
+            status_code=503,
+            content={"error": "server overloaded", "reason": "deadline_expired"},
+            headers={"Retry-After": str(admission.retry_after(admission.pending))}
+        )
     except Exception as e:
+        # The failing stage is counted in stage_errors_total
+        logger.exception("/predict failed")
         return JSONResponse(status_code=500, content={"error": str(e)})
+    finally:
+        in_flight.dec("predict")
 
 # -------------------------
-# MODEL HEALTH
+# VIDEO
 # -------------------------
-@app.get("/model-health")
-def model_health():
-    with open(BASELINE_STATS_PATH) as f:
-        baseline = json.load(f)
-
-    with open(LIVE_STATS_PATH) as f:
-        current = json.load(f)
+def spool_to_temp(fileobj, suffix):
+    fd, path = tempfile.mkstemp(suffix=suffix)
+    with os.fdopen(fd, "wb") as f:
+        shutil.copyfileobj(fileobj, f, 1 << 20)
+    return path
+
+def stream_event(fmt, event, data):
+    payload = json.dumps({"event": event, **data})
+    if fmt == "sse":
+        return f"event: {event}\ndata: {payload}\n\n"
+    return payload + "\n"
+
+async def next_frame(reader):
+    # Poll so a disconnected client doesn't leave an I/O thread parked
+    while True:
+        try:
+            return await run_io(reader.get, timeout=0.5)
+        except queue.Empty:
+            continue
+
+def take_ready(reader, limit):
+    """Frames already decoded, without waiting; (frames, reached_end)."""
+    frames = []
+    while len(frames) < limit:
+        try:
+            item = reader.get_nowait()
+        except queue.Empty:
+            break
+        if item is None:
+            return frames, True
+        frames.append(item)
+    return frames, False
+
+async def stream_video(reader, name, fmt):
+    """
+    Sampled frames go through the micro-batcher in groups of whatever is
+    already decoded; every frame's detections are streamed with a track id,
+    and each finished track (seen in >= TRACK_MIN_HITS samples) is logged
+    once and streamed as a "track" event.
+    """
+    tracker = IoUTracker(TRACK_IOU, TRACK_MAX_AGE_S, TRACK_MAX_MISSES)
+    logged = 0
+
+    async def close(tracks):
+        nonlocal logged
+        events = []
+        for track in tracks:
+            if track.hits < TRACK_MIN_HITS:
+                continue
+            record = track.to_dict()
+            await run_io(log_prediction, f"{name}#track{track.id}", [record])
+            logged += 1
+            events.append(stream_event(fmt, "track", record))
+        return events
 
-    conf_drift = abs(mean(current["confidences"]) - mean(baseline["confidences"]))
-    area_drift = abs(mean(current["areas"]) - mean(baseline["areas"]))
-    freq_drift = abs(
-        (current["total_detections"] / max(current["total_images"], 1)) -
-        (baseline["total_detections"] / max(baseline["total_images"], 1))
+    try:
+        in_flight.inc("video")
+        done = False
+        while not done:
+            first = await next_frame(reader)
+            if first is None:
+                break
+            frames, done = take_ready(reader, BATCH_MAX_SIZE - 1)
+            frames.insert(0, first)
+
+            results = await asyncio.gather(*(batcher.submit(frame) for _, _, frame in frames))
+
+            batch_detections = to_detections_batch(results, [frame.shape for _, _, frame in frames])
+            count_detections("video", len(frames), [d for dets in batch_detections for d in dets])
+
+            for (index, t, frame), detections in zip(frames, batch_detections):
+                live_stats.record(detections, frame.shape)
+                ended = tracker.update(index, t, detections)
+
+                yield stream_event(fmt, "frame", {
+                    "frame": index,
+                    "time_s": round(t, 3),
+                    "detections": detections
+                })
+                for event in await close(ended):
+                    yield event
+
+            # Sample densely while something is being tracked
+            reader.boost = bool(tracker.active)
+
+        for event in await close(tracker.finish()):
+            yield event
+
+        yield stream_event(fmt, "summary", {
+            **reader.stats(),
+            "tracks_logged": logged,
+            "error": reader.error
+        })
+    finally:
+        in_flight.dec("video")
+
+def close_video(reader, cleanup_path):
+    reader.stop()
+    if cleanup_path and os.path.exists(cleanup_path):
+        os.remove(cleanup_path)
+
+class VideoStreamResponse(StreamingResponse):
+    """
+    Stops the frame reader and removes the spooled upload however the
+    response ends, including a client gone before the stream generator
+    first ran (its finally never runs then).
+    """
+
+    def __init__(self, content, reader, cleanup_path=None, **kwargs):
+        super().__init__(content, **kwargs)
+        self.reader = reader
+        self.cleanup_path = cleanup_path
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            # The executor finishes the cleanup even if this await is cancelled
+            await run_io(close_video, self.reader, self.cleanup_path)
+
+@app.post("/predict/video")
+async def predict_video(
+    video: Optional[UploadFile] = File(None),
+    source: Optional[str] = Form(None),
+    format: str = "ndjson"
+):
+    if format not in ("ndjson", "sse"):
+        return JSONResponse(status_code=400, content={"error": "format must be 'ndjson' or 'sse'"})
+    if video is None and not source:
+        return JSONResponse(status_code=400, content={"error": "upload a video or give a source"})
+    if video is None and not VIDEO_ALLOW_SOURCE_URLS:
+        return JSONResponse(status_code=403, content={"error": "source URLs are disabled"})
+
+    cleanup_path = None
+    if video is not None:
+        suffix = os.path.splitext(video.filename or "")[1] or ".mp4"
+        # OpenCV needs a path, so the upload is copied out once
+        cleanup_path = await run_io(spool_to_temp, video.file, suffix)
+        source, name, live = cleanup_path, video.filename, False
+    else:
+        name, live = source, not os.path.exists(source)
+
+    reader = FrameReader(
+        source,
+        max_fps=VIDEO_MAX_FPS,
+        min_fps=VIDEO_MIN_FPS,
+        scene_diff=VIDEO_SCENE_DIFF,
+        queue_size=VIDEO_QUEUE_SIZE,
+        live=live
+    ).start()
+
+    media_type = "text/event-stream" if format == "sse" else "application/x-ndjson"
+    return VideoStreamResponse(
+        stream_video(reader, name, format), reader, cleanup_path, media_type=media_type
     )
-    freq_drift = min(freq_drift, 1.0)
 
-    drift_score = round((conf_drift + area_drift + freq_drift) / 3, 4)
+# -------------------------
+# BATCH
+# -------------------------
+def safe_decode(contents):
+    try:
+        return decode_image(contents)
+    except Exception:
+        return None
+
+async def run_batch_job(job, uploads, annotate):
+    """
+    Reads entries BATCH_JOB_CHUNK at a time, decodes them in parallel,
+    submits the whole chunk to the micro-batcher at once so it fills full
+    forward passes, and writes the chunk's predictions in one go. Every
+    finished entry is appended to the job and streamed as an NDJSON line.
+    """
+    done = await run_io(job.done_names)
+    entries = iter_uploads(uploads, BATCH_MAX_ENTRY_BYTES)
+    yield json.dumps({"event": "job", "job_id": job.id, "skipping": len(done)}) + "\n"
 
-    status = (
-        "STABLE" if drift_score < 0.05
-        else "WARNING" if drift_score < 0.15
-        else "RETRAIN_SUGGESTED"
+    try:
+        in_flight.inc("batch")
+        while True:
+            chunk = await run_io(take, entries, BATCH_JOB_CHUNK)
+            if not chunk:
+                break
+            chunk = [(name, data) for name, data in chunk if name not in done]
+
+            images = await asyncio.gather(*(
+                run_cpu(safe_decode, data) if data is not None else asyncio.sleep(0)
+                for _, data in chunk
+            ))
+            readable = [(i, img) for i, img in enumerate(images) if img is not None]
+            results = await asyncio.gather(*(batcher.submit(img) for _, img in readable))
+
+            lines = [{
+                "name": name,
+                "error": "entry too large" if data is None else "unreadable image"
+            } for name, data in chunk]
+            records = []
+
+            batch_detections = to_detections_batch(results, [img.shape for _, img in readable])
+            count_detections("batch", len(readable), [d for dets in batch_detections for d in dets])
+
+            for (i, img), detections in zip(readable, batch_detections):
+                name = chunk[i][0]
+                live_stats.record(detections, img.shape)
+                records.append((name, detections))
+                lines[i] = {
+                    "name": name,
+                    "num_detections": len(detections),
+                    "detections": detections
+                }
+
+            if annotate and readable:
+                urls = await asyncio.gather(*(
+                    run_io(annotator.register, chunk[i][1], lines[i]["detections"])
+                    for i, _ in readable
+                ))
+                for (i, _), url in zip(readable, urls):
+                    lines[i]["annotated_image"] = url
+
+            await asyncio.gather(
+                run_io(log_predictions, records),
+                run_io(job.append, lines)
+            )
+            for line in lines:
+                yield json.dumps({"event": "result", **line}) + "\n"
+
+        job.set_status("completed")
+        yield json.dumps({"event": "summary", **job.to_dict()}) + "\n"
+    finally:
+        in_flight.dec("batch")
+
+class BatchJobResponse(StreamingResponse):
+    """
+    Releases the job however the response ends, including a client gone
+    before the stream generator first ran. A job still running then was
+    cut off and is left resumable with the same upload.
+    """
+
+    def __init__(self, content, job, **kwargs):
+        super().__init__(content, **kwargs)
+        self.job = job
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            await run_io(jobs.finish, self.job)
+
+@app.post("/predict/batch")
+async def predict_batch(
+    files: List[UploadFile] = File(...),
+    job_id: Optional[str] = None,
+    annotate: bool = False
+):
+    if job_id:
+        job = jobs.get(job_id)
+        if job is None:
+            return JSONResponse(status_code=404, content={"error": "unknown job"})
+    else:
+        job = jobs.create()
+
+    if not await run_io(jobs.start, job):
+        return JSONResponse(status_code=409, content={"error": "job is already running"})
+
+    uploads = [(f.filename, f.file) for f in files]
+    return BatchJobResponse(
+        run_batch_job(job, uploads, annotate),
+        job,
+        media_type="application/x-ndjson",
+        headers={"X-Job-Id": job.id}
     )
 
-    health_data = {
-        "drift_score": drift_score,
-        "confidence_drift": round(conf_drift, 4),
-        "area_drift": round(area_drift, 4),
-        "frequency_drift": round(freq_drift, 4),
-        "status": status
-    }
+@app.get("/predict/batch/{job_id}")
+def batch_job_status(job_id: str):
+    job = jobs.get(job_id)
+    if job is None:
+        return JSONResponse(status_code=404, content={"error": "unknown job"})
+    return job.to_dict()
 
-    log_model_health(health_data)
-    return health_data
+@app.get("/predict/batch/{job_id}/results")
+def batch_job_results(job_id: str, offset: int = 0):
+    job = jobs.get(job_id)
+    if job is None:
+        return JSONResponse(status_code=404, content={"error": "unknown job"})
+    return StreamingResponse(job.read_results(max(0, offset)), media_type="application/x-ndjson")
 
 # -------------------------
-# ANALYTICS
+# OUTPUTS
 # -------------------------
-@app.get("/analytics/summary")
-def analytics_summary():
-    total_images = predictions_col.count_documents({})
+@app.get("/outputs/{filename}")
+async def output_image(filename: str):
+    ann_id = Annotator.parse_id(filename)
+    if ann_id is not None:
+        path = await run_cpu(annotator.render, ann_id)
+        if path is not None:
+            return FileResponse(path, media_type="image/jpeg")
+
+    legacy = os.path.join(OUTPUT_DIR, os.path.basename(filename))
+    if os.path.isfile(legacy):
+        return FileResponse(legacy)
+    return JSONResponse(status_code=404, content={"error": "not found"})
 
-    pipeline = [
-        {"$unwind": "$detections"},
-        {"$group": {"_id": "$detections.class", "count": {"$sum": 1}}},
-        {"$sort": {"count": -1}}
-    ]
+# -------------------------
+# RUNTIME STATS
+# -------------------------
+@app.get("/inference/stats")
+def inference_stats():
+    return batcher.stats()
 
-    damage_stats = list(predictions_col.aggregate(pipeline))
+@app.get("/admission/stats")
+def admission_stats():
+    return admission.stats()
 
-    high_risk_pipeline = [
-        {"$unwind": "$detections"},
-        {"$match": {"detections.risk_level": "HIGH"}},
-        {"$count": "count"}
-    ]
+@app.get("/cache/stats")
+def cache_stats():
+    return result_cache.stats()
 
-    high_risk_result = list(predictions_col.aggregate(high_risk_pipeline))
-    high_risk = high_risk_result[0]["count"] if high_risk_result else 0
+@app.get("/annotations/stats")
+def annotation_stats():
+    return annotator.stats()
 
+@app.get("/storage/stats")
+def storage_stats():
     return {
-        "total_images_processed": total_images,
-        "damage_distribution": damage_stats,
-        "high_risk_detections": high_risk
+        "uploads": uploads.stats(),
+        "annotation_records": annotation_records.stats(),
+        "rendered": annotator.stats()
     }
 
-@app.get("/alerts/high-risk")
-def high_risk_alerts(limit: int = 5):
-    pipeline = [
-        {"$unwind": "$detections"},
-        {"$match": {"detections.risk_level": "HIGH"}},
-        {"$sort": {"timestamp": -1}},
-        {"$limit": limit},
-        {
-            "$project": {
-                "_id": 0,
-                "image_name": 1,
-                "class": "$detections.class",
-                "confidence": "$detections.confidence",
-                "severity": "$detections.severity",
-                "timestamp": 1
-            }
-        }
-    ]
+@app.get("/metrics")
+def metrics():
+    """Prometheus text format; per worker process when run with backend.serve."""
+    return Response(registry.render(), media_type=registry.content_type)
+
+@app.get("/db/stats")
+def db_stats():
+    return {"backend": db.store.name, **writer.stats()}
 
-    alerts = list(predictions_col.aggregate(pipeline))
-    return {"alerts": alerts}
+# -------------------------
+# MODEL HEALTH
+# -------------------------
+@app.get("/model-health")
+def model_health():
+    health_data = compute_health(baseline_summary, live_stats)
+    if health_data is None:
+        return JSONResponse(status_code=503, content={"error": "no baseline stats to compare against"})
+    health_logger.maybe_log(health_data)
+    return health_data
+
+# -------------------------
+# ANALYTICS
+# -------------------------
+@app.get("/analytics/summary")
+def analytics_summary():
+    return db.analytics_summary()
+
+@app.get("/analytics/timeseries")
+def analytics_timeseries(
+    granularity: str = "day",
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None
+):
+    if granularity not in ("day", "hour"):
+        return JSONResponse(
+            status_code=400,
+            content={"error": "granularity must be 'day' or 'hour'"}
+        )
+    return {"buckets": db.analytics_timeseries(granularity, start, end)}
+
+@app.get("/alerts/high-risk")
+def high_risk_alerts(
+    limit: int = 5,
+    after: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None
+):
+    limit = max(1, min(limit, 100))
+    try:
+        return db.high_risk_alerts(limit, after, start, end)
+    except ValueError:
+        return JSONResponse(status_code=400, content={"error": "invalid cursor"})
@@ -0,0 +1,174 @@
+import asyncio
+import time
+
+from backend.metrics import Histogram
+
+# -------------------------
+# METRICS
+# -------------------------
+BATCH_SIZE_BUCKETS = [1, 2, 4, 8, 16, 32, 64]
+QUEUE_WAIT_BUCKETS_MS = [1, 2, 5, 10, 20, 50, 100, 250, 500, 1000, 2500]
+INFERENCE_BUCKETS_MS = [10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000]
+
+class DeadlineExceeded(Exception):
+    """The request's deadline passed while it was still queued."""
+
+# -------------------------
+# MICRO-BATCHING SCHEDULER
+# -------------------------
+class BatchScheduler:
+    """
+    Collects images submitted by concurrent requests into batches and runs
+    one forward pass per batch in an executor, off the event loop.
+
+    predict_fn receives a list of images and must return one result per
+    image, in the same order.
+    """
+
+    def __init__(self, predict_fn, max_batch_size=8, max_wait_ms=10.0, executor=None):
+        self.predict_fn = predict_fn
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+        self.executor = executor
+
+        self.batch_size_hist = Histogram(BATCH_SIZE_BUCKETS)
+        self.queue_wait_hist = Histogram(QUEUE_WAIT_BUCKETS_MS)
+        self.inference_hist = Histogram(INFERENCE_BUCKETS_MS)
+        # Recent forward pass time, for admission control's wait estimate
+        self.recent_batch_ms = None
+        self.expired = 0
+
+        self._queue = None
+        self._worker = None
+
+    async def start(self):
+        if self._worker is not None:
+            return
+        self._queue = asyncio.Queue()
+        self._worker = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._worker is None:
+            return
+        self._worker.cancel()
+        try:
+            await self._worker
+        except asyncio.CancelledError:
+            pass
+        self._worker = None
+
+        while not self._queue.empty():
+            _, future, _, _ = self._queue.get_nowait()
+            if not future.done():
+                future.set_exception(RuntimeError("Inference scheduler stopped"))
+
+    async def submit(self, image, deadline=None):
+        """
+        deadline is a time.perf_counter() value; if it passes before the
+        image makes it into a batch, DeadlineExceeded is raised instead.
+        """
+        if self._worker is None:
+            raise RuntimeError("Inference scheduler not started")
+
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((image, future, time.perf_counter(), deadline))
+        return await future
+
+    def estimated_wait_ms(self, queued):
+        """Rough time until `queued` more images have been through the model."""
+        if self.recent_batch_ms is None:
+            return 0.0
+        batches = -(-max(0, queued) // self.max_batch_size)
+        return batches * self.recent_batch_ms
+
+    async def _collect(self):
+        batch = [await self._queue.get()]
+        deadline = time.perf_counter() + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            # Whatever is already queued joins without waiting
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+
+            timeout = deadline - time.perf_counter()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+
+        return batch
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+
+        while True:
+            batch = await self._collect()
+
+            # Requests that gave up, or can no longer be answered in time,
+            # don't need a forward pass
+            started = time.perf_counter()
+            live = []
+            for item in batch:
+                future, deadline = item[1], item[3]
+                if future.done():
+                    continue
+                if deadline is not None and started > deadline:
+                    self.expired += 1
+                    future.set_exception(DeadlineExceeded())
+                    continue
+                live.append(item)
+            batch = live
+            if not batch:
+                continue
+
+            self.batch_size_hist.observe(len(batch))
+            for _, _, enqueued_at, _ in batch:
+                self.queue_wait_hist.observe((started - enqueued_at) * 1000.0)
+
+            images = [image for image, _, _, _ in batch]
+            try:
+                results = await loop.run_in_executor(
+                    self.executor, self.predict_fn, images
+                )
+            except Exception as e:
+                for _, future, _, _ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            finally:
+                elapsed_ms = (time.perf_counter() - started) * 1000.0
+                self.inference_hist.observe(elapsed_ms)
+                if self.recent_batch_ms is None:
+                    self.recent_batch_ms = elapsed_ms
+                else:
+                    self.recent_batch_ms += 0.2 * (elapsed_ms - self.recent_batch_ms)
+
+            results = list(results)
+            if len(results) != len(batch):
+                # Can't tell which result belongs to which image
+                error = RuntimeError(f"predict_fn returned {len(results)} results for {len(batch)} images")
+                for _, future, _, _ in batch:
+                    if not future.done():
+                        future.set_exception(error)
+                continue
+
+            for (_, future, _, _), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+
+    def queue_depth(self):
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def stats(self):
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000.0,
+            "queue_depth": self.queue_depth(),
+            "deadline_expired": self.expired,
+            "batch_size": self.batch_size_hist.snapshot(),
+            "queue_wait_ms": self.queue_wait_hist.snapshot(),
+            "inference_ms": self.inference_hist.snapshot()
+        }
@@ -0,0 +1,242 @@
+import os
+
+# -------------------------
+# ENV HELPERS
+# -------------------------
+def env_int(name, default):
+    value = os.getenv(name)
+    return int(value) if value not in (None, "") else default
+
+def env_float(name, default):
+    value = os.getenv(name)
+    return float(value) if value not in (None, "") else default
+
+# -------------------------
+# PATHS
+# -------------------------
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DATA_DIR = os.path.join(BASE_DIR, "data", "drift_images")
+UPLOAD_DIR = os.path.join(BASE_DIR, "backend", "uploads")
+OUTPUT_DIR = os.path.join(BASE_DIR, "backend", "outputs")
+MODEL_PATH = os.getenv(
+    "CIVISENSE_MODEL_PATH",
+    os.path.join(BASE_DIR, "models", "damage_detector.pt")
+)
+BASELINE_STATS_PATH = os.path.join(DATA_DIR, "baseline_stats.json")
+LIVE_STATS_PATH = os.path.join(DATA_DIR, "live_stats.json")
+
+IMG_SIZE = 640
+
+# MUST MATCH TRAINED CLASSES
+CIVISENSE_CLASSES = {
+    0: "Alligator",
+    1: "Edge Cracking",
+    2: "Lateral-Crack",
+    3: "Longitudinal-Crack",
+    4: "Ravelling",
+    5: "Rutting",
+    6: "Striping",
+    7: "pothole"
+}
+
+# -------------------------
+# INFERENCE BATCHING
+# -------------------------
+# Requests arriving within BATCH_MAX_WAIT_MS of each other share one
+# forward pass, up to BATCH_MAX_SIZE images.
+BATCH_MAX_SIZE = env_int("CIVISENSE_BATCH_MAX_SIZE", 8)
+BATCH_MAX_WAIT_MS = env_float("CIVISENSE_BATCH_MAX_WAIT_MS", 10.0)
+
+# -------------------------
+# EXECUTION POOLS
+# -------------------------
+# CPU-bound stages (decode, annotation) and blocking I/O (disk, Mongo) run in
+# separate bounded thread pools so the event loop only schedules work.
+CPU_WORKERS = env_int("CIVISENSE_CPU_WORKERS", min(4, os.cpu_count() or 1))
+IO_WORKERS = env_int("CIVISENSE_IO_WORKERS", 8)
+
+# -------------------------
+# STORAGE
+# -------------------------
+# Keep the raw upload bytes under UPLOAD_DIR (set to 0 to skip; uploads
+# that get an annotated image are kept regardless, it's drawn from them)
+STORE_UPLOADS = env_int("CIVISENSE_STORE_UPLOADS", 1) == 1
+# Uploads and annotation records older than STORAGE_MAX_AGE_DAYS are
+# removed, and the oldest uploads go once they exceed UPLOAD_MAX_GB across
+# all workers (0 = no limit). The sweep runs every STORAGE_SWEEP_S seconds.
+STORAGE_MAX_AGE_DAYS = env_float("CIVISENSE_STORAGE_MAX_AGE_DAYS", 30.0)
+UPLOAD_MAX_GB = env_float("CIVISENSE_UPLOAD_MAX_GB", 10.0)
+STORAGE_SWEEP_S = env_float("CIVISENSE_STORAGE_SWEEP_S", 300.0)
+
+# -------------------------
+# UPLOADS
+# -------------------------
+# /predict reads uploads in chunks and answers 413 past PREDICT_MAX_UPLOAD_MB
+# (up front when Content-Length already says so) and 415 for anything that
+# isn't an image, before the rest of it is read. 0 = no size limit.
+PREDICT_MAX_UPLOAD_MB = env_float("CIVISENSE_PREDICT_MAX_UPLOAD_MB", 50.0)
+PREDICT_MAX_UPLOAD_BYTES = int(PREDICT_MAX_UPLOAD_MB * 1024 * 1024)
+# Decode large JPEGs at 1/2, 1/4 or 1/8 resolution, still at least IMG_SIZE
+# on the longer side; boxes are reported in full-size pixels either way.
+# Not used for tiled requests, which need every pixel.
+REDUCED_JPEG_DECODE = env_int("CIVISENSE_REDUCED_JPEG_DECODE", 1) == 1
+
+# -------------------------
+# LIVE STATS
+# -------------------------
+# Drift is measured over the last LIVE_STATS_WINDOW detections; the in-memory
+# state is flushed to LIVE_STATS_PATH every LIVE_STATS_SNAPSHOT_S seconds.
+LIVE_STATS_WINDOW = env_int("CIVISENSE_LIVE_STATS_WINDOW", 100)
+LIVE_STATS_SNAPSHOT_S = env_float("CIVISENSE_LIVE_STATS_SNAPSHOT_S", 5.0)
+
+# -------------------------
+# MODEL HEALTH
+# -------------------------
+# Minimum seconds between model_health log writes (status changes always log)
+HEALTH_LOG_INTERVAL_S = env_float("CIVISENSE_HEALTH_LOG_INTERVAL_S", 60.0)
+
+# -------------------------
+# DATABASE
+# -------------------------
+# mongo: MongoDB at MONGO_URI (connects on first use). sqlite: an embedded
+# database file at SQLITE_PATH, for edge nodes and offline runs.
+DB_BACKEND = os.getenv("CIVISENSE_DB_BACKEND", "mongo")
+SQLITE_PATH = os.getenv("CIVISENSE_SQLITE_PATH", os.path.join(BASE_DIR, "data", "civisense.db"))
+
+# -------------------------
+# MONGODB
+# -------------------------
+# Credentials belong in the environment, never in this file
+MONGO_URI = os.getenv("MONGO_URI", "mongodb://localhost:27017")
+MONGO_DB = os.getenv("MONGO_DB", "civisense")
+MONGO_MAX_POOL_SIZE = env_int("MONGO_MAX_POOL_SIZE", 20)
+MONGO_MIN_POOL_SIZE = env_int("MONGO_MIN_POOL_SIZE", 0)
+MONGO_MAX_IDLE_TIME_MS = env_int("MONGO_MAX_IDLE_TIME_MS", 60000)
+MONGO_CONNECT_TIMEOUT_MS = env_int("MONGO_CONNECT_TIMEOUT_MS", 10000)
+MONGO_SERVER_SELECTION_TIMEOUT_MS = env_int("MONGO_SERVER_SELECTION_TIMEOUT_MS", 10000)
+MONGO_WAIT_QUEUE_TIMEOUT_MS = env_int("MONGO_WAIT_QUEUE_TIMEOUT_MS", 5000)
+
+# Predictions and health logs are queued and written in batches (insert_many
+# on Mongo, one transaction per batch on SQLite)
+DB_WRITER_BATCH_SIZE = env_int("CIVISENSE_DB_WRITER_BATCH_SIZE", 100)
+DB_WRITER_FLUSH_S = env_float("CIVISENSE_DB_WRITER_FLUSH_S", 1.0)
+DB_WRITER_MAX_QUEUE = env_int("CIVISENSE_DB_WRITER_MAX_QUEUE", 10000)
+# block | drop_newest | drop_oldest
+DB_WRITER_POLICY = os.getenv("CIVISENSE_DB_WRITER_POLICY", "block")
+DB_WRITER_BLOCK_TIMEOUT_S = env_float("CIVISENSE_DB_WRITER_BLOCK_TIMEOUT_S", 1.0)
+
+# -------------------------
+# DETECTION THRESHOLDS
+# -------------------------
+CONF_THRESHOLD = env_float("CIVISENSE_CONF_THRESHOLD", 0.25)
+IOU_THRESHOLD = env_float("CIVISENSE_IOU_THRESHOLD", 0.7)
+
+# -------------------------
+# RESULT CACHE
+# -------------------------
+# Repeated uploads (same bytes, same model, same thresholds) skip inference.
+# Set the size to 0 to disable the memory tier; the disk tier is off unless
+# a directory is given.
+RESULT_CACHE_SIZE = env_int("CIVISENSE_RESULT_CACHE_SIZE", 1024)
+RESULT_CACHE_DIR = os.getenv("CIVISENSE_RESULT_CACHE_DIR", "")
+
+# -------------------------
+# INFERENCE BACKEND
+# -------------------------
+# torch | onnx | openvino. Exported artifacts sit next to the .pt weights
+# and are created on first use if missing.
+INFERENCE_BACKEND = os.getenv("CIVISENSE_INFERENCE_BACKEND", "torch")
+ONNX_MODEL_PATH = os.getenv(
+    "CIVISENSE_ONNX_MODEL_PATH", os.path.splitext(MODEL_PATH)[0] + ".onnx"
+)
+OPENVINO_MODEL_DIR = os.getenv(
+    "CIVISENSE_OPENVINO_MODEL_DIR", os.path.splitext(MODEL_PATH)[0] + "_openvino_model"
+)
+# 0 leaves the runtime's own default
+INTRA_OP_THREADS = env_int("CIVISENSE_INTRA_OP_THREADS", 0)
+INTER_OP_THREADS = env_int("CIVISENSE_INTER_OP_THREADS", 0)
+
+# fp32 | int8. int8 serves the statically quantized ONNX model built by
+# backend/quantize.py, always through ONNX Runtime.
+MODEL_VARIANT = os.getenv("CIVISENSE_MODEL_VARIANT", "fp32")
+INT8_MODEL_PATH = os.getenv(
+    "CIVISENSE_INT8_MODEL_PATH", os.path.splitext(MODEL_PATH)[0] + ".int8.onnx"
+)
+
+# -------------------------
+# SLICED INFERENCE
+# -------------------------
+# Off by default (also selectable per request with /predict?tiled=true).
+# Frames whose longer side is at least TILE_MIN_SIDE are cut into
+# TILE_SIZE crops overlapping by TILE_OVERLAP; TILE_INCLUDE_FULL also runs
+# the whole frame so large potholes aren't only seen in pieces.
+TILED_INFERENCE = env_int("CIVISENSE_TILED_INFERENCE", 0) == 1
+TILE_SIZE = env_int("CIVISENSE_TILE_SIZE", IMG_SIZE)
+TILE_OVERLAP = env_float("CIVISENSE_TILE_OVERLAP", 0.2)
+TILE_MIN_SIDE = env_int("CIVISENSE_TILE_MIN_SIDE", 2 * IMG_SIZE)
+TILE_INCLUDE_FULL = env_int("CIVISENSE_TILE_INCLUDE_FULL", 1) == 1
+TILE_MERGE_IOU = env_float("CIVISENSE_TILE_MERGE_IOU", 0.5)
+
+# -------------------------
+# VIDEO INGESTION
+# -------------------------
+# Frames are sampled at most VIDEO_MAX_FPS, at least VIDEO_MIN_FPS, and in
+# between only when the scene changes by VIDEO_SCENE_DIFF (0-255 grey levels).
+VIDEO_MAX_FPS = env_float("CIVISENSE_VIDEO_MAX_FPS", 5.0)
+VIDEO_MIN_FPS = env_float("CIVISENSE_VIDEO_MIN_FPS", 0.5)
+VIDEO_SCENE_DIFF = env_float("CIVISENSE_VIDEO_SCENE_DIFF", 8.0)
+VIDEO_QUEUE_SIZE = env_int("CIVISENSE_VIDEO_QUEUE_SIZE", 32)
+# Detections in consecutive samples with IoU >= TRACK_IOU are one object;
+# a track closes once unseen for TRACK_MAX_AGE_S and TRACK_MAX_MISSES
+# samples, and is logged if it was seen in at least TRACK_MIN_HITS samples.
+TRACK_IOU = env_float("CIVISENSE_TRACK_IOU", 0.3)
+TRACK_MAX_AGE_S = env_float("CIVISENSE_TRACK_MAX_AGE_S", 1.0)
+TRACK_MAX_MISSES = env_int("CIVISENSE_TRACK_MAX_MISSES", 2)
+TRACK_MIN_HITS = env_int("CIVISENSE_TRACK_MIN_HITS", 2)
+# Let clients pass a stream URL / server-side path instead of uploading
+VIDEO_ALLOW_SOURCE_URLS = env_int("CIVISENSE_VIDEO_ALLOW_SOURCE_URLS", 0) == 1
+
+# -------------------------
+# BATCH JOBS
+# -------------------------
+# /predict/batch keeps job status and per-entry results under JOBS_DIR.
+# Entries are read, decoded and inferred BATCH_JOB_CHUNK at a time.
+JOBS_DIR = os.getenv("CIVISENSE_JOBS_DIR", os.path.join(BASE_DIR, "backend", "job_results"))
+BATCH_JOB_CHUNK = env_int("CIVISENSE_BATCH_JOB_CHUNK", 32)
+BATCH_MAX_ENTRY_BYTES = env_int("CIVISENSE_BATCH_MAX_ENTRY_BYTES", 50 * 1024 * 1024)
+
+# -------------------------
+# ANNOTATED IMAGES
+# -------------------------
+# /outputs/<id>.jpg is drawn on first request and cached up to
+# ANNOTATION_CACHE_MB; ANNOTATION_PRERENDER=1 also renders ahead of time on
+# a low-priority background thread.
+ANNOTATION_CACHE_MB = env_int("CIVISENSE_ANNOTATION_CACHE_MB", 512)
+ANNOTATION_PRERENDER = env_int("CIVISENSE_ANNOTATION_PRERENDER", 0) == 1
+
+# -------------------------
+# SERVING
+# -------------------------
+# Worker processes for backend/serve.py (forked after the model is loaded)
+WEB_WORKERS = env_int("CIVISENSE_WORKERS", 1)
+# Forward passes on a dummy frame, at batch size 1 and BATCH_MAX_SIZE,
+# before /ready reports the worker ready (0 skips warmup)
+WARMUP_RUNS = env_int("CIVISENSE_WARMUP_RUNS", 2)
+
+# -------------------------
+# ADMISSION CONTROL
+# -------------------------
+# /predict requests admitted at once (reading, decoding, queued or running);
+# past that new ones get 429 + Retry-After before their upload is read.
+# 0 = unbounded.
+PREDICT_MAX_PENDING = env_int("CIVISENSE_PREDICT_MAX_PENDING", 64)
+# Requests the model can't be expected to answer within this many ms get
+# 503 + Retry-After up front, and are dropped if still queued when it
+# passes. Clients can ask for less with an X-Deadline-Ms header. 0 = none.
+PREDICT_DEADLINE_MS = env_float("CIVISENSE_PREDICT_DEADLINE_MS", 10000.0)
+# Past this fraction of PREDICT_MAX_PENDING, /predict degrades: no annotated
+# image, and the DEGRADE_MODEL_VARIANT model (e.g. int8) if one is set
+DEGRADE_AT = env_float("CIVISENSE_DEGRADE_AT", 0.75)
+DEGRADE_SKIP_ANNOTATION = env_int("CIVISENSE_DEGRADE_SKIP_ANNOTATION", 1) == 1
+DEGRADE_MODEL_VARIANT = os.getenv("CIVISENSE_DEGRADE_MODEL_VARIANT", "")
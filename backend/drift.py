@@ -0,0 +1,298 @@
+import numpy as np
+
+# -------------------------
+# BINNING
+# -------------------------
+# Fixed edges so histograms from any run, worker or dataset can be merged
+# and compared bin for bin.
+CONFIDENCE_EDGES = np.linspace(0.0, 1.0, 21)
+# Most boxes cover a few percent of the frame: square the spacing so the
+# small-area end gets most of the resolution.
+AREA_EDGES = np.linspace(0.0, 1.0, 21) ** 2
+
+# What box areas are fractions of: "frame" is the image's own height x
+# width; "img_size" is IMG_SIZE^2, which stats files written before the
+# switch (and any without an "area_normalization" field) used.
+AREA_NORMALIZATION = "frame"
+LEGACY_AREA_NORMALIZATION = "img_size"
+
+PSI_EPS = 1e-4
+
+# Below this many live detections PSI/KS are too noisy to escalate status
+MIN_DRIFT_SAMPLES = 30
+
+PSI_WARNING = 0.1
+PSI_RETRAIN = 0.25
+
+SCORE_WARNING = 0.05
+SCORE_RETRAIN = 0.15
+
+STATUS_ORDER = ["STABLE", "WARNING", "RETRAIN_SUGGESTED"]
+
+# -------------------------
+# HISTOGRAM
+# -------------------------
+class Histogram:
+    """
+    Counts over fixed bin edges. Values outside the edges are clamped into
+    the first/last bin.
+    """
+
+    def __init__(self, edges, counts=None):
+        self.edges = np.asarray(edges, dtype=np.float64)
+        n_bins = len(self.edges) - 1
+        self.counts = (
+            np.zeros(n_bins, dtype=np.int64) if counts is None
+            else np.asarray(counts, dtype=np.int64).copy()
+        )
+
+    @property
+    def total(self):
+        return int(self.counts.sum())
+
+    def update(self, values):
+        values = np.asarray(values, dtype=np.float64).ravel()
+        if values.size == 0:
+            return
+        idx = np.searchsorted(self.edges, values, side="right") - 1
+        idx = np.clip(idx, 0, len(self.counts) - 1)
+        self.counts += np.bincount(idx, minlength=len(self.counts))
+
+    def merge(self, other):
+        if not np.array_equal(self.edges, other.edges):
+            raise ValueError("Cannot merge histograms with different bin edges")
+        self.counts += other.counts
+
+    def probabilities(self, eps=PSI_EPS):
+        # Additive smoothing keeps empty bins out of log(0)
+        counts = self.counts.astype(np.float64) + eps
+        return counts / counts.sum()
+
+    def cdf(self):
+        total = self.total
+        if total == 0:
+            return np.zeros(len(self.counts))
+        return np.cumsum(self.counts) / total
+
+    def to_dict(self):
+        return {"edges": self.edges.tolist(), "counts": self.counts.tolist()}
+
+    @classmethod
+    def from_dict(cls, data, default_edges):
+        if not data:
+            return cls(default_edges)
+        return cls(data.get("edges", default_edges), data.get("counts"))
+
+# -------------------------
+# DISTANCES
+# -------------------------
+def psi(expected, actual):
+    """Population Stability Index between two histograms on the same edges."""
+    if not expected.total or not actual.total:
+        return 0.0
+    p = expected.probabilities()
+    q = actual.probabilities()
+    return float(np.sum((q - p) * np.log(q / p)))
+
+def ks_statistic(a, b):
+    """Two-sample KS statistic evaluated at the shared bin edges."""
+    return float(np.max(np.abs(a.cdf() - b.cdf()))) if a.total and b.total else 0.0
+
+def class_frequency_drift(baseline, current):
+    """
+    Per-class detections-per-image for both sides, plus the total variation
+    distance between the two class mixes. None when the baseline has no
+    class breakdown.
+    """
+    if not baseline.class_counts:
+        return None
+
+    classes = sorted(set(baseline.class_counts) | set(current.class_counts))
+    base_counts = np.array([baseline.class_counts.get(c, 0) for c in classes], dtype=np.float64)
+    live_counts = np.array([current.class_counts.get(c, 0) for c in classes], dtype=np.float64)
+
+    base_rates = base_counts / max(baseline.total_images, 1)
+    live_rates = live_counts / max(current.total_images, 1)
+
+    distance = 0.0
+    if base_counts.sum() and live_counts.sum():
+        distance = 0.5 * float(np.abs(
+            base_counts / base_counts.sum() - live_counts / live_counts.sum()
+        ).sum())
+
+    return {
+        "distance": round(distance, 4),
+        "per_class": {
+            c: {
+                "baseline_rate": round(float(b), 4),
+                "live_rate": round(float(l), 4),
+                "delta": round(float(l - b), 4)
+            }
+            for c, b, l in zip(classes, base_rates, live_rates)
+        }
+    }
+
+# -------------------------
+# SUMMARY
+# -------------------------
+class DriftSummary:
+    """
+    Compact, mergeable description of a detection stream: counters,
+    confidence/area histograms, exact sums for means, and per-class counts.
+    A few hundred numbers regardless of how many images went in.
+    """
+
+    def __init__(self, area_normalization=AREA_NORMALIZATION):
+        self.area_normalization = area_normalization
+        self.total_images = 0
+        self.total_detections = 0
+        self.confidence = Histogram(CONFIDENCE_EDGES)
+        self.area = Histogram(AREA_EDGES)
+        self.confidence_sum = 0.0
+        self.area_sum = 0.0
+        self.class_counts = {}
+
+    def update(self, confidences, areas, classes=None, images=1):
+        confidences = np.asarray(confidences, dtype=np.float64).ravel()
+        areas = np.asarray(areas, dtype=np.float64).ravel()
+
+        self.total_images += images
+        self.total_detections += int(confidences.size)
+        self.confidence.update(confidences)
+        self.area.update(areas)
+        self.confidence_sum += float(confidences.sum())
+        self.area_sum += float(areas.sum())
+
+        for name in classes or ():
+            self.class_counts[name] = self.class_counts.get(name, 0) + 1
+
+    def merge(self, other):
+        if other.area_normalization != self.area_normalization:
+            raise ValueError("Cannot merge summaries with different area normalizations")
+        self.total_images += other.total_images
+        self.total_detections += other.total_detections
+        self.confidence.merge(other.confidence)
+        self.area.merge(other.area)
+        self.confidence_sum += other.confidence_sum
+        self.area_sum += other.area_sum
+        for name, count in other.class_counts.items():
+            self.class_counts[name] = self.class_counts.get(name, 0) + count
+
+    def copy(self):
+        summary = DriftSummary(self.area_normalization)
+        summary.merge(self)
+        return summary
+
+    # Means divide by the histogram totals: legacy files keep only a tail of
+    # the raw values, so those can be fewer than total_detections.
+    @property
+    def confidence_mean(self):
+        samples = self.confidence.total
+        return self.confidence_sum / samples if samples else 0.0
+
+    @property
+    def area_mean(self):
+        samples = self.area.total
+        return self.area_sum / samples if samples else 0.0
+
+    @property
+    def detections_per_image(self):
+        return self.total_detections / max(self.total_images, 1)
+
+    def to_dict(self):
+        return {
+            "total_images": self.total_images,
+            "total_detections": self.total_detections,
+            "area_normalization": self.area_normalization,
+            "confidence_hist": self.confidence.to_dict(),
+            "area_hist": self.area.to_dict(),
+            "confidence_sum": self.confidence_sum,
+            "area_sum": self.area_sum,
+            "class_counts": dict(self.class_counts)
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """
+        Reads the compact format, or the legacy one with raw
+        "confidences"/"areas" lists (baseline_stats.json, kaggle_stats.json).
+        """
+        data = data or {}
+        summary = cls(data.get("area_normalization", LEGACY_AREA_NORMALIZATION))
+
+        if "confidence_hist" not in data:
+            summary.update(
+                data.get("confidences", []),
+                data.get("areas", []),
+                images=0
+            )
+            summary.total_images = int(data.get("total_images", 0))
+            summary.total_detections = int(data.get("total_detections", summary.total_detections))
+            summary.class_counts = dict(data.get("class_counts", {}))
+            return summary
+
+        summary.total_images = int(data.get("total_images", 0))
+        summary.total_detections = int(data.get("total_detections", 0))
+        summary.confidence = Histogram.from_dict(data.get("confidence_hist"), CONFIDENCE_EDGES)
+        summary.area = Histogram.from_dict(data.get("area_hist"), AREA_EDGES)
+        summary.confidence_sum = float(data.get("confidence_sum", 0.0))
+        summary.area_sum = float(data.get("area_sum", 0.0))
+        summary.class_counts = dict(data.get("class_counts", {}))
+        return summary
+
+# -------------------------
+# COMPARISON
+# -------------------------
+def status_for(score, warning, retrain):
+    if score < warning:
+        return "STABLE"
+    if score < retrain:
+        return "WARNING"
+    return "RETRAIN_SUGGESTED"
+
+def compare(baseline, current, confidence_mean=None, area_mean=None):
+    """
+    Drift report between two DriftSummary objects. confidence_mean /
+    area_mean override the current side's means (e.g. a recent window).
+    Areas normalized differently aren't compared: the area metrics are
+    None and the score and status come from confidence and frequency.
+    """
+    current_conf = current.confidence_mean if confidence_mean is None else confidence_mean
+    current_area = current.area_mean if area_mean is None else area_mean
+    areas_comparable = baseline.area_normalization == current.area_normalization
+
+    conf_drift = abs(current_conf - baseline.confidence_mean)
+    freq_drift = min(abs(current.detections_per_image - baseline.detections_per_image), 1.0)
+    confidence_psi = psi(baseline.confidence, current.confidence)
+
+    if areas_comparable:
+        area_drift = abs(current_area - baseline.area_mean)
+        area_psi = psi(baseline.area, current.area)
+        area_ks = round(ks_statistic(baseline.area, current.area), 4)
+        drift_score = round((conf_drift + area_drift + freq_drift) / 3, 4)
+    else:
+        area_drift = area_psi = area_ks = None
+        drift_score = round((conf_drift + freq_drift) / 2, 4)
+
+    status = status_for(drift_score, SCORE_WARNING, SCORE_RETRAIN)
+    if current.confidence.total >= MIN_DRIFT_SAMPLES:
+        psi_status = status_for(max(confidence_psi, area_psi or 0.0), PSI_WARNING, PSI_RETRAIN)
+        status = max(status, psi_status, key=STATUS_ORDER.index)
+
+    return {
+        "drift_score": drift_score,
+        "confidence_drift": round(conf_drift, 4),
+        "area_drift": None if area_drift is None else round(area_drift, 4),
+        "frequency_drift": round(freq_drift, 4),
+        "confidence_psi": round(confidence_psi, 4),
+        "area_psi": None if area_psi is None else round(area_psi, 4),
+        "confidence_ks": round(ks_statistic(baseline.confidence, current.confidence), 4),
+        "area_ks": area_ks,
+        "area_normalization": {
+            "baseline": baseline.area_normalization,
+            "current": current.area_normalization
+        },
+        "class_drift": class_frequency_drift(baseline, current),
+        "live_detections": current.total_detections,
+        "status": status
+    }
@@ -1,43 +1,50 @@
+import argparse
 import json
-import numpy as np
-
-BASELINE_FILE = "../data/drift_images/baseline_stats.json"
-CURRENT_FILE = "../data/drift_images/kaggle_stats.json"
-
-with open(BASELINE_FILE) as f:
-    baseline = json.load(f)
-
-with open(CURRENT_FILE) as f:
-    current = json.load(f)
-
-def mean(arr):
-    return np.mean(arr) if len(arr) > 0 else 0
-
-baseline_conf = mean(baseline["confidences"])
-current_conf = mean(current["confidences"])
-
-baseline_area = mean(baseline["areas"])
-current_area = mean(current["areas"])
-
-baseline_freq = baseline["total_detections"] / max(baseline["total_images"], 1)
-current_freq = current["total_detections"] / max(current["total_images"], 1)
-
-conf_drift = abs(current_conf - baseline_conf)
-area_drift = abs(current_area - baseline_area)
-freq_drift = abs(current_freq - baseline_freq)
-
-drift_score = round((conf_drift + area_drift + freq_drift) / 3, 4)
-
-if drift_score < 0.05:
-    status = " STABLE"
-elif drift_score < 0.15:
-    status = " WARNING"
-else:
-    status = " RETRAIN SUGGESTED"
-
-print(" DRIFT REPORT")
-print(f"Confidence drift: {conf_drift:.4f}")
-print(f"Area drift: {area_drift:.4f}")
-print(f"Frequency drift: {freq_drift:.4f}")
-print(f"\nOverall drift score: {drift_score}")
-print(f"Model health status: {status}")
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.config import DATA_DIR
+from backend.drift import DriftSummary, compare
+
+BASELINE_FILE = os.path.join(DATA_DIR, "baseline_stats.json")
+CURRENT_FILE = os.path.join(DATA_DIR, "kaggle_stats.json")
+
+def load_summary(path):
+    with open(path) as f:
+        return DriftSummary.from_dict(json.load(f))
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare two detection stats files for drift")
+    parser.add_argument("--baseline", default=BASELINE_FILE)
+    parser.add_argument("--current", default=CURRENT_FILE)
+    args = parser.parse_args()
+
+    report = compare(load_summary(args.baseline), load_summary(args.current))
+
+    print(" DRIFT REPORT")
+    print(f"Confidence drift: {report['confidence_drift']:.4f}")
+    if report["area_drift"] is None:
+        units = report["area_normalization"]
+        print(f"Area drift: not compared (baseline areas per {units['baseline']}, current per {units['current']})")
+    else:
+        print(f"Area drift: {report['area_drift']:.4f}")
+    print(f"Frequency drift: {report['frequency_drift']:.4f}")
+    print(f"Confidence PSI: {report['confidence_psi']:.4f} | KS: {report['confidence_ks']:.4f}")
+    if report["area_psi"] is not None:
+        print(f"Area PSI: {report['area_psi']:.4f} | KS: {report['area_ks']:.4f}")
+
+    if report["class_drift"]:
+        print(f"Class mix distance: {report['class_drift']['distance']:.4f}")
+        for name, row in report["class_drift"]["per_class"].items():
+            print(
+                f"  {name:<20} baseline={row['baseline_rate']:.3f} "
+                f"live={row['live_rate']:.3f} delta={row['delta']:+.3f}"
+            )
+
+    print(f"\nOverall drift score: {report['drift_score']}")
+    print(f"Model health status: {report['status']}")
+
+if __name__ == "__main__":
+    main()
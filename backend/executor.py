@@ -0,0 +1,42 @@
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+from backend.config import CPU_WORKERS, IO_WORKERS
+
+# -------------------------
+# POOLS
+# -------------------------
+# PIL, OpenCV and the model release the GIL for the heavy lifting, so threads
+# give real parallelism here without duplicating the model per process.
+cpu_pool = ThreadPoolExecutor(
+    max_workers=max(1, CPU_WORKERS), thread_name_prefix="civisense-cpu"
+)
+io_pool = ThreadPoolExecutor(
+    max_workers=max(1, IO_WORKERS), thread_name_prefix="civisense-io"
+)
+
+# One thread owns the model so forward passes never interleave
+inference_pool = ThreadPoolExecutor(
+    max_workers=1, thread_name_prefix="civisense-infer"
+)
+
+# -------------------------
+# HELPERS
+# -------------------------
+async def _run_in(pool, fn, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(pool, functools.partial(fn, *args, **kwargs))
+
+async def run_cpu(fn, *args, **kwargs):
+    return await _run_in(cpu_pool, fn, *args, **kwargs)
+
+async def run_io(fn, *args, **kwargs):
+    return await _run_in(io_pool, fn, *args, **kwargs)
+
+async def run_inference(fn, *args, **kwargs):
+    return await _run_in(inference_pool, fn, *args, **kwargs)
+
+def shutdown_pools():
+    for pool in (inference_pool, cpu_pool, io_pool):
+        pool.shutdown(wait=True)
@@ -0,0 +1,74 @@
+import json
+import threading
+import time
+
+from backend.drift import DriftSummary, compare
+
+# -------------------------
+# BASELINE
+# -------------------------
+def load_baseline(path):
+    """
+    Baseline is fixed at runtime: reduce it to a DriftSummary once so the
+    raw lists never need to be touched again. None if there is no baseline
+    file.
+    """
+    try:
+        with open(path) as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        return None
+    return DriftSummary.from_dict(data)
+
+# -------------------------
+# HEALTH
+# -------------------------
+def compute_health(baseline, live_stats):
+    """
+    Drift of the live stream against the baseline. Means are taken over the
+    live store's recent window; distribution metrics over its histograms.
+    Constant time: both sides are already aggregated. None without a
+    baseline.
+    """
+    if baseline is None:
+        return None
+    window = live_stats.summary()
+    return compare(
+        baseline,
+        live_stats.drift_summary(),
+        confidence_mean=window["confidence_mean"],
+        area_mean=window["area_mean"]
+    )
+
+# -------------------------
+# RATE-LIMITED LOGGING
+# -------------------------
+class HealthLogger:
+    """
+    Forwards health records to log_fn at most once per interval seconds,
+    plus immediately whenever the status changes, so dashboard polling
+    doesn't turn into one insert per request.
+    """
+
+    def __init__(self, log_fn, interval=60.0):
+        self.log_fn = log_fn
+        self.interval = interval
+        self._last_logged = None
+        self._last_status = None
+        self._lock = threading.Lock()
+
+    def maybe_log(self, health_data):
+        now = time.monotonic()
+        with self._lock:
+            due = (
+                self._last_logged is None
+                or now - self._last_logged >= self.interval
+                or health_data["status"] != self._last_status
+            )
+            if not due:
+                return False
+            self._last_logged = now
+            self._last_status = health_data["status"]
+
+        self.log_fn(health_data)
+        return True
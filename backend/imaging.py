@@ -0,0 +1,162 @@
+import io
+
+import cv2
+import numpy as np
+from PIL import Image
+
+# Leading bytes of the formats decode_image reads; WebP is checked apart
+# since its signature is split ("RIFF", size, "WEBP")
+IMAGE_SIGNATURES = (
+    (b"\xff\xd8\xff", "jpeg"),
+    (b"\x89PNG\r\n\x1a\n", "png"),
+    (b"GIF87a", "gif"),
+    (b"GIF89a", "gif"),
+    (b"BM", "bmp"),
+    (b"II*\x00", "tiff"),
+    (b"MM\x00*", "tiff")
+)
+SNIFF_BYTES = 16
+UPLOAD_CHUNK_BYTES = 1024 * 1024
+
+# libjpeg scales by 1/2, 1/4 or 1/8 while decoding (it skips most of the
+# IDCT work), largest reduction first
+JPEG_REDUCED_FLAGS = (
+    (8, cv2.IMREAD_REDUCED_COLOR_8),
+    (4, cv2.IMREAD_REDUCED_COLOR_4),
+    (2, cv2.IMREAD_REDUCED_COLOR_2)
+)
+
+class UploadTooLarge(ValueError):
+    pass
+
+class UnsupportedImage(ValueError):
+    pass
+
+# -------------------------
+# UPLOADS
+# -------------------------
+def sniff_image_type(head):
+    """Image format from the first SNIFF_BYTES of a file, or None."""
+    head = bytes(head[:SNIFF_BYTES])
+    for magic, kind in IMAGE_SIGNATURES:
+        if head.startswith(magic):
+            return kind
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "webp"
+    return None
+
+def read_upload(fileobj, max_bytes, chunk_size=UPLOAD_CHUNK_BYTES):
+    """
+    Reads an uploaded image chunk by chunk. Anything that isn't an image
+    is refused after the first chunk, and anything over max_bytes as soon
+    as it gets there, so neither is copied into memory whole (0 = no limit).
+
+    By the time this runs Starlette has already received the whole
+    multipart body and spooled it to a temp file; this bounds the copy, not
+    the network read. AdmissionMiddleware bounds the read itself, so what
+    gets here is at most its max_body_bytes.
+    """
+    max_bytes = max_bytes or float("inf")
+    data = bytearray(fileobj.read(min(chunk_size, max_bytes + 1)))
+    if sniff_image_type(data) is None:
+        raise UnsupportedImage("upload is not a supported image (JPEG, PNG, GIF, BMP, TIFF, WebP)")
+
+    while len(data) <= max_bytes:
+        chunk = fileobj.read(chunk_size)
+        if not chunk:
+            break
+        data += chunk
+    if len(data) > max_bytes:
+        raise UploadTooLarge(f"upload exceeds {max_bytes} bytes")
+    return data
+
+def jpeg_size(contents):
+    """(width, height) from a JPEG's frame header, without decoding; None if not found."""
+    data = memoryview(contents)
+    i = 2
+    while i + 9 <= len(data):
+        if data[i] != 0xFF:
+            return None
+        marker = data[i + 1]
+        if marker == 0xFF:
+            # Fill byte before a marker
+            i += 1
+            continue
+        # SOF0-SOF15, except DHT (C4), JPG (C8) and DAC (CC)
+        if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+            height = data[i + 5] << 8 | data[i + 6]
+            width = data[i + 7] << 8 | data[i + 8]
+            return width, height
+        i += 2 + (data[i + 2] << 8 | data[i + 3])
+    return None
+
+# -------------------------
+# DECODE
+# -------------------------
+def decode_image(contents):
+    """
+    Decode upload bytes once into a BGR uint8 array, the layout both the
+    model and OpenCV drawing expect. The bytes are wrapped, not copied.
+    Raises UnsupportedImage if neither OpenCV nor PIL can decode them
+    (e.g. valid magic bytes followed by corrupt data).
+    """
+    buf = np.frombuffer(contents, dtype=np.uint8)
+    image = cv2.imdecode(buf, cv2.IMREAD_COLOR)
+
+    if image is None:
+        # Formats OpenCV can't read (e.g. GIF) still go through PIL
+        try:
+            rgb = np.asarray(Image.open(io.BytesIO(contents)).convert("RGB"))
+        except Exception as e:
+            raise UnsupportedImage("image data is corrupt or truncated") from e
+        image = cv2.cvtColor(rgb, cv2.COLOR_RGB2BGR)
+
+    return image
+
+def decode_upload(contents, target_side=None):
+    """
+    decode_image for an upload the model will shrink to target_side anyway:
+    a JPEG at least twice that size is decoded straight to 1/2, 1/4 or 1/8
+    scale, keeping its longer side >= target_side. Returns the image and
+    the (height, width) of the full-size upload, to map boxes back with.
+    """
+    if target_side and sniff_image_type(contents) == "jpeg":
+        size = jpeg_size(contents)
+        long_side = max(size) if size else 0
+        for factor, flag in JPEG_REDUCED_FLAGS:
+            if long_side < factor * target_side:
+                continue
+            image = cv2.imdecode(np.frombuffer(contents, dtype=np.uint8), flag)
+            if image is None:
+                break
+            # EXIF orientation is applied after the header was read
+            short_side = min(size)
+            height, width = image.shape[:2]
+            return image, (long_side, short_side) if height > width else (short_side, long_side)
+
+    image = decode_image(contents)
+    return image, image.shape[:2]
+
+# -------------------------
+# ANNOTATE
+# -------------------------
+def draw_detections(image, detections):
+    """
+    Draws boxes in place on a BGR array and returns it.
+    """
+    for det in detections:
+        x1, y1, x2, y2 = map(int, det["bbox"])
+        label = f'{det["class"]} {det["confidence"]:.2f}'
+
+        cv2.rectangle(image, (x1, y1), (x2, y2), (0, 255, 0), 2)
+        cv2.putText(
+            image,
+            label,
+            (x1, max(y1 - 10, 10)),
+            cv2.FONT_HERSHEY_SIMPLEX,
+            0.6,
+            (0, 255, 0),
+            2
+        )
+
+    return image
@@ -1,24 +1,25 @@
 import os
-from ultralytics import YOLO
-from risk_engine import compute_severity
-from utils.visualize import draw_and_save
+import sys
+
+import cv2
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.config import CIVISENSE_CLASSES
+from backend.inference_backend import load_backend
+from backend.risk_engine import severity_arrays
+from backend.utils.visualize import draw_and_save
 
 # -------------------------
 # CONFIG
 # -------------------------
-MODEL_PATH = "../models/damage_detector.pt"
 IMAGE_DIR = "../data/test_images"
 
-CIVISENSE_CLASSES = {
-    0: "pothole",
-    1: "crack",
-    2: "surface_damage"
-}
-
 # -------------------------
 # LOAD MODEL
 # -------------------------
-model = YOLO(MODEL_PATH)
+# Backend (torch / onnx / openvino) comes from CIVISENSE_INFERENCE_BACKEND
+engine = load_backend()
 
 # -------------------------
 # RUN INFERENCE
@@ -28,40 +29,40 @@ for img_name in os.listdir(IMAGE_DIR):
         continue
 
     img_path = os.path.join(IMAGE_DIR, img_name)
-    results = model(img_path)
+    image = cv2.imread(img_path)
+    if image is None:
+        continue
+
+    result = engine.predict([image])[0]
 
     print(f"\n Results for {img_name}")
 
     detections = []
 
-    for r in results:
-        if r.boxes is None:
-            continue
-
-        for box in r.boxes:
-            cls = int(box.cls.item())
-            conf = float(box.conf.item())
-            xyxy = box.xyxy[0].tolist()
-
-            class_name = CIVISENSE_CLASSES.get(cls, "unknown")
-            severity, level = compute_severity(conf, xyxy, class_name)
-
-            detection = {
-                "class": class_name,
-                "confidence": round(conf, 3),
-                "severity": round(severity, 4),
-                "risk_level": level,
-                "bbox": xyxy
-            }
-
-            detections.append(detection)
-
-            print(
-                f"  ➤ {class_name:<15} | "
-                f"conf={conf:.2f} | "
-                f"severity={severity:.4f} | "
-                f"level={level}"
-            )
+    severities, levels = severity_arrays(result.xyxy, result.conf, result.cls, image.shape)
+
+    for xyxy, conf, cls, severity, level in zip(
+        result.xyxy.tolist(), result.conf.tolist(), result.cls.tolist(),
+        severities.tolist(), levels.tolist()
+    ):
+        class_name = CIVISENSE_CLASSES.get(cls, "unknown")
+
+        detection = {
+            "class": class_name,
+            "confidence": round(conf, 3),
+            "severity": round(severity, 4),
+            "risk_level": level,
+            "bbox": xyxy
+        }
+
+        detections.append(detection)
+
+        print(
+            f"  ➤ {class_name:<15} | "
+            f"conf={conf:.2f} | "
+            f"severity={severity:.4f} | "
+            f"level={level}"
+        )
 
     if not detections:
         print("  No damage detected")
@@ -0,0 +1,458 @@
+"""
+Pluggable inference backends for the damage detector.
+
+Every backend takes a list of BGR uint8 arrays and returns one Detections
+per image with boxes in original-image pixel coordinates, so callers don't
+care whether PyTorch, ONNX Runtime or OpenVINO ran the model.
+
+    python -m backend.inference_backend export --format onnx
+    python -m backend.inference_backend parity --backend onnx --images data/drift_images/baseline
+"""
+import argparse
+import os
+import shutil
+import sys
+import time
+from abc import ABC, abstractmethod
+from collections import namedtuple
+
+import cv2
+import numpy as np
+
+from backend.config import (
+    MODEL_PATH, ONNX_MODEL_PATH, OPENVINO_MODEL_DIR, IMG_SIZE,
+    CONF_THRESHOLD, IOU_THRESHOLD, INFERENCE_BACKEND,
+    INTRA_OP_THREADS, INTER_OP_THREADS, MODEL_VARIANT, INT8_MODEL_PATH
+)
+
+# xyxy: (N, 4) float32, conf: (N,) float32, cls: (N,) int64
+Detections = namedtuple("Detections", ["xyxy", "conf", "cls"])
+
+MAX_DETECTIONS = 300
+# Class offset for batched class-aware NMS, larger than any image side
+MAX_WH = 7680
+
+def empty_detections():
+    return Detections(
+        np.zeros((0, 4), dtype=np.float32),
+        np.zeros(0, dtype=np.float32),
+        np.zeros(0, dtype=np.int64)
+    )
+
+# -------------------------
+# BOX OPS
+# -------------------------
+def box_iou(box, boxes):
+    x1 = np.maximum(box[0], boxes[:, 0])
+    y1 = np.maximum(box[1], boxes[:, 1])
+    x2 = np.minimum(box[2], boxes[:, 2])
+    y2 = np.minimum(box[3], boxes[:, 3])
+    inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area = (box[2] - box[0]) * (box[3] - box[1])
+    areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+    return inter / np.maximum(area + areas - inter, 1e-9)
+
+def nms(boxes, scores, iou_threshold, classes=None, max_det=MAX_DETECTIONS):
+    """
+    Greedy NMS over xyxy boxes; class-aware when classes is given.
+    Returns kept indices, highest score first.
+    """
+    if len(boxes) == 0:
+        return np.zeros(0, dtype=np.int64)
+
+    if classes is not None:
+        # Offset must exceed every coordinate; merged tiles can be > MAX_WH
+        offset = max(MAX_WH, float(boxes.max()) + 1)
+        boxes = boxes + (classes[:, None] * offset).astype(boxes.dtype)
+
+    order = np.argsort(-scores)
+    keep = []
+    while order.size and len(keep) < max_det:
+        i = order[0]
+        keep.append(i)
+        if order.size == 1:
+            break
+        ious = box_iou(boxes[i], boxes[order[1:]])
+        order = order[1:][ious <= iou_threshold]
+
+    return np.asarray(keep, dtype=np.int64)
+
+# -------------------------
+# PRE / POST PROCESSING
+# -------------------------
+def letterbox(image, size):
+    """
+    Resize keeping aspect ratio and pad to size x size, the way ultralytics
+    does. Returns the padded image, the scale and the (left, top) padding.
+    """
+    h, w = image.shape[:2]
+    r = min(size / h, size / w)
+    new_w, new_h = int(round(w * r)), int(round(h * r))
+
+    if (new_w, new_h) != (w, h):
+        image = cv2.resize(image, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+
+    dw, dh = (size - new_w) / 2, (size - new_h) / 2
+    top, bottom = int(round(dh - 0.1)), int(round(dh + 0.1))
+    left, right = int(round(dw - 0.1)), int(round(dw + 0.1))
+    image = cv2.copyMakeBorder(
+        image, top, bottom, left, right, cv2.BORDER_CONSTANT, value=(114, 114, 114)
+    )
+    return image, r, (left, top)
+
+def preprocess(images, size):
+    batch = np.empty((len(images), 3, size, size), dtype=np.float32)
+    meta = []
+    for i, image in enumerate(images):
+        padded, r, pad = letterbox(image, size)
+        # BGR HWC uint8 -> RGB CHW float in [0, 1]
+        batch[i] = padded[:, :, ::-1].transpose(2, 0, 1) * (1.0 / 255.0)
+        meta.append((r, pad, image.shape[:2]))
+    return batch, meta
+
+def postprocess(output, meta, conf_threshold, iou_threshold):
+    """
+    output: (B, 4 + num_classes, anchors) raw YOLO head, boxes as cxcywh in
+    letterboxed pixels.
+    """
+    results = []
+    for preds, (r, (pad_x, pad_y), (h, w)) in zip(output, meta):
+        preds = preds.T
+        scores = preds[:, 4:]
+        cls = scores.argmax(axis=1)
+        conf = scores[np.arange(len(scores)), cls]
+
+        mask = conf > conf_threshold
+        if not mask.any():
+            results.append(empty_detections())
+            continue
+
+        boxes, conf, cls = preds[mask, :4], conf[mask], cls[mask]
+        xyxy = np.empty_like(boxes)
+        xyxy[:, 0] = boxes[:, 0] - boxes[:, 2] / 2
+        xyxy[:, 1] = boxes[:, 1] - boxes[:, 3] / 2
+        xyxy[:, 2] = boxes[:, 0] + boxes[:, 2] / 2
+        xyxy[:, 3] = boxes[:, 1] + boxes[:, 3] / 2
+
+        keep = nms(xyxy, conf, iou_threshold, classes=cls)
+        xyxy, conf, cls = xyxy[keep], conf[keep], cls[keep]
+
+        # Undo the letterbox
+        xyxy[:, [0, 2]] = np.clip((xyxy[:, [0, 2]] - pad_x) / r, 0, w)
+        xyxy[:, [1, 3]] = np.clip((xyxy[:, [1, 3]] - pad_y) / r, 0, h)
+
+        results.append(Detections(
+            xyxy.astype(np.float32), conf.astype(np.float32), cls.astype(np.int64)
+        ))
+    return results
+
+# -------------------------
+# BACKENDS
+# -------------------------
+class TorchBackend:
+    """Eager PyTorch through ultralytics (the original serving path)."""
+
+    name = "torch"
+
+    def __init__(self, model_path=MODEL_PATH, imgsz=IMG_SIZE, conf=CONF_THRESHOLD,
+                 iou=IOU_THRESHOLD, intra_op_threads=0, inter_op_threads=0):
+        import torch
+        from ultralytics import YOLO
+
+        if intra_op_threads:
+            torch.set_num_threads(intra_op_threads)
+        if inter_op_threads:
+            try:
+                torch.set_num_interop_threads(inter_op_threads)
+            except RuntimeError:
+                pass  # Only settable before the first parallel op
+
+        self.model_path = model_path
+        self.model = YOLO(model_path)
+        self.imgsz = imgsz
+        self.conf = conf
+        self.iou = iou
+
+    def after_fork(self, intra_op_threads=0):
+        # Weights are plain tensors: a forked worker shares them copy-on-write
+        if intra_op_threads:
+            import torch
+            torch.set_num_threads(intra_op_threads)
+
+    def predict(self, images):
+        results = self.model(
+            images, imgsz=self.imgsz, conf=self.conf, iou=self.iou, verbose=False
+        )
+        out = []
+        for r in results:
+            if r.boxes is None or len(r.boxes) == 0:
+                out.append(empty_detections())
+                continue
+            # One device->host copy per image instead of one per box
+            out.append(Detections(
+                r.boxes.xyxy.cpu().numpy().astype(np.float32),
+                r.boxes.conf.cpu().numpy().astype(np.float32),
+                r.boxes.cls.cpu().numpy().astype(np.int64)
+            ))
+        return out
+
+class _ExportedBackend(ABC):
+    """Shared letterbox / decode / NMS around a raw exported graph."""
+
+    def __init__(self, imgsz=IMG_SIZE, conf=CONF_THRESHOLD, iou=IOU_THRESHOLD):
+        self.imgsz = imgsz
+        self.conf = conf
+        self.iou = iou
+
+    @abstractmethod
+    def _run(self, batch):
+        """Raw graph output for a preprocessed (N, 3, imgsz, imgsz) batch."""
+
+    @abstractmethod
+    def _load(self):
+        """(Re)builds the runtime session from the artifact on disk."""
+
+    def after_fork(self, intra_op_threads=0):
+        # Runtime thread pools don't survive fork; build a fresh session
+        if intra_op_threads:
+            self.intra_op_threads = intra_op_threads
+        self._load()
+
+    def predict(self, images):
+        if not images:
+            return []
+        batch, meta = preprocess(images, self.imgsz)
+        return postprocess(self._run(batch), meta, self.conf, self.iou)
+
+class OnnxBackend(_ExportedBackend):
+    name = "onnx"
+
+    def __init__(self, model_path=ONNX_MODEL_PATH, imgsz=IMG_SIZE, conf=CONF_THRESHOLD,
+                 iou=IOU_THRESHOLD, intra_op_threads=0, inter_op_threads=0):
+        super().__init__(imgsz, conf, iou)
+        self.model_path = model_path
+        self.intra_op_threads = intra_op_threads
+        self.inter_op_threads = inter_op_threads
+        self._load()
+
+    def _load(self):
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if self.intra_op_threads:
+            options.intra_op_num_threads = self.intra_op_threads
+        if self.inter_op_threads:
+            options.inter_op_num_threads = self.inter_op_threads
+            options.execution_mode = ort.ExecutionMode.ORT_PARALLEL
+
+        self.session = ort.InferenceSession(
+            self.model_path, sess_options=options, providers=["CPUExecutionProvider"]
+        )
+        self.input_name = self.session.get_inputs()[0].name
+        self.static_batch = isinstance(self.session.get_inputs()[0].shape[0], int)
+
+    def _run(self, batch):
+        if self.static_batch:
+            # Graph exported without a dynamic batch axis: one image at a time
+            return np.concatenate([
+                self.session.run(None, {self.input_name: batch[i:i + 1]})[0]
+                for i in range(len(batch))
+            ])
+        return self.session.run(None, {self.input_name: batch})[0]
+
+class OpenVINOBackend(_ExportedBackend):
+    name = "openvino"
+
+    def __init__(self, model_dir=OPENVINO_MODEL_DIR, imgsz=IMG_SIZE, conf=CONF_THRESHOLD,
+                 iou=IOU_THRESHOLD, intra_op_threads=0, inter_op_threads=0):
+        super().__init__(imgsz, conf, iou)
+
+        self.model_path = next(
+            os.path.join(model_dir, name) for name in os.listdir(model_dir)
+            if name.endswith(".xml")
+        )
+        self.intra_op_threads = intra_op_threads
+        self.inter_op_threads = inter_op_threads
+        self._load()
+
+    def _load(self):
+        import openvino as ov
+
+        config = {}
+        if self.intra_op_threads:
+            config["INFERENCE_NUM_THREADS"] = self.intra_op_threads
+        if self.inter_op_threads:
+            config["NUM_STREAMS"] = self.inter_op_threads
+
+        core = ov.Core()
+        self.compiled = core.compile_model(core.read_model(self.model_path), "CPU", config)
+        self.output = self.compiled.output(0)
+
+    def _run(self, batch):
+        return self.compiled(batch)[self.output]
+
+BACKENDS = {
+    "torch": TorchBackend,
+    "onnx": OnnxBackend,
+    "openvino": OpenVINOBackend
+}
+
+# -------------------------
+# EXPORT / LOAD
+# -------------------------
+def export_model(fmt, model_path=MODEL_PATH, imgsz=IMG_SIZE):
+    """Exports the .pt weights with ultralytics; returns the artifact path."""
+    from ultralytics import YOLO
+
+    if fmt == "onnx":
+        # Dynamic axes so the micro-batcher can send any batch size
+        return YOLO(model_path).export(format="onnx", imgsz=imgsz, dynamic=True, simplify=True)
+    if fmt == "openvino":
+        return YOLO(model_path).export(format="openvino", imgsz=imgsz, dynamic=True)
+    raise ValueError(f"Unknown export format: {fmt}")
+
+def load_backend(name=INFERENCE_BACKEND, variant=MODEL_VARIANT,
+                 intra_op_threads=INTRA_OP_THREADS, inter_op_threads=INTER_OP_THREADS, **kwargs):
+    """
+    Builds the configured backend, exporting the .pt weights first if the
+    runtime's artifact doesn't exist yet. variant="int8" serves the
+    quantized ONNX model (see backend/quantize.py) through ONNX Runtime.
+    """
+    if variant == "int8":
+        if not os.path.exists(INT8_MODEL_PATH):
+            raise FileNotFoundError(
+                f"{INT8_MODEL_PATH} not found; build it with python -m backend.quantize"
+            )
+        engine = OnnxBackend(
+            model_path=INT8_MODEL_PATH,
+            intra_op_threads=intra_op_threads,
+            inter_op_threads=inter_op_threads,
+            **kwargs
+        )
+        engine.name = "onnx-int8"
+        return engine
+    if variant != "fp32":
+        raise ValueError(f"Unknown model variant: {variant} (choose from fp32, int8)")
+
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown inference backend: {name} (choose from {', '.join(BACKENDS)})")
+
+    if name == "onnx" and "model_path" not in kwargs and not os.path.exists(ONNX_MODEL_PATH):
+        exported = export_model("onnx")
+        if os.path.abspath(exported) != os.path.abspath(ONNX_MODEL_PATH):
+            shutil.move(exported, ONNX_MODEL_PATH)
+    if name == "openvino" and "model_dir" not in kwargs and not os.path.isdir(OPENVINO_MODEL_DIR):
+        exported = export_model("openvino")
+        if os.path.abspath(exported) != os.path.abspath(OPENVINO_MODEL_DIR):
+            shutil.move(exported, OPENVINO_MODEL_DIR)
+
+    return BACKENDS[name](
+        intra_op_threads=intra_op_threads, inter_op_threads=inter_op_threads, **kwargs
+    )
+
+# -------------------------
+# PARITY CHECK
+# -------------------------
+def match_detections(reference, candidate, iou_threshold=0.9):
+    """
+    Greedy same-class IoU matching. Returns (matched pairs, unmatched in
+    reference, unmatched in candidate).
+    """
+    pairs = []
+    used = set()
+    for i in np.argsort(-reference.conf):
+        best, best_iou = None, iou_threshold
+        same_class = np.where(candidate.cls == reference.cls[i])[0]
+        if same_class.size:
+            ious = box_iou(reference.xyxy[i], candidate.xyxy[same_class])
+            for j, iou in zip(same_class, ious):
+                if j not in used and iou >= best_iou:
+                    best, best_iou = j, iou
+        if best is not None:
+            used.add(best)
+            pairs.append((i, best))
+
+    return pairs, len(reference.conf) - len(pairs), len(candidate.conf) - len(used)
+
+def parity_report(reference, candidate, images, conf_tolerance=0.05, iou_threshold=0.9):
+    matched = missing = extra = 0
+    max_conf_diff = 0.0
+    ref_time = cand_time = 0.0
+
+    for image in images:
+        t0 = time.perf_counter()
+        ref = reference.predict([image])[0]
+        t1 = time.perf_counter()
+        cand = candidate.predict([image])[0]
+        t2 = time.perf_counter()
+        ref_time += t1 - t0
+        cand_time += t2 - t1
+
+        pairs, miss, ext = match_detections(ref, cand, iou_threshold)
+        matched += len(pairs)
+        missing += miss
+        extra += ext
+        for i, j in pairs:
+            max_conf_diff = max(max_conf_diff, abs(float(ref.conf[i]) - float(cand.conf[j])))
+
+    total = matched + missing
+    return {
+        "images": len(images),
+        "reference_detections": total,
+        "matched": matched,
+        "missing": missing,
+        "extra": extra,
+        "match_rate": round(matched / total, 4) if total else 1.0,
+        "max_conf_diff": round(max_conf_diff, 4),
+        "within_tolerance": max_conf_diff <= conf_tolerance,
+        "reference_ms_per_image": round(ref_time / max(len(images), 1) * 1000, 2),
+        "candidate_ms_per_image": round(cand_time / max(len(images), 1) * 1000, 2)
+    }
+
+# -------------------------
+# CLI
+# -------------------------
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export and check inference backends")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    export = sub.add_parser("export", help="Export the .pt weights for a CPU runtime")
+    export.add_argument("--format", choices=["onnx", "openvino"], default="onnx")
+
+    parity = sub.add_parser("parity", help="Compare a backend's detections against PyTorch")
+    parity.add_argument("--backend", choices=["onnx", "openvino"], default="onnx")
+    parity.add_argument("--images", required=True)
+    parity.add_argument("--limit", type=int, default=50)
+    parity.add_argument("--conf-tolerance", type=float, default=0.05)
+    parity.add_argument("--iou", type=float, default=0.9, help="IoU needed to match two boxes")
+    parity.add_argument("--min-match-rate", type=float, default=0.95)
+
+    args = parser.parse_args(argv)
+
+    if args.command == "export":
+        print(export_model(args.format))
+        return 0
+
+    names = sorted(
+        n for n in os.listdir(args.images) if n.lower().endswith((".jpg", ".jpeg", ".png"))
+    )[:args.limit]
+    images = [cv2.imread(os.path.join(args.images, n)) for n in names]
+    images = [img for img in images if img is not None]
+
+    report = parity_report(
+        load_backend("torch"),
+        load_backend(args.backend),
+        images,
+        conf_tolerance=args.conf_tolerance,
+        iou_threshold=args.iou
+    )
+    for key, value in report.items():
+        print(f"{key}: {value}")
+
+    ok = report["within_tolerance"] and report["match_rate"] >= args.min_match_rate
+    print("PARITY OK" if ok else "PARITY FAILED")
+    return 0 if ok else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,243 @@
+"""
+Batch prediction jobs: archive/multi-file entry streaming and the on-disk
+job records /predict/batch uses for polling and resuming.
+"""
+import json
+import os
+import re
+import tarfile
+import threading
+import uuid
+import zipfile
+from datetime import datetime
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process locking
+    fcntl = None
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp", ".webp")
+TAR_SUFFIXES = (".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tar.xz")
+
+JOB_ID_RE = re.compile(r"^[0-9a-f]{32}$")
+START_LOCK = ".start.lock"
+
+# -------------------------
+# ENTRY STREAMING
+# -------------------------
+def _is_image(name):
+    base = os.path.basename(name)
+    return not base.startswith(".") and name.lower().endswith(IMAGE_EXTENSIONS)
+
+def iter_upload(filename, fileobj, max_entry_bytes):
+    """
+    Yields (name, bytes) for every image in one upload. Archives are read
+    entry by entry straight from the upload stream, nothing is extracted to
+    disk; entries larger than max_entry_bytes yield None as their bytes.
+    """
+    lower = (filename or "").lower()
+
+    if lower.endswith(".zip"):
+        with zipfile.ZipFile(fileobj) as zf:
+            for info in zf.infolist():
+                if info.is_dir() or not _is_image(info.filename):
+                    continue
+                name = f"{filename}/{info.filename}"
+                if info.file_size > max_entry_bytes:
+                    yield name, None
+                    continue
+                with zf.open(info) as f:
+                    yield name, f.read()
+
+    elif lower.endswith(TAR_SUFFIXES):
+        # "r|*" is tarfile's forward-only stream mode
+        with tarfile.open(fileobj=fileobj, mode="r|*") as tf:
+            for member in tf:
+                if not member.isfile() or not _is_image(member.name):
+                    continue
+                name = f"{filename}/{member.name}"
+                if member.size > max_entry_bytes:
+                    yield name, None
+                    continue
+                yield name, tf.extractfile(member).read()
+
+    else:
+        data = fileobj.read(max_entry_bytes + 1)
+        yield filename, data if len(data) <= max_entry_bytes else None
+
+def iter_uploads(uploads, max_entry_bytes):
+    for filename, fileobj in uploads:
+        yield from iter_upload(filename, fileobj, max_entry_bytes)
+
+def take(iterator, n):
+    chunk = []
+    for item in iterator:
+        chunk.append(item)
+        if len(chunk) == n:
+            break
+    return chunk
+
+# -------------------------
+# JOB RECORDS
+# -------------------------
+class Job:
+    """
+    A job is <id>.json (status and counters) plus <id>.ndjson (one line
+    per finished entry). Entry names already in the results file are
+    skipped when the same upload is posted again with the job id.
+    """
+
+    def __init__(self, directory, job_id, meta=None):
+        self.id = job_id
+        self.meta_path = os.path.join(directory, f"{job_id}.json")
+        self.results_path = os.path.join(directory, f"{job_id}.ndjson")
+        self._lock = threading.Lock()
+
+        meta = meta or {}
+        self.status = meta.get("status", "created")
+        self.created = meta.get("created", datetime.utcnow().isoformat())
+        self.updated = meta.get("updated", self.created)
+        self.processed = meta.get("processed", 0)
+        self.failed = meta.get("failed", 0)
+        self.runs = meta.get("runs", 0)
+        self.pid = meta.get("pid")
+
+    def done_names(self):
+        names = set()
+        try:
+            with open(self.results_path) as f:
+                for line in f:
+                    try:
+                        names.add(json.loads(line)["name"])
+                    except (ValueError, KeyError):
+                        continue
+        except FileNotFoundError:
+            pass
+        return names
+
+    def append(self, results):
+        with self._lock:
+            with open(self.results_path, "a") as f:
+                for result in results:
+                    f.write(json.dumps(result) + "\n")
+                    if result.get("error"):
+                        self.failed += 1
+                    else:
+                        self.processed += 1
+            self._save()
+
+    def set_status(self, status):
+        with self._lock:
+            self.status = status
+            if status == "running":
+                self.runs += 1
+                self.pid = os.getpid()
+            self._save()
+
+    def _save(self):
+        self.updated = datetime.utcnow().isoformat()
+        tmp_path = f"{self.meta_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.to_dict(), f)
+        os.replace(tmp_path, self.meta_path)
+
+    def read_results(self, offset=0):
+        try:
+            with open(self.results_path) as f:
+                for i, line in enumerate(f):
+                    if i >= offset:
+                        yield line
+        except FileNotFoundError:
+            return
+
+    def to_dict(self):
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "created": self.created,
+            "updated": self.updated,
+            "processed": self.processed,
+            "failed": self.failed,
+            "runs": self.runs,
+            "pid": self.pid
+        }
+
+def _alive(pid):
+    if not pid:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+class JobStore:
+    """
+    Jobs this process is running are kept in memory between start() and
+    finish(); everything else lives on disk only.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._jobs = {}
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def create(self):
+        return Job(self.directory, uuid.uuid4().hex)
+
+    def get(self, job_id):
+        """
+        Jobs this process is running come from memory; anything else is
+        read from disk each time, since another worker may own it.
+        """
+        if not job_id or not JOB_ID_RE.match(job_id):
+            return None
+        with self._lock:
+            job = self._jobs.get(job_id)
+        return job if job is not None else self._load(job_id)
+
+    def _load(self, job_id):
+        meta_path = os.path.join(self.directory, f"{job_id}.json")
+        try:
+            with open(meta_path) as f:
+                meta = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+        job = Job(self.directory, job_id, meta)
+        if job.status == "running" and not _alive(job.pid):
+            job.status = "interrupted"
+        return job
+
+    def start(self, job):
+        """
+        Marks job running and tracks it; False if it is already running
+        here or in another live worker. The check and the change happen
+        under one lock (a lock file across workers), so two resumes of the
+        same job can't both get through.
+        """
+        with self._lock:
+            lock_file = open(os.path.join(self.directory, START_LOCK), "a")
+            try:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX)
+                current = self._jobs.get(job.id) or self._load(job.id)
+                if current is not None and current.status == "running":
+                    return False
+                job.set_status("running")
+                self._jobs[job.id] = job
+                return True
+            finally:
+                lock_file.close()
+
+    def finish(self, job):
+        """Stops tracking job; if it is still running it was cut off, and can be resumed."""
+        with self._lock:
+            if self._jobs.get(job.id) is not job:
+                return
+            del self._jobs[job.id]
+        if job.status == "running":
+            job.set_status("interrupted")
@@ -0,0 +1,350 @@
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process locking
+    fcntl = None
+
+from backend.config import IMG_SIZE
+from backend.drift import AREA_NORMALIZATION, DriftSummary
+
+logger = logging.getLogger(__name__)
+
+# -------------------------
+# RING BUFFER
+# -------------------------
+class RingBuffer:
+    """
+    Fixed-size float buffer keeping the most recent values, with O(1)
+    window mean and variance from running sums.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = max(1, int(capacity))
+        self._data = np.zeros(self.capacity, dtype=np.float64)
+        self._next = 0
+        self._size = 0
+        self._sum = 0.0
+        self._sumsq = 0.0
+
+    def __len__(self):
+        return self._size
+
+    def extend(self, values):
+        values = np.asarray(values, dtype=np.float64).ravel()
+        if values.size == 0:
+            return
+        if values.size >= self.capacity:
+            values = values[-self.capacity:]
+            self._data[:] = values
+            self._next = 0
+            self._size = self.capacity
+            self._recompute()
+            return
+
+        idx = (self._next + np.arange(values.size)) % self.capacity
+        if self._size == self.capacity:
+            evicted = self._data[idx]
+            self._sum -= float(evicted.sum())
+            self._sumsq -= float(np.dot(evicted, evicted))
+
+        self._data[idx] = values
+        self._sum += float(values.sum())
+        self._sumsq += float(np.dot(values, values))
+        self._size = min(self.capacity, self._size + values.size)
+
+        wrapped = self._next + values.size >= self.capacity
+        self._next = (self._next + values.size) % self.capacity
+        if wrapped:
+            # Re-sum once per lap so float error can't accumulate
+            self._recompute()
+
+    def _recompute(self):
+        window = self._data[:self._size] if self._size < self.capacity else self._data
+        self._sum = float(window.sum())
+        self._sumsq = float(np.dot(window, window))
+
+    def values(self):
+        """Oldest to newest."""
+        if self._size < self.capacity:
+            return self._data[:self._size].copy()
+        return np.roll(self._data, -self._next)
+
+    def mean(self):
+        return self._sum / self._size if self._size else 0.0
+
+    def variance(self):
+        if not self._size:
+            return 0.0
+        m = self.mean()
+        return max(self._sumsq / self._size - m * m, 0.0)
+
+    def clear(self):
+        self._next = 0
+        self._size = 0
+        self._sum = 0.0
+        self._sumsq = 0.0
+
+# -------------------------
+# RUNNING MOMENTS
+# -------------------------
+class RunningMoments:
+    """
+    All-time count / mean / M2 (Welford), mergeable with Chan's formula so
+    per-worker partials can be combined.
+    """
+
+    def __init__(self, count=0, mean=0.0, m2=0.0):
+        self.count = int(count)
+        self.mean = float(mean)
+        self.m2 = float(m2)
+
+    def update(self, values):
+        values = np.asarray(values, dtype=np.float64).ravel()
+        if values.size == 0:
+            return
+        batch_mean = float(values.mean())
+        batch_m2 = float(((values - batch_mean) ** 2).sum())
+        self.merge(RunningMoments(values.size, batch_mean, batch_m2))
+
+    def merge(self, other):
+        if other.count == 0:
+            return
+        if self.count == 0:
+            self.count, self.mean, self.m2 = other.count, other.mean, other.m2
+            return
+        total = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / total
+        self.m2 += other.m2 + delta * delta * self.count * other.count / total
+        self.count = total
+
+    def variance(self):
+        return self.m2 / self.count if self.count else 0.0
+
+    def to_dict(self):
+        return {"count": self.count, "mean": self.mean, "m2": self.m2}
+
+    @classmethod
+    def from_dict(cls, data):
+        data = data or {}
+        return cls(data.get("count", 0), data.get("mean", 0.0), data.get("m2", 0.0))
+
+# -------------------------
+# LIVE STATS STORE
+# -------------------------
+def detection_arrays(detections, image_shape=None):
+    """Areas are fractions of the (height, width) frame, IMG_SIZE^2 if unknown."""
+    height, width = image_shape[:2] if image_shape is not None else (IMG_SIZE, IMG_SIZE)
+    confidences = np.array([d["confidence"] for d in detections], dtype=np.float64)
+    if detections:
+        boxes = np.array([d["bbox"] for d in detections], dtype=np.float64)
+        areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1]) / (height * width)
+    else:
+        areas = np.zeros(0, dtype=np.float64)
+    classes = [d["class"] for d in detections]
+    return confidences, areas, classes
+
+class _WindowStats:
+    """
+    Recent-value windows and all-time moments, plus the mergeable drift
+    summary (counters, histograms, class counts).
+    """
+
+    def __init__(self, window):
+        self.window = window
+        self.summary = DriftSummary()
+        self.confidences = RingBuffer(window)
+        self.areas = RingBuffer(window)
+        self.confidence_moments = RunningMoments()
+        self.area_moments = RunningMoments()
+
+    @property
+    def images(self):
+        return self.summary.total_images
+
+    @property
+    def detections(self):
+        return self.summary.total_detections
+
+    def add(self, confidences, areas, classes):
+        self.summary.update(confidences, areas, classes)
+        self.confidences.extend(confidences)
+        self.areas.extend(areas)
+        self.confidence_moments.update(confidences)
+        self.area_moments.update(areas)
+
+    def merge(self, other):
+        # other is newer: its window values go after ours
+        self.summary.merge(other.summary)
+        self.confidences.extend(other.confidences.values())
+        self.areas.extend(other.areas.values())
+        self.confidence_moments.merge(other.confidence_moments)
+        self.area_moments.merge(other.area_moments)
+
+    def to_dict(self):
+        return {
+            "total_images": self.images,
+            "total_detections": self.detections,
+            "confidences": self.confidences.values().tolist(),
+            "areas": self.areas.values().tolist(),
+            "confidence_moments": self.confidence_moments.to_dict(),
+            "area_moments": self.area_moments.to_dict(),
+            "summary": self.summary.to_dict(),
+            "updated_at": time.time()
+        }
+
+    @classmethod
+    def from_dict(cls, data, window):
+        stats = cls(window)
+        # Files written before the summary existed only carry raw lists
+        summary = DriftSummary.from_dict(data.get("summary", data))
+        if summary.area_normalization != AREA_NORMALIZATION:
+            # Areas in other units can't be merged with new ones; start over
+            return stats
+        stats.summary = summary
+        stats.confidences.extend(data.get("confidences", []))
+        stats.areas.extend(data.get("areas", []))
+        stats.confidence_moments = RunningMoments.from_dict(data.get("confidence_moments"))
+        stats.area_moments = RunningMoments.from_dict(data.get("area_moments"))
+        return stats
+
+class LiveStatsStore:
+    """
+    Process-local live detection statistics.
+
+    Updates are in-memory and O(detections). A background thread snapshots
+    to disk every snapshot_interval seconds with an atomic replace. When
+    several workers share the file, each snapshot merges only this worker's
+    delta into the file under an exclusive lock and then adopts the merged
+    totals, so workers converge without losing each other's updates.
+    """
+
+    def __init__(self, path, window=100, snapshot_interval=5.0):
+        self.path = path
+        self.window = max(1, int(window))
+        self.snapshot_interval = snapshot_interval
+
+        self._current = _WindowStats(self.window)
+        # What this process recorded since its last snapshot
+        self._delta = _WindowStats(self.window)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+        data = self._read_file()
+        if data:
+            self._current = _WindowStats.from_dict(data, self.window)
+
+    # ---- recording ----
+    def record(self, detections, image_shape=None):
+        confidences, areas, classes = detection_arrays(detections, image_shape)
+
+        with self._lock:
+            self._current.add(confidences, areas, classes)
+            self._delta.add(confidences, areas, classes)
+
+    # ---- reads ----
+    def summary(self):
+        with self._lock:
+            current = self._current
+            return {
+                "total_images": current.images,
+                "total_detections": current.detections,
+                "confidence_mean": current.confidences.mean(),
+                "confidence_var": current.confidences.variance(),
+                "area_mean": current.areas.mean(),
+                "area_var": current.areas.variance(),
+                "confidence_mean_all": current.confidence_moments.mean,
+                "area_mean_all": current.area_moments.mean
+            }
+
+    def drift_summary(self):
+        with self._lock:
+            return self._current.summary.copy()
+
+    def to_dict(self):
+        with self._lock:
+            return self._current.to_dict()
+
+    # ---- persistence ----
+    def _read_file(self):
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def _write_atomic(self, data):
+        directory = os.path.dirname(self.path) or "."
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".live_stats.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def snapshot(self):
+        with self._lock:
+            delta = self._delta
+            self._delta = _WindowStats(self.window)
+
+        lock_file = open(self.path + ".lock", "a")
+        try:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+
+            on_disk = self._read_file()
+            merged = _WindowStats.from_dict(on_disk or {}, self.window)
+            merged.merge(delta)
+            if delta.images or on_disk is None:
+                self._write_atomic(merged.to_dict())
+        except BaseException:
+            # Put the delta back so the next snapshot retries it
+            with self._lock:
+                delta.merge(self._delta)
+                self._delta = delta
+            raise
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+            lock_file.close()
+
+        with self._lock:
+            # Merged file plus whatever arrived while we were writing
+            merged.merge(self._delta)
+            self._current = merged
+
+    # ---- background snapshots ----
+    def _loop(self):
+        while not self._stop.wait(self.snapshot_interval):
+            try:
+                self.snapshot()
+            except Exception:
+                logger.exception("live stats snapshot failed")
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._loop, name="civisense-live-stats", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+        self.snapshot()
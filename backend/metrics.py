@@ -0,0 +1,332 @@
+import asyncio
+import bisect
+import threading
+import time
+
+# -------------------------
+# HISTOGRAM
+# -------------------------
+class Histogram:
+    """
+    Fixed-bucket histogram (upper bounds, Prometheus style).
+    Cheap enough to observe on every request.
+    """
+
+    def __init__(self, buckets):
+        self.buckets = sorted(buckets)
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._sum = 0.0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        idx = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[idx] += 1
+            self._sum += value
+            self._count += 1
+
+    def quantile(self, q):
+        with self._lock:
+            counts = list(self._counts)
+            total = self._count
+
+        if total == 0:
+            return 0.0
+
+        rank = q * total
+        seen = 0
+        for idx, count in enumerate(counts):
+            if seen + count >= rank and count > 0:
+                if idx == len(self.buckets):
+                    return float(self.buckets[-1])
+                lower = self.buckets[idx - 1] if idx > 0 else 0.0
+                upper = self.buckets[idx]
+                return lower + (upper - lower) * (rank - seen) / count
+            seen += count
+
+        return float(self.buckets[-1])
+
+    def snapshot(self):
+        with self._lock:
+            counts = list(self._counts)
+            total = self._count
+            total_sum = self._sum
+
+        cumulative = []
+        running = 0
+        for bound, count in zip(self.buckets + ["+Inf"], counts):
+            running += count
+            cumulative.append([bound, running])
+
+        return {
+            "count": total,
+            "sum": round(total_sum, 4),
+            "mean": round(total_sum / total, 4) if total else 0.0,
+            "p50": round(self.quantile(0.50), 4),
+            "p95": round(self.quantile(0.95), 4),
+            "p99": round(self.quantile(0.99), 4),
+            "buckets": cumulative
+        }
+
+    def samples(self, labels=None):
+        """Prometheus histogram samples: cumulative buckets, sum, count."""
+        labels = labels or {}
+        with self._lock:
+            counts = list(self._counts)
+            total = self._count
+            total_sum = self._sum
+
+        running = 0
+        for bound, count in zip(self.buckets + ["+Inf"], counts):
+            running += count
+            yield "_bucket", {**labels, "le": bound}, running
+        yield "_sum", labels, total_sum
+        yield "_count", labels, total
+
+# -------------------------
+# COUNTERS / GAUGES
+# -------------------------
+class Counter:
+    """
+    Monotonic count, optionally split by label values:
+
+        errors = Counter(["stage"])
+        errors.inc("decode")
+    """
+
+    kind = "counter"
+
+    def __init__(self, labelnames=()):
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels):
+        with self._lock:
+            return self._values.get(labels, 0)
+
+    def samples(self):
+        with self._lock:
+            items = list(self._values.items())
+        for labels, value in items:
+            yield "", dict(zip(self.labelnames, labels)), value
+
+class Gauge(Counter):
+    """
+    A value that goes up and down. With fn, the value is read when
+    scraped instead: fn returns a number, or {label values tuple: number}
+    for a labelled gauge.
+    """
+
+    kind = "gauge"
+
+    def __init__(self, labelnames=(), fn=None):
+        super().__init__(labelnames)
+        self.fn = fn
+
+    def set(self, *labels, value):
+        with self._lock:
+            self._values[labels] = value
+
+    def dec(self, *labels, amount=1):
+        self.inc(*labels, amount=-amount)
+
+    def samples(self):
+        if self.fn is None:
+            yield from super().samples()
+            return
+        value = self.fn()
+        if not isinstance(value, dict):
+            yield "", {}, value
+            return
+        for labels, v in value.items():
+            yield "", dict(zip(self.labelnames, labels)), v
+
+class CallbackCounter(Gauge):
+    """Exposes a count some other component already keeps (read on scrape)."""
+
+    kind = "counter"
+
+class HistogramVec:
+    """One Histogram per combination of label values, created on first use."""
+
+    kind = "histogram"
+
+    def __init__(self, buckets, labelnames):
+        self.buckets = buckets
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values):
+        child = self._children.get(values)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(values, Histogram(self.buckets))
+        return child
+
+    def observe(self, *labels, value):
+        self.labels(*labels).observe(value)
+
+    def snapshot(self):
+        return {"/".join(k): h.snapshot() for k, h in list(self._children.items())}
+
+    def samples(self):
+        for values, child in list(self._children.items()):
+            yield from child.samples(dict(zip(self.labelnames, values)))
+
+class _HistogramSource:
+    """Adapts a bare Histogram (e.g. the batcher's) for the registry."""
+
+    kind = "histogram"
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def samples(self):
+        return self.histogram.samples()
+
+# -------------------------
+# STAGE TIMING
+# -------------------------
+class _StageTimer:
+    __slots__ = ("stages", "stage", "started")
+
+    def __init__(self, stages, stage):
+        self.stages = stages
+        self.stage = stage
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stages.durations.observe(
+            self.stage, value=(time.perf_counter() - self.started) * 1000.0
+        )
+        if exc_type is not None and not issubclass(exc_type, self.stages.expected):
+            self.stages.errors.inc(self.stage)
+        return False
+
+class StageMetrics:
+    """
+    Wall time and failures per named stage of a request:
+
+        with stages.time("decode"):
+            img = await run_cpu(decode_image, contents)
+
+    A stage that raises is counted under errors[stage] before the
+    exception propagates.
+    """
+
+    def __init__(self, buckets_ms, expected=()):
+        """Exceptions in expected (e.g. load shedding) aren't counted as errors."""
+        self.durations = HistogramVec(buckets_ms, ["stage"])
+        self.errors = Counter(["stage"])
+        self.expected = (asyncio.CancelledError,) + tuple(expected)
+
+    def time(self, stage):
+        return _StageTimer(self, stage)
+
+    async def timed(self, stage, awaitable):
+        """For stages awaited concurrently (asyncio.gather)."""
+        with self.time(stage):
+            return await awaitable
+
+    def snapshot(self):
+        return {
+            "duration_ms": self.durations.snapshot(),
+            "errors": {labels["stage"]: v for _, labels, v in self.errors.samples()}
+        }
+
+# -------------------------
+# REGISTRY / EXPOSITION
+# -------------------------
+def _format_value(value):
+    value = float(value)
+    if value == float("inf"):
+        return "+Inf"
+    return str(int(value)) if value.is_integer() else repr(value)
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items()) + "}"
+
+class Registry:
+    """Named metrics rendered in the Prometheus text exposition format."""
+
+    content_type = "text/plain; version=0.0.4; charset=utf-8"
+
+    def __init__(self, prefix=""):
+        self.prefix = prefix
+        self._metrics = []
+
+    def register(self, name, help_text, metric):
+        if isinstance(metric, Histogram):
+            metric = _HistogramSource(metric)
+        self._metrics.append((self.prefix + name, help_text, metric))
+        return metric
+
+    def render(self):
+        lines = []
+        for name, help_text, metric in self._metrics:
+            try:
+                samples = list(metric.samples())
+            except Exception as e:
+                # One broken source must not take the whole scrape down
+                lines.append(f"# {name} unavailable: {_escape(e)}")
+                continue
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {metric.kind}")
+            for suffix, labels, value in samples:
+                lines.append(f"{name}{suffix}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+# -------------------------
+# REQUEST METRICS (ASGI)
+# -------------------------
+class RequestMetrics:
+    """
+    Pure ASGI middleware: requests by route template and status, latency
+    per route, and requests in flight. Route templates (not raw paths)
+    keep label cardinality bounded; unmatched paths count as "other".
+    Middleware that answers before routing can set scope["route_path"].
+    """
+
+    def __init__(self, app, requests, latency, in_flight):
+        self.app = app
+        self.requests = requests
+        self.latency = latency
+        self.in_flight = in_flight
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = [500]
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        self.in_flight.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            self.in_flight.dec()
+            route = scope.get("route")
+            path = getattr(route, "path", None) or scope.get("route_path", "other")
+            self.latency.observe(path, value=(time.perf_counter() - started) * 1000.0)
+            self.requests.inc(scope["method"], path, str(status[0]))
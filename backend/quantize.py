@@ -0,0 +1,218 @@
+"""
+Builds the INT8 model variant with ONNX Runtime static post-training
+quantization and reports how far it drifts from FP32.
+
+    python -m backend.quantize --calibration data/drift_images/baseline \
+        --eval data/drift_images/kaggle --report int8_report.json
+
+The FP32 ONNX export is created first if it doesn't exist. Activations are
+calibrated on the baseline images (the same distribution drift monitoring
+treats as "normal"); the detection head is left in FP32 because quantizing
+the box/score outputs is where INT8 error hurts most.
+
+Serve the result with CIVISENSE_MODEL_VARIANT=int8.
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import time
+
+import cv2
+import numpy as np
+
+from backend.config import IMG_SIZE, CONF_THRESHOLD, INT8_MODEL_PATH, CIVISENSE_CLASSES
+from backend.inference_backend import OnnxBackend, load_backend, match_detections, preprocess
+from backend.risk_engine import severity_arrays
+from backend.stats_builder import list_images
+
+# -------------------------
+# CALIBRATION
+# -------------------------
+def read_images(image_dir, limit=None):
+    names = list_images(image_dir)[:limit]
+    images = [cv2.imread(os.path.join(image_dir, name)) for name in names]
+    return [img for img in images if img is not None]
+
+def head_nodes(onnx_path):
+    """Nodes of the last /model.N/ block, i.e. the YOLO Detect head."""
+    import onnx
+
+    graph = onnx.load(onnx_path).graph
+    blocks = {}
+    for node in graph.node:
+        m = re.match(r"/model\.(\d+)/", node.name)
+        if m:
+            blocks.setdefault(int(m.group(1)), []).append(node.name)
+    return blocks[max(blocks)] if blocks else []
+
+def quantize(fp32_path, output_path, calibration_images, per_channel=True):
+    from onnxruntime.quantization import (
+        CalibrationDataReader, QuantFormat, QuantType, quantize_static
+    )
+    from onnxruntime.quantization.shape_inference import quant_pre_process
+
+    class Reader(CalibrationDataReader):
+        def __init__(self, images, input_name):
+            self._batches = iter(images)
+            self.input_name = input_name
+
+        def get_next(self):
+            image = next(self._batches, None)
+            if image is None:
+                return None
+            return {self.input_name: preprocess([image], IMG_SIZE)[0]}
+
+    import onnxruntime as ort
+    input_name = ort.InferenceSession(
+        fp32_path, providers=["CPUExecutionProvider"]
+    ).get_inputs()[0].name
+
+    prepped_path = output_path + ".prep.onnx"
+    try:
+        quant_pre_process(fp32_path, prepped_path, skip_symbolic_shape=True)
+    except Exception as e:
+        print(f"Pre-processing skipped ({e})")
+        prepped_path = fp32_path
+
+    try:
+        quantize_static(
+            prepped_path,
+            output_path,
+            Reader(calibration_images, input_name),
+            quant_format=QuantFormat.QDQ,
+            activation_type=QuantType.QUInt8,
+            weight_type=QuantType.QInt8,
+            per_channel=per_channel,
+            nodes_to_exclude=head_nodes(fp32_path)
+        )
+    finally:
+        if prepped_path != fp32_path and os.path.exists(prepped_path):
+            os.remove(prepped_path)
+
+    return output_path
+
+# -------------------------
+# ACCURACY / LATENCY REPORT
+# -------------------------
+def _class_name(cls):
+    return CIVISENSE_CLASSES.get(int(cls), "unknown")
+
+def agreement_report(fp32, int8, images, iou_threshold=0.5):
+    """
+    Runs both models image by image. Detections are paired by same-class
+    IoU; per class we report how many FP32 detections INT8 reproduced, and
+    for matched pairs whether the risk engine lands on the same risk level.
+    """
+    per_class = {}
+    level_agree = level_total = 0
+    severity_diffs = []
+    times = {"fp32": [], "int8": []}
+
+    for image in images:
+        t0 = time.perf_counter()
+        ref = fp32.predict([image])[0]
+        t1 = time.perf_counter()
+        cand = int8.predict([image])[0]
+        t2 = time.perf_counter()
+        times["fp32"].append(t1 - t0)
+        times["int8"].append(t2 - t1)
+
+        pairs, _, _ = match_detections(ref, cand, iou_threshold)
+        matched = {i for i, _ in pairs}
+
+        if pairs:
+            ref_idx, cand_idx = (np.array(idx) for idx in zip(*pairs))
+            ref_sev, ref_levels = severity_arrays(
+                ref.xyxy[ref_idx], ref.conf[ref_idx], ref.cls[ref_idx], image.shape
+            )
+            cand_sev, cand_levels = severity_arrays(
+                cand.xyxy[cand_idx], cand.conf[cand_idx], cand.cls[cand_idx], image.shape
+            )
+            severity_diffs.extend(np.abs(ref_sev - cand_sev).tolist())
+            level_total += len(pairs)
+            level_agree += int((ref_levels == cand_levels).sum())
+
+        for i in range(len(ref.conf)):
+            name = _class_name(ref.cls[i])
+            entry = per_class.setdefault(name, {"fp32": 0, "int8": 0, "matched": 0})
+            entry["fp32"] += 1
+            entry["matched"] += i in matched
+
+        for c in cand.cls.tolist():
+            per_class.setdefault(_class_name(c), {"fp32": 0, "int8": 0, "matched": 0})["int8"] += 1
+
+    for entry in per_class.values():
+        entry["recall_vs_fp32"] = round(entry["matched"] / entry["fp32"], 4) if entry["fp32"] else None
+
+    def latency(samples):
+        ms = np.array(samples or [0.0]) * 1000
+        return {
+            "mean_ms": round(float(ms.mean()), 2),
+            "p50_ms": round(float(np.percentile(ms, 50)), 2),
+            "p95_ms": round(float(np.percentile(ms, 95)), 2)
+        }
+
+    fp32_latency, int8_latency = latency(times["fp32"]), latency(times["int8"])
+    total_ref = sum(e["fp32"] for e in per_class.values())
+    total_matched = sum(e["matched"] for e in per_class.values())
+
+    return {
+        "images": len(images),
+        "detection_agreement": round(total_matched / total_ref, 4) if total_ref else 1.0,
+        "per_class": per_class,
+        "risk_level_agreement": round(level_agree / level_total, 4) if level_total else 1.0,
+        "max_severity_diff": round(max(severity_diffs, default=0.0), 4),
+        "latency": {
+            "fp32": fp32_latency,
+            "int8": int8_latency,
+            "speedup": round(fp32_latency["mean_ms"] / int8_latency["mean_ms"], 2)
+            if int8_latency["mean_ms"] else None
+        }
+    }
+
+# -------------------------
+# CLI
+# -------------------------
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build and evaluate the INT8 model variant")
+    parser.add_argument("--calibration", default="data/drift_images/baseline")
+    parser.add_argument("--calibration-limit", type=int, default=200)
+    parser.add_argument("--eval", default=None, help="Defaults to the calibration directory")
+    parser.add_argument("--eval-limit", type=int, default=100)
+    parser.add_argument("--output", default=INT8_MODEL_PATH)
+    parser.add_argument("--report", default=None, help="Write the report as JSON")
+    parser.add_argument("--per-tensor", action="store_true", help="Per-tensor instead of per-channel weights")
+    parser.add_argument("--conf", type=float, default=CONF_THRESHOLD)
+    parser.add_argument("--skip-build", action="store_true", help="Only evaluate an existing INT8 model")
+    args = parser.parse_args(argv)
+
+    fp32 = load_backend("onnx", variant="fp32", conf=args.conf)
+
+    if not args.skip_build:
+        calibration = read_images(args.calibration, args.calibration_limit)
+        if not calibration:
+            print(f"No calibration images in {args.calibration}")
+            return 1
+        print(f"Calibrating on {len(calibration)} images")
+        quantize(fp32.model_path, args.output, calibration, per_channel=not args.per_tensor)
+        print(f"INT8 model written to {args.output}")
+
+    int8 = OnnxBackend(model_path=args.output, conf=args.conf)
+    report = agreement_report(fp32, int8, read_images(args.eval or args.calibration, args.eval_limit))
+    report["fp32_model"] = fp32.model_path
+    report["int8_model"] = args.output
+    report["size_mb"] = {
+        "fp32": round(os.path.getsize(fp32.model_path) / 1e6, 2),
+        "int8": round(os.path.getsize(args.output) / 1e6, 2)
+    }
+
+    print(json.dumps(report, indent=2))
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,163 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+# -------------------------
+# MODEL FINGERPRINT
+# -------------------------
+def file_digest(path, chunk_size=1 << 20):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+# -------------------------
+# RESULT CACHE
+# -------------------------
+class ResultCache:
+    """
+    Inference results keyed by sha256(upload bytes) + model digest +
+    thresholds. Two tiers: a bounded in-memory LRU and an optional JSON
+    directory on disk. Replacing a model file changes its digest, which
+    clears the memory tier and makes every old disk entry unreachable.
+    Requests served by another model (e.g. the degraded int8 variant) pass
+    its path to key(), so its artifact is fingerprinted the same way.
+    """
+
+    def __init__(self, model_path, params, max_entries=1024, disk_dir=None):
+        self.model_path = model_path
+        self.params = json.dumps(params, sort_keys=True)
+        self.max_entries = max(0, int(max_entries))
+        self.disk_dir = disk_dir or None
+
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        # model path -> (stat, digest)
+        self._models = {}
+
+        self.hits = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+        if self.disk_dir:
+            os.makedirs(self.disk_dir, exist_ok=True)
+
+    @property
+    def enabled(self):
+        return self.max_entries > 0 or self.disk_dir is not None
+
+    # ---- keys ----
+    def _model_version(self, model_path=None):
+        model_path = model_path or self.model_path
+        try:
+            st = os.stat(model_path)
+            stat = (st.st_size, st.st_mtime_ns)
+        except FileNotFoundError:
+            stat = None
+
+        with self._lock:
+            known = self._models.get(model_path)
+            if known is not None and known[0] == stat:
+                return known[1]
+
+        digest = file_digest(model_path) if stat else "missing"
+
+        with self._lock:
+            if known is not None and digest != known[1]:
+                self._entries.clear()
+                self.invalidations += 1
+            self._models[model_path] = (stat, digest)
+            return digest
+
+    def key(self, contents, variant="", model_path=None):
+        """
+        variant separates per-request modes (e.g. tiled, reduced decode) of
+        the same upload; model_path is the artifact serving the request if
+        it isn't the default model.
+        """
+        h = hashlib.sha256(contents)
+        h.update(self._model_version(model_path).encode())
+        h.update(self.params.encode())
+        h.update(variant.encode())
+        return h.hexdigest()
+
+    # ---- tiers ----
+    def _disk_path(self, key):
+        return os.path.join(self.disk_dir, key[:2], f"{key}.json")
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                self.memory_hits += 1
+                return value
+
+        if self.disk_dir:
+            try:
+                with open(self._disk_path(key)) as f:
+                    value = json.load(f)
+            except (FileNotFoundError, ValueError):
+                value = None
+
+            if value is not None:
+                self._remember(key, value)
+                with self._lock:
+                    self.hits += 1
+                    self.disk_hits += 1
+                return value
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def _remember(self, key, value):
+        if self.max_entries == 0:
+            return
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def put(self, key, value):
+        self._remember(key, value)
+
+        if self.disk_dir:
+            path = self._disk_path(key)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+            with os.fdopen(fd, "w") as f:
+                json.dump(value, f)
+            os.replace(tmp_path, path)
+
+    def discard(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+        if self.disk_dir:
+            try:
+                os.remove(self._disk_path(key))
+            except FileNotFoundError:
+                pass
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "disk_tier": self.disk_dir is not None,
+                "hits": self.hits,
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "invalidations": self.invalidations
+            }
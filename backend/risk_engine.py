@@ -1,20 +1,113 @@
-def compute_severity(confidence, box, class_name):
+import numpy as np
+
+from backend.config import IMG_SIZE, CIVISENSE_CLASSES
+
+# -------------------------
+# WEIGHTS
+# -------------------------
+# How much a unit of damaged area matters, per class. Potholes and
+# alligator (fatigue) cracking are structural; linear cracks and rutting
+# come next; surface wear and worn markings matter least.
+CLASS_WEIGHTS = {
+    "Alligator": 0.8,
+    "Edge Cracking": 0.6,
+    "Lateral-Crack": 0.6,
+    "Longitudinal-Crack": 0.6,
+    "Ravelling": 0.4,
+    "Rutting": 0.7,
+    "Striping": 0.3,
+    "pothole": 1.0
+}
+DEFAULT_WEIGHT = 0.5
+
+# severity < 0.05 -> LOW, < 0.15 -> MEDIUM, else HIGH
+LEVEL_EDGES = np.array([0.05, 0.15])
+LEVELS = np.array(["LOW", "MEDIUM", "HIGH"])
+
+# Weight by class id, so a batch is weighted with one fancy-index
+WEIGHT_TABLE = np.array([
+    CLASS_WEIGHTS.get(CIVISENSE_CLASSES.get(i), DEFAULT_WEIGHT)
+    for i in range(max(CIVISENSE_CLASSES) + 1)
+])
+
+# -------------------------
+# BATCH API
+# -------------------------
+def _as_array(values, dtype):
+    # torch tensors (possibly on GPU) as well as arrays and lists
+    if hasattr(values, "detach"):
+        values = values.detach().cpu().numpy()
+    return np.asarray(values, dtype=dtype)
+
+def class_weights(cls):
+    cls = _as_array(cls, np.int64)
+    known = (cls >= 0) & (cls < len(WEIGHT_TABLE))
+    return np.where(known, WEIGHT_TABLE[np.clip(cls, 0, len(WEIGHT_TABLE) - 1)], DEFAULT_WEIGHT)
+
+def _score(xyxy, conf, cls, pixels):
+    area = (xyxy[:, 2] - xyxy[:, 0]) * (xyxy[:, 3] - xyxy[:, 1]) / pixels
+    severity = conf * area * class_weights(cls)
+    levels = LEVELS[np.searchsorted(LEVEL_EDGES, severity, side="right")]
+    return np.round(severity, 4), levels
+
+def severity_arrays(xyxy, conf, cls, image_shape=None):
+    """
+    Severity and risk level for N boxes at once. xyxy is (N, 4) in pixels
+    of an image of (height, width) image_shape (IMG_SIZE square if None).
+    Returns (severity rounded to 4 places, level strings), both length N.
+    """
+    if image_shape is not None:
+        height, width = image_shape[:2]
+    else:
+        height = width = IMG_SIZE
+
+    return _score(
+        _as_array(xyxy, np.float64).reshape(-1, 4),
+        _as_array(conf, np.float64),
+        cls,
+        height * width
+    )
+
+def score_results(results, image_shapes):
+    """
+    severity_arrays over many images' Detections in one pass; returns a
+    (severity, levels) pair per image.
+    """
+    if not results:
+        return []
+
+    counts = [len(r.conf) for r in results]
+    # Per-box area normaliser, so images of different sizes share the pass
+    pixels = np.repeat([shape[0] * shape[1] for shape in image_shapes], counts).astype(np.float64)
+    xyxy = np.concatenate([_as_array(r.xyxy, np.float64).reshape(-1, 4) for r in results])
+    conf = np.concatenate([_as_array(r.conf, np.float64) for r in results])
+    cls = np.concatenate([_as_array(r.cls, np.int64) for r in results])
+
+    severity, levels = _score(xyxy, conf, cls, pixels)
+
+    splits = np.cumsum(counts)[:-1]
+    return list(zip(np.split(severity, splits), np.split(levels, splits)))
+
+# -------------------------
+# SINGLE BOX
+# -------------------------
+def compute_severity(confidence, box, class_name, image_shape=None):
     x1, y1, x2, y2 = box
-    IMG_SIZE = 640
 
-    area = ((x2 - x1) * (y2 - y1)) / (IMG_SIZE * IMG_SIZE)
+    # Area as a fraction of the real frame; (height, width) of the image
+    # the box coordinates refer to
+    if image_shape is not None:
+        height, width = image_shape[:2]
+    else:
+        height = width = IMG_SIZE
 
-    weights = {
-        "pothole": 1.0,
-        "crack": 0.6,
-        "surface_damage": 0.4
-    }
+    area = ((x2 - x1) * (y2 - y1)) / (height * width)
 
-    severity = confidence * area * weights.get(class_name, 0.5)
+    severity = confidence * area * CLASS_WEIGHTS.get(class_name, DEFAULT_WEIGHT)
 
-    if severity < 0.05:
+    if severity < LEVEL_EDGES[0]:
         level = "LOW"
-    elif severity < 0.15:
+    elif severity < LEVEL_EDGES[1]:
         level = "MEDIUM"
     else:
         level = "HIGH"
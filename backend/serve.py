@@ -0,0 +1,131 @@
+"""
+Multi-process server: load the model once, then fork the workers.
+
+    python -m backend.serve --workers 4 --port 8000
+
+The parent imports backend.app (model weights, config, baseline stats),
+runs the one-off database setup, freezes the heap and forks. Workers share
+the loaded weights copy-on-write instead of each loading its own copy, and
+all of them accept on one listening socket.
+
+What doesn't survive fork is rebuilt per worker by app.after_fork(): the
+database connections and writer thread, and ONNX Runtime / OpenVINO sessions,
+whose thread pools live in the parent. Each worker's sessions get its share
+of the cores unless CIVISENSE_INTRA_OP_THREADS is set. Warmup also runs in each worker, on
+startup, so the parent never starts an inference thread pool; /ready
+reports 503 until the worker is warm.
+
+With --workers 1 it serves in-process, like `uvicorn backend.app:app`.
+"""
+import argparse
+import gc
+import os
+import signal
+import socket
+import sys
+
+def bind_socket(host, port, backlog=2048):
+    # An explicit proto, or asyncio skips TCP_NODELAY on accepted
+    # connections and keep-alive responses stall on delayed ACKs
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM, socket.IPPROTO_TCP)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+def serve(app_module, sock, log_level):
+    import uvicorn
+
+    config = uvicorn.Config(app_module.app, log_level=log_level, timeout_graceful_shutdown=10)
+    uvicorn.Server(config).run(sockets=[sock])
+
+def spawn(app_module, sock, log_level, intra_op_threads):
+    pid = os.fork()
+    if pid:
+        return pid
+
+    # Child: uvicorn installs its own handlers for a graceful shutdown
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    code = 0
+    try:
+        app_module.after_fork(intra_op_threads)
+        serve(app_module, sock, log_level)
+    except BaseException as e:
+        print(f"worker {os.getpid()} failed: {e}", file=sys.stderr)
+        code = 1
+    finally:
+        os._exit(code)
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the CIVISENSE API with preloaded, forked workers")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Worker processes (default: CIVISENSE_WORKERS)")
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args()
+
+    from backend import config
+
+    workers = max(1, args.workers or config.WEB_WORKERS)
+
+    # Split the cores between workers unless CIVISENSE_INTRA_OP_THREADS
+    # says otherwise (then the engines were loaded with it already)
+    intra_op_threads = 0
+    if workers > 1 and not config.INTRA_OP_THREADS:
+        intra_op_threads = max(1, (os.cpu_count() or 1) // workers)
+
+    sock = bind_socket(args.host, args.port)
+
+    from backend import app as app_module
+
+    if workers == 1:
+        serve(app_module, sock, args.log_level)
+        return
+
+    app_module.run_setup()
+
+    # Objects created so far live for the whole process; keeping the
+    # collector off them keeps their pages shared with the workers
+    gc.collect()
+    gc.freeze()
+
+    children = {}
+    stopping = False
+
+    def forward(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signum)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, forward)
+    signal.signal(signal.SIGINT, forward)
+
+    for i in range(workers):
+        children[spawn(app_module, sock, args.log_level, intra_op_threads)] = i
+    print(f"CIVISENSE serving on {args.host}:{args.port} with {workers} workers")
+
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+
+        slot = children.pop(pid, None)
+        if slot is None or stopping:
+            continue
+        print(f"worker {pid} exited ({os.waitstatus_to_exitcode(status)}), restarting", file=sys.stderr)
+        children[spawn(app_module, sock, args.log_level, intra_op_threads)] = slot
+
+    sock.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,272 @@
+"""
+Embedded storage backend (CIVISENSE_DB_BACKEND=sqlite): the same data and
+queries as the MongoDB store, in one SQLite file.
+
+Every writer batch is a single transaction: the predictions, their alert
+rows and the analytics counter upserts commit together, so a retried batch
+can't be counted twice. Counters are kept per bucket ("total",
+"day:YYYY-MM-DD", "hour:YYYY-MM-DDTHH") as on Mongo, and alerts are read
+from a (timestamp, id) index, so the analytics endpoints don't scan
+predictions. WAL mode lets the API read while the writer thread (or
+another worker process) writes.
+"""
+import json
+import os
+import sqlite3
+import threading
+import uuid
+from datetime import datetime, timezone
+
+from backend.db import (
+    MODEL_HEALTH, PREDICTIONS,
+    alert_docs, alerts_page, bucket_range, decode_cursor, rollup_increments, summary_response
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS predictions (
+    id TEXT PRIMARY KEY,
+    image_name TEXT,
+    timestamp TEXT NOT NULL,
+    num_detections INTEGER NOT NULL,
+    detections TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS predictions_timestamp ON predictions (timestamp);
+
+CREATE TABLE IF NOT EXISTS model_health (
+    timestamp TEXT NOT NULL,
+    status TEXT,
+    doc TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS model_health_timestamp ON model_health (timestamp);
+
+CREATE TABLE IF NOT EXISTS analytics_counters (
+    bucket TEXT PRIMARY KEY,
+    images INTEGER NOT NULL DEFAULT 0,
+    detections INTEGER NOT NULL DEFAULT 0,
+    high_risk INTEGER NOT NULL DEFAULT 0
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS analytics_classes (
+    bucket TEXT NOT NULL,
+    class TEXT NOT NULL,
+    count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (bucket, class)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS alerts (
+    id TEXT PRIMARY KEY,
+    prediction_id TEXT NOT NULL,
+    image_name TEXT,
+    class TEXT,
+    confidence REAL,
+    severity REAL,
+    timestamp TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS alerts_timestamp ON alerts (timestamp, id);
+"""
+
+def _ts(value):
+    """Datetimes as fixed-width UTC ISO strings, which sort chronologically."""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value.isoformat(timespec="microseconds")
+
+class SQLiteStore:
+    name = "sqlite"
+
+    def __init__(self, path):
+        self.path = path
+        # One connection per thread: the writer thread, request threads
+        self._local = threading.local()
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+            # IMMEDIATE takes the write lock up front, so concurrent writers
+            # wait (up to timeout) instead of failing on lock upgrade
+            conn = sqlite3.connect(self.path, timeout=30.0, isolation_level="IMMEDIATE")
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    def after_fork(self):
+        # Connections must not be shared with the parent; reopen lazily
+        self._local = threading.local()
+
+    # ---- writes ----
+    def _insert_predictions(self, conn, docs):
+        for doc in docs:
+            doc.setdefault("_id", uuid.uuid4().hex)
+        conn.executemany(
+            "INSERT INTO predictions (id, image_name, timestamp, num_detections, detections) "
+            "VALUES (?, ?, ?, ?, ?)",
+            [
+                (doc["_id"], doc.get("image_name"), _ts(doc["timestamp"]),
+                 len(doc.get("detections", [])), json.dumps(doc.get("detections", [])))
+                for doc in docs
+            ]
+        )
+        self._insert_alerts(conn, docs)
+        self._apply_rollup(conn, rollup_increments(docs))
+
+    def _insert_alerts(self, conn, docs):
+        conn.executemany(
+            "INSERT OR IGNORE INTO alerts (id, prediction_id, image_name, class, confidence, severity, timestamp) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [
+                (a["_id"], a["prediction_id"], a["image_name"], a["class"],
+                 a["confidence"], a["severity"], _ts(a["timestamp"]))
+                for a in alert_docs(docs)
+            ]
+        )
+
+    def _apply_rollup(self, conn, increments):
+        counters, classes = [], []
+        for bucket, inc in increments.items():
+            counters.append((bucket, inc.get("images", 0), inc.get("detections", 0), inc.get("high_risk", 0)))
+            for key, count in inc.items():
+                if key.startswith("classes."):
+                    classes.append((bucket, key[len("classes."):], count))
+
+        conn.executemany(
+            "INSERT INTO analytics_counters (bucket, images, detections, high_risk) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT (bucket) DO UPDATE SET images = images + excluded.images, "
+            "detections = detections + excluded.detections, high_risk = high_risk + excluded.high_risk",
+            counters
+        )
+        conn.executemany(
+            "INSERT INTO analytics_classes (bucket, class, count) VALUES (?, ?, ?) "
+            "ON CONFLICT (bucket, class) DO UPDATE SET count = count + excluded.count",
+            classes
+        )
+
+    def _insert_health(self, conn, docs):
+        conn.executemany(
+            "INSERT INTO model_health (timestamp, status, doc) VALUES (?, ?, ?)",
+            [(_ts(doc["timestamp"]), doc.get("status"), json.dumps(doc, default=str)) for doc in docs]
+        )
+
+    def write(self, batch):
+        by_collection = {}
+        for collection, doc in batch:
+            by_collection.setdefault(collection, []).append(doc)
+
+        conn = self._conn()
+        with conn:
+            for collection, docs in by_collection.items():
+                if collection == PREDICTIONS:
+                    self._insert_predictions(conn, docs)
+                elif collection == MODEL_HEALTH:
+                    self._insert_health(conn, docs)
+                else:
+                    raise ValueError(f"Unknown collection: {collection}")
+        batch.clear()
+
+    # ---- derived tables ----
+    def _predictions(self, conn, batch_size=1000):
+        """Stored predictions as writer documents, batch_size at a time."""
+        batch = []
+        for pred_id, image_name, timestamp, detections in conn.execute(
+            "SELECT id, image_name, timestamp, detections FROM predictions"
+        ):
+            batch.append({
+                "_id": pred_id,
+                "image_name": image_name,
+                "timestamp": datetime.fromisoformat(timestamp),
+                "detections": json.loads(detections)
+            })
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def rebuild_analytics_counters(self):
+        """Recomputes the counters from the predictions table."""
+        conn = self._conn()
+        with conn:
+            conn.execute("DELETE FROM analytics_counters")
+            conn.execute("DELETE FROM analytics_classes")
+            for docs in self._predictions(conn):
+                self._apply_rollup(conn, rollup_increments(docs))
+
+    def rebuild_alerts(self):
+        conn = self._conn()
+        with conn:
+            conn.execute("DELETE FROM alerts")
+            for docs in self._predictions(conn):
+                self._insert_alerts(conn, docs)
+
+    def ensure_derived(self):
+        # Schema and indexes are created with the connection; counters and
+        # alerts are written in the same transaction as their predictions
+        self._conn()
+
+    # ---- queries ----
+    def analytics_summary(self):
+        conn = self._conn()
+        row = conn.execute(
+            "SELECT images, high_risk FROM analytics_counters WHERE bucket = 'total'"
+        ).fetchone() or (0, 0)
+        classes = dict(conn.execute("SELECT class, count FROM analytics_classes WHERE bucket = 'total'"))
+        return summary_response(row[0], row[1], classes)
+
+    def analytics_timeseries(self, granularity="day", start=None, end=None):
+        low, high = bucket_range(granularity, start, end)
+        conn = self._conn()
+
+        classes = {}
+        for bucket, name, count in conn.execute(
+            "SELECT bucket, class, count FROM analytics_classes WHERE bucket >= ? AND bucket <= ?", (low, high)
+        ):
+            classes.setdefault(bucket, {})[name] = count
+
+        return [
+            {
+                "bucket": bucket.split(":", 1)[1],
+                "images": images,
+                "detections": detections,
+                "high_risk": high_risk,
+                "classes": classes.get(bucket, {})
+            }
+            for bucket, images, detections, high_risk in conn.execute(
+                "SELECT bucket, images, detections, high_risk FROM analytics_counters "
+                "WHERE bucket >= ? AND bucket <= ? ORDER BY bucket", (low, high)
+            )
+        ]
+
+    def high_risk_alerts(self, limit=5, after=None, start=None, end=None):
+        where, params = [], []
+        if start is not None:
+            where.append("timestamp >= ?")
+            params.append(_ts(start))
+        if end is not None:
+            where.append("timestamp <= ?")
+            params.append(_ts(end))
+        if after:
+            ts, alert_id = decode_cursor(after)
+            where.append("(timestamp, id) < (?, ?)")
+            params += [_ts(ts), alert_id]
+
+        sql = "SELECT id, image_name, class, confidence, severity, timestamp FROM alerts"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY timestamp DESC, id DESC LIMIT ?"
+
+        docs = [
+            {
+                "_id": alert_id,
+                "image_name": image_name,
+                "class": cls,
+                "confidence": confidence,
+                "severity": severity,
+                "timestamp": datetime.fromisoformat(timestamp)
+            }
+            for alert_id, image_name, cls, confidence, severity, timestamp
+            in self._conn().execute(sql, params + [limit])
+        ]
+        return alerts_page(docs, limit)
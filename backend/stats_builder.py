@@ -0,0 +1,161 @@
+"""
+Builds a detection stats summary (the format /model-health and the drift
+detector consume) for a directory of images.
+
+    python -m backend.stats_builder --images data/drift_images/baseline \
+        --output data/drift_images/baseline_stats.json
+
+Images are decoded in a thread pool while the previous batch is on the
+model, and progress is checkpointed so an interrupted run resumes where it
+stopped.
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+from backend.config import (
+    INFERENCE_BACKEND, CIVISENSE_CLASSES,
+    TILE_SIZE, TILE_OVERLAP, TILE_MIN_SIDE, TILE_INCLUDE_FULL, TILE_MERGE_IOU
+)
+from backend.drift import DriftSummary
+from backend.inference_backend import BACKENDS, load_backend
+from backend.tiling import TiledEngine
+
+IMAGE_EXTENSIONS = (".jpg", ".png", ".jpeg")
+
+# -------------------------
+# HELPERS
+# -------------------------
+def list_images(image_dir):
+    return sorted(
+        name for name in os.listdir(image_dir)
+        if name.lower().endswith(IMAGE_EXTENSIONS)
+    )
+
+def write_json_atomic(path, data):
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    with os.fdopen(fd, "w") as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+def load_checkpoint(path):
+    try:
+        with open(path) as f:
+            data = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return set(), DriftSummary()
+    return set(data.get("processed", [])), DriftSummary.from_dict(data.get("summary"))
+
+def result_arrays(result, image_shape):
+    """(confidences, areas, class names) for one Detections result."""
+    height, width = image_shape[:2]
+    xyxy = result.xyxy.astype(np.float64)
+    areas = (xyxy[:, 2] - xyxy[:, 0]) * (xyxy[:, 3] - xyxy[:, 1]) / (height * width)
+    names = [CIVISENSE_CLASSES.get(c, "unknown") for c in result.cls.tolist()]
+    return result.conf.astype(np.float64), areas, names
+
+# -------------------------
+# BUILD
+# -------------------------
+def build_stats(engine, image_dir, batch_size=16, workers=4,
+                checkpoint_path=None, checkpoint_every=10, log=print):
+    names = list_images(image_dir)
+    processed, summary = set(), DriftSummary()
+    if checkpoint_path:
+        processed, summary = load_checkpoint(checkpoint_path)
+
+    todo = [name for name in names if name not in processed]
+    if processed:
+        log(f"Resuming: {len(processed)} done, {len(todo)} to go")
+
+    batches = [todo[i:i + batch_size] for i in range(0, len(todo), batch_size)]
+
+    def decode(name):
+        return cv2.imread(os.path.join(image_dir, name))
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        # Keep the next batch decoding while the current one is inferred
+        pending = pool.map(decode, batches[0]) if batches else None
+
+        for idx, batch in enumerate(batches):
+            images = list(pending)
+            if idx + 1 < len(batches):
+                pending = pool.map(decode, batches[idx + 1])
+
+            readable = [(name, img) for name, img in zip(batch, images) if img is not None]
+            for name, img in zip(batch, images):
+                if img is None:
+                    log(f"Skipping unreadable image: {name}")
+
+            if readable:
+                results = engine.predict([img for _, img in readable])
+                for (_, img), result in zip(readable, results):
+                    summary.update(*result_arrays(result, img.shape))
+
+            processed.update(batch)
+
+            if checkpoint_path and (idx + 1) % checkpoint_every == 0:
+                write_json_atomic(checkpoint_path, {
+                    "processed": sorted(processed),
+                    "summary": summary.to_dict()
+                })
+
+            done = len(processed)
+            rate = done / max(time.perf_counter() - started, 1e-9)
+            log(f"{done}/{len(names)} images ({rate:.1f} img/s)")
+
+    return summary
+
+# -------------------------
+# CLI
+# -------------------------
+def main(argv=None, defaults=None):
+    defaults = defaults or {}
+
+    parser = argparse.ArgumentParser(description="Build detection stats for drift monitoring")
+    parser.add_argument("--images", default=defaults.get("images"), required="images" not in defaults)
+    parser.add_argument("--output", default=defaults.get("output"), required="output" not in defaults)
+    parser.add_argument("--backend", choices=list(BACKENDS), default=INFERENCE_BACKEND)
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--workers", type=int, default=4, help="Image decode threads")
+    parser.add_argument("--checkpoint", default=None, help="Defaults to <output>.ckpt")
+    parser.add_argument("--checkpoint-every", type=int, default=10, help="Batches between checkpoints")
+    parser.add_argument("--tiled", action="store_true", help="Sliced inference for large images")
+    args = parser.parse_args(argv)
+
+    engine = load_backend(args.backend)
+    if args.tiled:
+        engine = TiledEngine(
+            engine, TILE_SIZE, TILE_OVERLAP, TILE_MERGE_IOU,
+            TILE_MIN_SIDE, TILE_INCLUDE_FULL, batch_size=args.batch_size
+        )
+
+    checkpoint_path = args.checkpoint or f"{args.output}.ckpt"
+
+    summary = build_stats(
+        engine,
+        args.images,
+        batch_size=args.batch_size,
+        workers=args.workers,
+        checkpoint_path=checkpoint_path,
+        checkpoint_every=args.checkpoint_every
+    )
+
+    write_json_atomic(args.output, summary.to_dict())
+    if os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+
+    print(f" Stats written to {args.output}")
+    print(f"Images processed: {summary.total_images}")
+    print(f"Detections found: {summary.total_detections}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,264 @@
+"""
+Content-addressed blob storage for uploads and annotation records.
+
+Blobs are named by the sha256 of their bytes and sharded two levels deep
+(root/ab/cd/abcd...), so identical uploads are stored once and no
+directory grows past a few thousand entries. Retention by age and total
+size is enforced by a background sweep, oldest first; putting an existing
+blob again refreshes its age.
+"""
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process locking
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+SWEEP_LOCK = ".sweep.lock"
+
+class BlobStore:
+    def __init__(self, root, max_age_s=0, max_bytes=0, sweep_interval=300.0, suffix=""):
+        """max_age_s / max_bytes of 0 mean no limit."""
+        self.root = root
+        self.max_age_s = max_age_s
+        self.max_bytes = max_bytes
+        self.sweep_interval = sweep_interval
+        self.suffix = suffix
+
+        # digest -> (mtime, size); the retention sweep needs both
+        self._index = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._scanned = False
+
+        self.bytes_written = 0
+        self.objects_written = 0
+        self.dedup_hits = 0
+        self.dedup_bytes_saved = 0
+        self.bytes_evicted = 0
+        self.objects_evicted = 0
+        self.sweeps = 0
+
+        os.makedirs(root, exist_ok=True)
+
+    # ---- layout ----
+    @staticmethod
+    def digest(contents):
+        return hashlib.sha256(contents).hexdigest()
+
+    @staticmethod
+    def valid(digest):
+        return len(digest) == 64 and all(c in "0123456789abcdef" for c in digest)
+
+    def path(self, digest):
+        return os.path.join(self.root, digest[:2], digest[2:4], digest + self.suffix)
+
+    # ---- reads / writes ----
+    def put(self, contents):
+        """Stores contents (once) and returns its digest."""
+        digest = self.digest(contents)
+        path = self.path(digest)
+        now = time.time()
+
+        if os.path.exists(path):
+            try:
+                os.utime(path, (now, now))
+            except FileNotFoundError:
+                pass
+            else:
+                with self._lock:
+                    self._track(digest, now, len(contents))
+                    self.dedup_hits += 1
+                    self.dedup_bytes_saved += len(contents)
+                return digest
+
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(contents)
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            self._track(digest, now, len(contents))
+            self.bytes_written += len(contents)
+            self.objects_written += 1
+        return digest
+
+    def get(self, digest):
+        if not self.valid(digest):
+            return None
+        try:
+            with open(self.path(digest), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def exists(self, digest):
+        return self.valid(digest) and os.path.exists(self.path(digest))
+
+    def _track(self, digest, mtime, size):
+        previous = self._index.get(digest)
+        if previous is not None:
+            self._bytes -= previous[1]
+        self._index[digest] = (mtime, size)
+        self._bytes += size
+
+    # ---- retention ----
+    def scan(self):
+        """
+        Re-index what's on disk, including blobs other worker processes
+        put or removed (run off the request path).
+        """
+        started = time.time()
+        found = {}
+        for dirpath, _, filenames in os.walk(self.root):
+            for name in filenames:
+                if name.endswith(".tmp"):
+                    continue
+                digest = name[:-len(self.suffix)] if self.suffix else name
+                if not self.valid(digest):
+                    continue
+                try:
+                    st = os.stat(os.path.join(dirpath, name))
+                except FileNotFoundError:
+                    continue
+                found[digest] = (st.st_mtime, st.st_size)
+
+        with self._lock:
+            for digest, (mtime, size) in list(self._index.items()):
+                # Gone from disk, unless it was put while scanning
+                if digest not in found and mtime < started:
+                    del self._index[digest]
+                    self._bytes -= size
+            for digest, (mtime, size) in found.items():
+                current = self._index.get(digest)
+                if current is None or current[0] < started:
+                    self._track(digest, mtime, size)
+            self._scanned = True
+
+    def _unlink(self, digest, mtime):
+        """
+        Removes a blob unless it was put again since it was picked, i.e.
+        its mtime moved past `mtime`; returns whether it was removed. The
+        rename makes this safe against puts from other processes too: a put
+        after it finds no file and writes a fresh copy.
+        """
+        path = self.path(digest)
+        evicting = path + ".evict.tmp"
+        try:
+            os.rename(path, evicting)
+        except FileNotFoundError:
+            return True
+
+        st = os.stat(evicting)
+        if st.st_mtime > mtime:
+            # A concurrent rewrite holds the same bytes, so replacing it is harmless
+            os.replace(evicting, path)
+            self._track(digest, st.st_mtime, st.st_size)
+            return False
+        os.remove(evicting)
+        return True
+
+    def sweep(self, now=None):
+        """
+        Evict expired blobs, then the oldest until under max_bytes.
+
+        Worker processes share the directory, so the budget is for all of
+        them: the sweep re-scans the directory first, and only one process
+        sweeps at a time (the others skip their turn).
+        """
+        lock_file = open(os.path.join(self.root, SWEEP_LOCK), "a")
+        try:
+            if fcntl is not None:
+                try:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    return 0
+            self.scan()
+            return self._evict(time.time() if now is None else now)
+        finally:
+            # Closing releases the lock
+            lock_file.close()
+
+    def _evict(self, now):
+        # Under the lock throughout, so a put from this process can't slip
+        # in between picking a victim and unlinking it
+        with self._lock:
+            victims = []
+            if self.max_age_s:
+                cutoff = now - self.max_age_s
+                victims = [d for d, (mtime, _) in self._index.items() if mtime < cutoff]
+
+            over = self._bytes - sum(self._index[d][1] for d in victims) - self.max_bytes
+            if self.max_bytes and over > 0:
+                expired = set(victims)
+                for digest, (_, size) in sorted(self._index.items(), key=lambda kv: kv[1][0]):
+                    if over <= 0:
+                        break
+                    if digest not in expired:
+                        victims.append(digest)
+                        over -= size
+
+            removed = 0
+            for digest in victims:
+                mtime, size = self._index[digest]
+                if not self._unlink(digest, mtime):
+                    continue
+                del self._index[digest]
+                self._bytes -= size
+                self.objects_evicted += 1
+                self.bytes_evicted += size
+                removed += 1
+            self.sweeps += 1
+        return removed
+
+    def _loop(self):
+        self.scan()
+        while not self._stop.is_set():
+            try:
+                self.sweep()
+            except Exception:
+                logger.exception("storage sweep failed for %s", self.root)
+            self._stop.wait(self.sweep_interval)
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._loop, name="civisense-storage-sweep", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+
+    def stats(self):
+        with self._lock:
+            return {
+                "objects": len(self._index),
+                "bytes_stored": self._bytes,
+                "bytes_written": self.bytes_written,
+                "objects_written": self.objects_written,
+                "dedup_hits": self.dedup_hits,
+                "dedup_bytes_saved": self.dedup_bytes_saved,
+                "bytes_evicted": self.bytes_evicted,
+                "objects_evicted": self.objects_evicted,
+                "sweeps": self.sweeps,
+                "indexed": self._scanned,
+                "max_age_s": self.max_age_s,
+                "max_bytes": self.max_bytes
+            }
@@ -0,0 +1,252 @@
+"""
+Video ingestion: decode in a background thread, keep only frames worth
+running the detector on, and collapse per-frame detections into tracks so
+one pothole seen for three seconds is one record, not ninety.
+"""
+import queue
+import threading
+
+import cv2
+import numpy as np
+
+from backend.inference_backend import box_iou
+
+# -------------------------
+# FRAME READER
+# -------------------------
+THUMB_SIZE = (64, 36)
+
+class FrameReader:
+    """
+    Decodes a video file or stream URL on its own thread; get() returns
+    sampled (index, time_s, frame) tuples.
+
+    Sampling is adaptive: never faster than max_fps, and between those
+    slots a frame is only kept if the scene changed (mean absolute
+    difference of a small grayscale thumbnail >= scene_diff) or
+    1 / min_fps seconds passed. Setting `boost` (e.g. while tracks are
+    live) samples at max_fps regardless of scene change. Frames between
+    max_fps slots are grab()bed, not converted. The scene-change check
+    runs in get(), not on the reader thread, so `boost` applies to the
+    very next frame rather than after a queue's worth of lookahead.
+
+    Files apply backpressure when the queue is full; live streams drop the
+    oldest queued frame instead so the reader never falls behind real time.
+    """
+
+    def __init__(self, source, max_fps=5.0, min_fps=0.5, scene_diff=8.0,
+                 queue_size=32, live=False):
+        self.source = source
+        self.min_gap = 1.0 / max_fps if max_fps > 0 else 0.0
+        self.max_gap = 1.0 / min_fps if min_fps > 0 else float("inf")
+        self.scene_diff = scene_diff
+        self.live = live
+        self.boost = False
+
+        self.frames_read = 0
+        self.frames_sampled = 0
+        self.frames_dropped = 0
+        self.fps = None
+        self.error = None
+
+        self._last_index = None
+        self._last_thumb = None
+        self._queue = queue.Queue(maxsize=max(1, queue_size))
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(
+            target=self._loop, name="civisense-video-reader", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def get(self, timeout=None):
+        """Next sampled (index, time_s, frame); None at end of stream."""
+        while True:
+            item = self._sample(self._queue.get(timeout=timeout))
+            if item is not False:
+                return item
+
+    def get_nowait(self):
+        while True:
+            item = self._sample(self._queue.get_nowait())
+            if item is not False:
+                return item
+
+    def _sample(self, item):
+        """The frame to hand out for a queued candidate, or False to skip it."""
+        if item is None:
+            return None
+        index, t, frame, thumb = item
+        recent = self._last_index is not None and self._elapsed(self._last_index, index) < self.max_gap
+        if recent and not self.boost:
+            if float(np.abs(thumb - self._last_thumb).mean()) < self.scene_diff:
+                return False
+        self._last_index, self._last_thumb = index, thumb
+        self.frames_sampled += 1
+        return index, t, frame
+
+    def _elapsed(self, first, last):
+        # From frame counts, so gaps of exactly 1 / fps multiples aren't lost to rounding
+        return (last - first) / self.fps
+
+    # ---- reader thread ----
+    def _put(self, item):
+        while not self._stop.is_set():
+            if self.live and item is not None:
+                try:
+                    self._queue.put_nowait(item)
+                    return
+                except queue.Full:
+                    try:
+                        self._queue.get_nowait()
+                        self.frames_dropped += 1
+                    except queue.Empty:
+                        pass
+            else:
+                try:
+                    self._queue.put(item, timeout=0.1)
+                    return
+                except queue.Full:
+                    continue
+
+    def _loop(self):
+        cap = cv2.VideoCapture(self.source)
+        try:
+            if not cap.isOpened():
+                self.error = f"Cannot open video source: {self.source}"
+                return
+
+            self.fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+            last_index = None
+            index = -1
+
+            while not self._stop.is_set():
+                if not cap.grab():
+                    break
+                index += 1
+                self.frames_read += 1
+                t = index / self.fps
+
+                if last_index is not None and self._elapsed(last_index, index) < self.min_gap:
+                    continue
+
+                ok, frame = cap.retrieve()
+                if not ok:
+                    break
+
+                thumb = cv2.resize(
+                    cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY), THUMB_SIZE,
+                    interpolation=cv2.INTER_AREA
+                ).astype(np.int16)
+
+                last_index = index
+                self._put((index, t, frame, thumb))
+        except Exception as e:
+            self.error = str(e)
+        finally:
+            cap.release()
+            self._put(None)
+
+    def stats(self):
+        return {
+            "fps": self.fps,
+            "frames_read": self.frames_read,
+            "frames_sampled": self.frames_sampled,
+            "frames_dropped": self.frames_dropped
+        }
+
+# -------------------------
+# TRACKING
+# -------------------------
+class Track:
+    def __init__(self, track_id, detection, frame, t):
+        self.id = track_id
+        self.box = detection["bbox"]
+        self.best = detection
+        self.first_frame = self.last_frame = frame
+        self.first_time = self.last_time = t
+        self.hits = 1
+        self.misses = 0
+
+    def update(self, detection, frame, t):
+        self.box = detection["bbox"]
+        self.last_frame, self.last_time = frame, t
+        self.hits += 1
+        self.misses = 0
+        if detection["severity"] > self.best["severity"]:
+            self.best = detection
+
+    def to_dict(self):
+        return {
+            **self.best,
+            "track_id": self.id,
+            "first_frame": self.first_frame,
+            "last_frame": self.last_frame,
+            "first_time_s": round(self.first_time, 3),
+            "last_time_s": round(self.last_time, 3),
+            "frames": self.hits
+        }
+
+class IoUTracker:
+    """
+    Greedy same-class IoU association between consecutive sampled frames.
+    A track ends once it has gone unmatched for both max_age_s seconds and
+    max_misses samples, so sparse sampling (samples further apart than
+    max_age_s) doesn't split a stationary object into one track per
+    sample. Its record carries the most severe detection seen along the way.
+    """
+
+    def __init__(self, iou_threshold=0.3, max_age_s=1.0, max_misses=2):
+        self.iou_threshold = iou_threshold
+        self.max_age_s = max_age_s
+        self.max_misses = max_misses
+        self.active = []
+        self._next_id = 1
+
+    def _expired(self, track, t):
+        return track.misses >= self.max_misses and t - track.last_time > self.max_age_s
+
+    def update(self, frame, t, detections):
+        """Assigns track_id on each detection; returns the tracks that ended."""
+        ended = [tr for tr in self.active if self._expired(tr, t)]
+        self.active = [tr for tr in self.active if not self._expired(tr, t)]
+        unmatched = list(range(len(self.active)))
+
+        for det in sorted(detections, key=lambda d: -d["confidence"]):
+            candidates = [i for i in unmatched if self.active[i].best["class"] == det["class"]]
+            best = None
+            if candidates:
+                ious = box_iou(
+                    np.asarray(det["bbox"], dtype=np.float64),
+                    np.asarray([self.active[i].box for i in candidates], dtype=np.float64)
+                )
+                k = int(np.argmax(ious))
+                if ious[k] >= self.iou_threshold:
+                    best = candidates[k]
+
+            if best is None:
+                track = Track(self._next_id, det, frame, t)
+                self._next_id += 1
+                self.active.append(track)
+            else:
+                track = self.active[best]
+                track.update(det, frame, t)
+                unmatched.remove(best)
+            det["track_id"] = track.id
+
+        for i in unmatched:
+            self.active[i].misses += 1
+        return ended
+
+    def finish(self):
+        ended, self.active = self.active, []
+        return ended
@@ -0,0 +1,182 @@
+import logging
+import queue
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# -------------------------
+# OVERFLOW POLICIES
+# -------------------------
+# block:       wait up to block_timeout for room, then drop
+# drop_newest: reject the incoming document
+# drop_oldest: evict the oldest queued document to make room
+POLICIES = ("block", "drop_newest", "drop_oldest")
+
+# -------------------------
+# BUFFERED WRITER
+# -------------------------
+class BufferedWriter:
+    """
+    Background writer that queues (collection, document) pairs and hands
+    them to flush_fn in batches, when batch_size items are waiting or every
+    flush_interval seconds, whichever comes first.
+
+    Memory is bounded by max_queue; what happens when the sink can't keep
+    up is decided by policy. Failed batches are retried with backoff and
+    then counted as failed. flush_fn may remove the items it has fully
+    written from the list it is given, so a retry only repeats the rest.
+    """
+
+    def __init__(self, flush_fn, batch_size=100, flush_interval=1.0,
+                 max_queue=10000, policy="block", block_timeout=1.0, retries=2):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown writer policy: {policy}")
+
+        self.flush_fn = flush_fn
+        self.batch_size = max(1, int(batch_size))
+        self.flush_interval = flush_interval
+        self.policy = policy
+        self.block_timeout = block_timeout
+        self.retries = retries
+
+        self._queue = queue.Queue(maxsize=max(1, int(max_queue)))
+        self._stop = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+
+        self.queued = 0
+        self.flushed = 0
+        self.failed = 0
+        self.dropped = 0
+        self.batches = 0
+
+    # ---- producer side ----
+    def submit(self, collection, doc):
+        item = (collection, doc)
+
+        if self.policy == "block":
+            try:
+                self._queue.put(item, timeout=self.block_timeout)
+            except queue.Full:
+                self._count("dropped")
+                return False
+        elif self.policy == "drop_newest":
+            try:
+                self._queue.put_nowait(item)
+            except queue.Full:
+                self._count("dropped")
+                return False
+        else:
+            while True:
+                try:
+                    self._queue.put_nowait(item)
+                    break
+                except queue.Full:
+                    try:
+                        self._queue.get_nowait()
+                        self._count("dropped")
+                    except queue.Empty:
+                        pass
+
+        self._count("queued")
+        return True
+
+    def _count(self, name, n=1):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + n)
+
+    # ---- consumer side ----
+    def _drain(self, limit):
+        batch = []
+        while len(batch) < limit:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _write(self, batch):
+        total = len(batch)
+        pending = list(batch)
+        for attempt in range(self.retries + 1):
+            try:
+                self.flush_fn(pending)
+                self._count("flushed", total)
+                self._count("batches")
+                return
+            except Exception:
+                if attempt == self.retries:
+                    logger.exception("buffered writer: dropping %d documents", len(pending))
+                    self._count("flushed", total - len(pending))
+                    self._count("failed", len(pending))
+                    return
+                time.sleep(min(0.1 * 2 ** attempt, 2.0))
+
+    def _loop(self):
+        while not self._stop.is_set():
+            deadline = time.monotonic() + self.flush_interval
+            batch = []
+
+            while len(batch) < self.batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0 or self._stop.is_set():
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=min(timeout, 0.1)))
+                except queue.Empty:
+                    continue
+                batch.extend(self._drain(self.batch_size - len(batch)))
+
+            if batch:
+                self._write(batch)
+
+    def flush(self):
+        """Synchronously write everything queued so far."""
+        while True:
+            batch = self._drain(self.batch_size)
+            if not batch:
+                return
+            self._write(batch)
+
+    # ---- lifecycle ----
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._loop, name="civisense-db-writer", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+    def after_fork(self):
+        """
+        In a forked child: the flush thread didn't survive and the parent's
+        locks may have been held mid-fork, so rebuild them and restart.
+        """
+        running = self._thread is not None
+        self._queue = queue.Queue(maxsize=self._queue.maxsize)
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+        if running:
+            self.start()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "queued": self.queued,
+                "flushed": self.flushed,
+                "failed": self.failed,
+                "dropped": self.dropped,
+                "batches": self.batches,
+                "pending": self._queue.qsize(),
+                "policy": self.policy
+            }
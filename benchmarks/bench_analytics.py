@@ -0,0 +1,226 @@
+"""
+Analytics and alert queries over a large prediction history, per storage
+backend.
+
+    python -m benchmarks.bench_analytics --predictions 1000000 --output bench/analytics.json
+    python -m benchmarks.bench_analytics --stores sqlite mongo --predictions 100000
+
+Seeds synthetic predictions through each store's batched write path, then
+times the queries behind /analytics/summary, /analytics/timeseries and
+/alerts/high-risk next to the $unwind aggregations those endpoints used
+to run over the raw predictions (json_each on SQLite). The mongo store is
+mongomock unless --mongo-uri is given; mongomock is slow to seed, so keep
+it to ~1e5 predictions. A real server gets a scratch database
+(--mongo-db) that is dropped afterwards.
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from benchmarks import common
+
+STORES = ("sqlite", "mongo")
+HIGH_RISK_SHARE = 0.1
+
+# -------------------------
+# SYNTHETIC HISTORY
+# -------------------------
+def prediction_batches(n, days, batch_size, seed=0):
+    """n prediction documents over the last `days` days, oldest first."""
+    from backend.config import CIVISENSE_CLASSES
+
+    rng = random.Random(seed)
+    classes = list(CIVISENSE_CLASSES.values())
+    end = datetime.utcnow().replace(microsecond=0)
+    start = end - timedelta(days=days)
+    step = (end - start) / max(1, n)
+
+    batch = []
+    for i in range(n):
+        detections = []
+        for _ in range(rng.choice((0, 1, 1, 2, 2, 3, 4, 6))):
+            level = "HIGH" if rng.random() < HIGH_RISK_SHARE else rng.choice(("LOW", "MEDIUM"))
+            detections.append({
+                "class": rng.choice(classes),
+                "confidence": round(rng.uniform(0.25, 1.0), 3),
+                "severity": round(rng.uniform(0.0, 1.0), 3),
+                "risk_level": level,
+                "bbox": [10.0, 20.0, 110.0, 140.0]
+            })
+        batch.append(("predictions", {
+            "image_name": f"bench_{i:07d}.jpg",
+            "detections": detections,
+            "timestamp": start + step * i
+        }))
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def seed(store, args):
+    started = time.perf_counter()
+    for batch in prediction_batches(args.predictions, args.days, args.batch_size):
+        store.write(batch)
+    elapsed = time.perf_counter() - started
+    return {
+        "predictions": args.predictions,
+        "batch_size": args.batch_size,
+        "seconds": round(elapsed, 2),
+        "predictions_per_s": round(args.predictions / elapsed, 1)
+    }
+
+# -------------------------
+# $UNWIND BASELINES
+# -------------------------
+def unwind_summary_mongo(store):
+    # What /analytics/summary ran before the counters existed
+    col = store.predictions_col
+    total = col.count_documents({})
+    classes = list(col.aggregate([
+        {"$unwind": "$detections"},
+        {"$group": {"_id": "$detections.class", "count": {"$sum": 1}}},
+        {"$sort": {"count": -1}}
+    ]))
+    high = list(col.aggregate([
+        {"$unwind": "$detections"},
+        {"$match": {"detections.risk_level": "HIGH"}},
+        {"$count": "count"}
+    ]))
+    return total, {row["_id"]: row["count"] for row in classes}, high[0]["count"] if high else 0
+
+def unwind_alerts_mongo(store, limit):
+    return list(store.predictions_col.aggregate([
+        {"$unwind": "$detections"},
+        {"$match": {"detections.risk_level": "HIGH"}},
+        {"$sort": {"timestamp": -1}},
+        {"$limit": limit}
+    ]))
+
+def unwind_summary_sqlite(store):
+    conn = store._conn()
+    total = conn.execute("SELECT count(*) FROM predictions").fetchone()[0]
+    classes = dict(conn.execute(
+        "SELECT json_extract(d.value, '$.class'), count(*) FROM predictions, json_each(predictions.detections) d "
+        "GROUP BY 1 ORDER BY 2 DESC"
+    ))
+    high = conn.execute(
+        "SELECT count(*) FROM predictions, json_each(predictions.detections) d "
+        "WHERE json_extract(d.value, '$.risk_level') = 'HIGH'"
+    ).fetchone()[0]
+    return total, classes, high
+
+def unwind_alerts_sqlite(store, limit):
+    return store._conn().execute(
+        "SELECT p.image_name, json_extract(d.value, '$.class'), p.timestamp "
+        "FROM predictions p, json_each(p.detections) d "
+        "WHERE json_extract(d.value, '$.risk_level') = 'HIGH' ORDER BY p.timestamp DESC LIMIT ?", (limit,)
+    ).fetchall()
+
+UNWIND = {
+    "mongo": (unwind_summary_mongo, unwind_alerts_mongo),
+    "sqlite": (unwind_summary_sqlite, unwind_alerts_sqlite)
+}
+
+# -------------------------
+# QUERIES
+# -------------------------
+def bench_store(store, args):
+    results = {"ingest": seed(store, args)}
+    store.ensure_derived()
+
+    def timed(fn, runs=args.runs):
+        return common.summarize(common.time_calls(fn, runs))
+
+    now = datetime.utcnow()
+    week = now - timedelta(days=7)
+    limit = args.page_size
+
+    # Cursor for a page deep in the history
+    after = None
+    for _ in range(args.deep_page):
+        after = store.high_risk_alerts(limit, after)["next_cursor"]
+        if after is None:
+            break
+
+    results["queries"] = {
+        "summary": timed(store.analytics_summary),
+        "timeseries_day": timed(lambda: store.analytics_timeseries("day")),
+        "timeseries_hour_7d": timed(lambda: store.analytics_timeseries("hour", week, now)),
+        "alerts_first_page": timed(lambda: store.high_risk_alerts(limit)),
+        f"alerts_page_{args.deep_page}": timed(lambda: store.high_risk_alerts(limit, after)),
+        "alerts_7d": timed(lambda: store.high_risk_alerts(limit, None, week, now))
+    }
+
+    unwind_summary, unwind_alerts = UNWIND[store.name]
+    results["unwind"] = {
+        "summary": timed(lambda: unwind_summary(store), args.unwind_runs),
+        "alerts_first_page": timed(lambda: unwind_alerts(store, limit), args.unwind_runs)
+    }
+    results["speedup"] = {
+        name: round(results["unwind"][name]["mean_ms"] / results["queries"][name]["mean_ms"], 1)
+        for name in ("summary", "alerts_first_page")
+    }
+
+    # The counters must agree with a full scan
+    total, classes, high = unwind_summary(store)
+    summary = store.analytics_summary()
+    results["consistent"] = (
+        summary["total_images_processed"] == total
+        and summary["high_risk_detections"] == high
+        and {row["_id"]: row["count"] for row in summary["damage_distribution"]} == classes
+    )
+    return results
+
+# -------------------------
+# CLI
+# -------------------------
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--stores", nargs="+", choices=STORES, default=["sqlite"])
+    parser.add_argument("--predictions", type=int, default=1000000)
+    parser.add_argument("--days", type=int, default=90, help="History the predictions are spread over")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Documents per write batch")
+    parser.add_argument("--page-size", type=int, default=20, help="Alerts per page")
+    parser.add_argument("--deep-page", type=int, default=100, help="Page number for the deep alerts query")
+    parser.add_argument("--runs", type=int, default=50)
+    parser.add_argument("--unwind-runs", type=int, default=3, help="Runs of the full-scan baselines")
+    parser.add_argument("--mongo-uri", default=None, help="Real MongoDB instead of mongomock")
+    parser.add_argument("--mongo-db", default="civisense_bench", help="Scratch database on --mongo-uri")
+    parser.add_argument("--output", default="-", help="JSON report path (- prints it)")
+    args = parser.parse_args()
+
+    if args.mongo_uri is None:
+        common.install_mongo_standin()
+
+    from backend.db import MongoStore
+    from backend.sqlite_store import SQLiteStore
+
+    environment = {"mongo": "real" if args.mongo_uri else "mongomock"}
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        for name in args.stores:
+            print(f"Running {name}...", flush=True)
+            if name == "sqlite":
+                store = SQLiteStore(os.path.join(workdir, "bench.db"))
+            else:
+                store = MongoStore(args.mongo_uri or "mongodb://localhost", args.mongo_db)
+                store.db.client.drop_database(args.mongo_db)
+            try:
+                results[name] = bench_store(store, args)
+            finally:
+                if name == "mongo":
+                    store.db.client.drop_database(args.mongo_db)
+            if name == "sqlite":
+                files = (store.path, store.path + "-wal")
+                results[name]["file_mb"] = round(
+                    sum(os.path.getsize(f) for f in files if os.path.exists(f)) / 2 ** 20, 1
+                )
+
+    common.write_report(common.report("analytics", environment, results, args), args.output)
+
+if __name__ == "__main__":
+    main()
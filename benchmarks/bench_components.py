@@ -0,0 +1,210 @@
+"""
+Micro-benchmarks for the stages behind /predict and the offline stats
+builder, run in-process against the stand-in model and Mongo.
+
+    python -m benchmarks.bench_components --output bench/components.json
+    python -m benchmarks.bench_components --stages decode severity --runs 200
+
+Pass --model (real weights) and/or --mongo-uri to measure against the
+real thing; CIVISENSE_* environment variables apply as when serving.
+"""
+import argparse
+import os
+import tempfile
+
+import cv2
+import numpy as np
+
+from benchmarks import common
+
+STAGES = ("decode", "inference", "severity", "live_stats", "annotation", "stats_builder")
+
+# -------------------------
+# STAGES
+# -------------------------
+def bench_decode(ctx, args):
+    from backend.config import IMG_SIZE
+    from backend.imaging import decode_image, decode_upload
+
+    results = {}
+    for size in args.sizes:
+        contents = common.synthetic_jpeg(*common.parse_size(size))
+        samples = common.time_calls(lambda: decode_image(contents), args.runs)
+        reduced = common.time_calls(lambda: decode_upload(contents, IMG_SIZE), args.runs)
+        results[size] = {
+            "upload_kb": round(len(contents) / 1024, 1),
+            **common.summarize(samples),
+            "reduced": {
+                "decoded_shape": list(decode_upload(contents, IMG_SIZE)[0].shape[:2]),
+                **common.summarize(reduced)
+            }
+        }
+    return results
+
+def bench_inference(ctx, args):
+    engine = ctx["engine"]
+    image = ctx["image"]
+
+    results = {}
+    for batch_size in args.batch_sizes:
+        batch = [image] * batch_size
+        samples = common.time_calls(lambda: engine.predict(batch), max(1, args.runs // batch_size), warmup=2)
+        summary = common.summarize(samples)
+        summary["per_image_ms"] = round(summary["mean_ms"] / batch_size, 3)
+        summary["images_per_s"] = round(1000.0 * batch_size / summary["mean_ms"], 1)
+        results[f"batch_{batch_size}"] = summary
+    results["detections_per_image"] = len(ctx["detections"])
+    return results
+
+def bench_severity(ctx, args):
+    from backend.config import CIVISENSE_CLASSES
+    from backend.risk_engine import compute_severity, severity_arrays
+
+    rng = np.random.default_rng(0)
+    n = args.boxes
+    xy = rng.uniform(0, 500, (n, 2))
+    xyxy = np.hstack([xy, xy + rng.uniform(5, 140, (n, 2))])
+    conf = rng.uniform(0.25, 1.0, n)
+    cls = rng.integers(0, len(CIVISENSE_CLASSES), n)
+    names = [CIVISENSE_CLASSES[c] for c in cls.tolist()]
+    shape = (480, 640)
+
+    def per_box():
+        for box, c, name in zip(xyxy.tolist(), conf.tolist(), names):
+            compute_severity(c, box, name, shape)
+
+    return {
+        "boxes": n,
+        "compute_severity_loop": common.summarize(common.time_calls(per_box, args.runs)),
+        "severity_arrays": common.summarize(
+            common.time_calls(lambda: severity_arrays(xyxy, conf, cls, shape), args.runs)
+        )
+    }
+
+def bench_live_stats(ctx, args):
+    from backend.live_stats import LiveStatsStore
+
+    store = LiveStatsStore(os.path.join(ctx["workdir"], "bench_live_stats.json"), window=100)
+    detections, shape = ctx["detections"], ctx["image"].shape
+
+    return {
+        "detections_per_call": len(detections),
+        "record": common.summarize(common.time_calls(lambda: store.record(detections, shape), args.runs)),
+        "snapshot": common.summarize(common.time_calls(store.snapshot, max(1, args.runs // 10)))
+    }
+
+def bench_annotation(ctx, args):
+    from backend.annotation import Annotator
+    from backend.storage import BlobStore
+
+    root = os.path.join(ctx["workdir"], "bench_annotation")
+    annotator = Annotator(
+        root, BlobStore(os.path.join(root, "uploads")),
+        BlobStore(os.path.join(root, "records"), suffix=".json")
+    )
+    contents, detections = ctx["contents"], ctx["detections"]
+
+    # Every register gets distinct detections so each render is cold
+    counter = iter(range(10 ** 9))
+
+    def register():
+        return annotator.register(contents, [{**d, "run": next(counter)} for d in detections])
+
+    def cold_render():
+        annotator.render(Annotator.parse_id(os.path.basename(register())))
+
+    hot_id = Annotator.parse_id(os.path.basename(register()))
+    return {
+        "detections": len(detections),
+        "register": common.summarize(common.time_calls(register, args.runs)),
+        "render_cold": common.summarize(common.time_calls(cold_render, args.runs)),
+        "render_cached": common.summarize(common.time_calls(lambda: annotator.render(hot_id), args.runs))
+    }
+
+def bench_stats_builder(ctx, args):
+    from backend.stats_builder import build_stats
+
+    image_dir = os.path.join(ctx["workdir"], "bench_images")
+    os.makedirs(image_dir, exist_ok=True)
+    width, height = common.parse_size(args.sizes[0])
+    for i in range(args.images):
+        with open(os.path.join(image_dir, f"{i:05d}.jpg"), "wb") as f:
+            f.write(common.synthetic_jpeg(width, height, seed=i))
+
+    samples = common.time_calls(
+        lambda: build_stats(ctx["engine"], image_dir, batch_size=args.batch_sizes[-1], log=lambda *_: None),
+        runs=max(1, args.runs // 20), warmup=0
+    )
+    summary = common.summarize(samples)
+    summary["images"] = args.images
+    summary["images_per_s"] = round(1000.0 * args.images / summary["mean_ms"], 1)
+    return summary
+
+BENCHES = {
+    "decode": bench_decode,
+    "inference": bench_inference,
+    "severity": bench_severity,
+    "live_stats": bench_live_stats,
+    "annotation": bench_annotation,
+    "stats_builder": bench_stats_builder
+}
+
+# -------------------------
+# CLI
+# -------------------------
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=list(STAGES))
+    parser.add_argument("--sizes", nargs="+", default=["640x480", "1920x1080", "4000x3000"])
+    parser.add_argument("--batch-sizes", nargs="+", type=int, default=[1, 8])
+    parser.add_argument("--runs", type=int, default=40)
+    parser.add_argument("--boxes", type=int, default=300, help="Boxes for the severity stage")
+    parser.add_argument("--images", type=int, default=64, help="Images for the stats_builder stage")
+    parser.add_argument("--model", default=None, help="Real weights instead of the stand-in")
+    parser.add_argument("--mongo-uri", default=None, help="Real MongoDB instead of mongomock")
+    parser.add_argument("--output", default="-", help="JSON report path (- prints it)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        environment = common.setup(workdir, args.model, args.mongo_uri)
+
+        from backend.inference_backend import load_backend
+        from backend.risk_engine import score_results
+        from backend.config import CIVISENSE_CLASSES
+
+        contents = common.synthetic_jpeg(*common.parse_size(args.sizes[0]))
+        image = cv2.imdecode(np.frombuffer(contents, np.uint8), cv2.IMREAD_COLOR)
+        engine = load_backend()
+
+        # Detections in the /predict response format, from one real pass
+        result = engine.predict([image])[0]
+        (severity, levels), = score_results([result], [image.shape])
+        detections = [{
+            "class": CIVISENSE_CLASSES.get(c, "unknown"),
+            "confidence": round(p, 3),
+            "severity": s,
+            "risk_level": level,
+            "bbox": box
+        } for box, p, c, s, level in zip(
+            result.xyxy.tolist(), result.conf.tolist(), result.cls.tolist(),
+            severity.tolist(), levels.tolist()
+        )]
+
+        ctx = {
+            "workdir": workdir,
+            "engine": engine,
+            "contents": contents,
+            "image": image,
+            "detections": detections
+        }
+        environment["engine"] = engine.name
+
+        results = {}
+        for stage in args.stages:
+            print(f"Running {stage}...", flush=True)
+            results[stage] = BENCHES[stage](ctx, args)
+
+    common.write_report(common.report("components", environment, results, args), args.output)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Per-request image handling cost: the old PIL decode -> re-encode to disk ->
+cv2.imread -> annotate path versus the single-decode path in backend.imaging.
+
+    python -m benchmarks.bench_image_pipeline --sizes 640x480 1920x1080 --runs 30
+"""
+import argparse
+import io
+import json
+import os
+import statistics
+import tempfile
+import time
+
+import cv2
+from PIL import Image
+
+from backend import imaging
+from benchmarks.common import synthetic_jpeg
+from backend.storage import BlobStore
+
+DETECTIONS = [
+    {"class": "pothole", "confidence": 0.81, "bbox": [40, 60, 220, 200]},
+    {"class": "Longitudinal-Crack", "confidence": 0.52, "bbox": [300, 50, 340, 400]}
+]
+
+def legacy_path(contents, workdir):
+    pil_img = Image.open(io.BytesIO(contents)).convert("RGB")
+    upload_path = os.path.join(workdir, "legacy_upload.jpg")
+    pil_img.save(upload_path)
+
+    image = cv2.imread(upload_path)
+    imaging.draw_detections(image, DETECTIONS)
+    cv2.imwrite(os.path.join(workdir, "legacy_out.jpg"), image)
+
+def single_decode_path(contents, workdir):
+    image = imaging.decode_image(contents)
+    BlobStore(os.path.join(workdir, "uploads")).put(contents)
+
+    imaging.draw_detections(image, DETECTIONS)
+    cv2.imwrite(os.path.join(workdir, "out.jpg"), image)
+
+def time_ms(fn, contents, workdir, runs):
+    fn(contents, workdir)  # warm caches
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        fn(contents, workdir)
+        samples.append((time.perf_counter() - started) * 1000.0)
+    return statistics.median(samples)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", nargs="+", default=["640x480", "1920x1080", "3840x2160"])
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--json", action="store_true", help="Print JSON only")
+    args = parser.parse_args()
+
+    report = []
+    with tempfile.TemporaryDirectory() as workdir:
+        for size in args.sizes:
+            width, height = map(int, size.lower().split("x"))
+            contents = synthetic_jpeg(width, height)
+
+            legacy = time_ms(legacy_path, contents, workdir, args.runs)
+            current = time_ms(single_decode_path, contents, workdir, args.runs)
+
+            report.append({
+                "size": size,
+                "upload_kb": round(len(contents) / 1024, 1),
+                "legacy_ms": round(legacy, 2),
+                "single_decode_ms": round(current, 2),
+                "saving_ms": round(legacy - current, 2),
+                "speedup": round(legacy / current, 2) if current else None
+            })
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    for row in report:
+        print(
+            f"{row['size']:>10} | upload={row['upload_kb']:>7} KB | "
+            f"legacy={row['legacy_ms']:>8} ms | single-decode={row['single_decode_ms']:>8} ms | "
+            f"x{row['speedup']}"
+        )
+
+if __name__ == "__main__":
+    main()
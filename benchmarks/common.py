@@ -0,0 +1,233 @@
+"""
+Shared pieces for the benchmark scripts: synthetic road images, offline
+stand-ins for the model and MongoDB, latency summaries and JSON reports.
+
+Stand-ins must be installed before anything under backend/ is imported,
+since the backend reads its config and connects to Mongo at import time:
+
+    from benchmarks import common
+    common.setup(workdir)          # tiny model, mongomock, scratch dirs
+    from backend import app
+"""
+import json
+import os
+import platform
+import subprocess
+import time
+from datetime import datetime, timezone
+
+import cv2
+import numpy as np
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Untrained weights score everything near zero; this threshold gives a
+# stable few dozen boxes per image so the per-detection stages do work
+STANDIN_CONF_THRESHOLD = 0.001
+
+# -------------------------
+# SYNTHETIC IMAGES
+# -------------------------
+def synthetic_image(width, height, seed=0):
+    """
+    Asphalt-grey noise with a lighting gradient, a few dark blobs and
+    thin dark polylines, i.e. roughly what potholes and cracks look like
+    to the decoder and the detector's first layers.
+    """
+    rng = np.random.default_rng(seed)
+    gradient = np.linspace(70, 150, width, dtype=np.float32)[None, :, None]
+    img = np.clip(gradient + rng.normal(0, 18, (height, width, 3)), 0, 255).astype(np.uint8)
+
+    scale = max(width, height) / 640
+    for _ in range(rng.integers(1, 4)):
+        center = (int(rng.integers(0, width)), int(rng.integers(0, height)))
+        axes = (int(rng.integers(15, 60) * scale), int(rng.integers(10, 40) * scale))
+        cv2.ellipse(img, center, axes, float(rng.uniform(0, 180)), 0, 360, (35, 35, 40), -1)
+    for _ in range(rng.integers(1, 5)):
+        points = np.cumsum(rng.normal(0, 25 * scale, (8, 2)), axis=0)
+        points += (rng.integers(0, width), rng.integers(0, height))
+        cv2.polylines(img, [points.astype(np.int32)], False, (25, 25, 25), max(1, int(2 * scale)))
+    return img
+
+def synthetic_jpeg(width, height, seed=0, quality=90):
+    ok, encoded = cv2.imencode(
+        ".jpg", synthetic_image(width, height, seed), [cv2.IMWRITE_JPEG_QUALITY, quality]
+    )
+    return encoded.tobytes()
+
+def parse_size(size):
+    width, height = map(int, size.lower().split("x"))
+    return width, height
+
+# -------------------------
+# STAND-INS
+# -------------------------
+def build_tiny_model(path, seed=0):
+    """
+    Randomly initialised YOLOv8n with the 8 CIVISENSE classes: the same
+    architecture and cost as a real checkpoint, no download, same weights
+    every time for a given seed.
+    """
+    import torch
+    from ultralytics import YOLO
+    from ultralytics.nn.tasks import DetectionModel
+
+    from backend.config import CIVISENSE_CLASSES
+
+    torch.manual_seed(seed)
+    model = YOLO("yolov8n.yaml")
+    model.model = DetectionModel("yolov8n.yaml", nc=len(CIVISENSE_CLASSES), verbose=False)
+    model.model.names = dict(CIVISENSE_CLASSES)
+    model.save(path)
+    return path
+
+def standin_bulk_write(self, requests, ordered=True, **kwargs):
+    """
+    Replacement for mongomock's Collection.bulk_write, which predates
+    pymongo 4's request objects: applies the operations the backend uses
+    one by one, collecting duplicate-key errors the way an unordered bulk
+    write reports them.
+    """
+    import pymongo.errors
+
+    errors = []
+    for index, request in enumerate(requests):
+        kind = type(request).__name__
+        try:
+            if kind == "InsertOne":
+                self.insert_one(request._doc)
+            elif kind == "UpdateOne":
+                self.update_one(request._filter, request._doc, upsert=request._upsert)
+            elif kind == "UpdateMany":
+                self.update_many(request._filter, request._doc, upsert=request._upsert)
+            else:
+                raise NotImplementedError(kind)
+        except pymongo.errors.DuplicateKeyError as e:
+            errors.append({"index": index, "code": 11000, "errmsg": str(e)})
+            if ordered:
+                break
+    if errors:
+        raise pymongo.errors.BulkWriteError({"writeErrors": errors})
+
+def install_mongo_standin():
+    """Routes every MongoClient to one shared in-memory mongomock client."""
+    import mongomock
+    import mongomock.collection
+    import pymongo
+
+    shared = mongomock.MongoClient()
+    pymongo.MongoClient = lambda *args, **kwargs: shared
+    mongomock.collection.Collection.bulk_write = standin_bulk_write
+    return shared
+
+def setup(workdir, model_path=None, mongo_uri=None):
+    """
+    Points the backend at offline stand-ins and keeps everything it writes
+    under workdir. A real model and/or Mongo URI can be given instead.
+    Returns a dict describing what was used, for the report.
+    """
+    os.makedirs(workdir, exist_ok=True)
+
+    # config only reads the environment; the modules that import from it
+    # pick up whatever is patched here as long as they load afterwards
+    from backend import config
+
+    standin = model_path is None
+    if standin:
+        model_path = build_tiny_model(os.path.join(workdir, "standin.pt"))
+        if "CIVISENSE_CONF_THRESHOLD" not in os.environ:
+            config.CONF_THRESHOLD = STANDIN_CONF_THRESHOLD
+    stem = os.path.splitext(model_path)[0]
+    config.MODEL_PATH = model_path
+    config.ONNX_MODEL_PATH = stem + ".onnx"
+    config.OPENVINO_MODEL_DIR = stem + "_openvino_model"
+    config.INT8_MODEL_PATH = stem + ".int8.onnx"
+
+    if mongo_uri:
+        config.MONGO_URI = mongo_uri
+    else:
+        install_mongo_standin()
+    config.SQLITE_PATH = os.path.join(workdir, "civisense.db")
+
+    config.UPLOAD_DIR = os.path.join(workdir, "uploads")
+    config.OUTPUT_DIR = os.path.join(workdir, "outputs")
+    config.JOBS_DIR = os.path.join(workdir, "job_results")
+    config.LIVE_STATS_PATH = os.path.join(workdir, "live_stats.json")
+    config.RESULT_CACHE_DIR = ""
+
+    return {
+        "model": "standin-yolov8n" if standin else model_path,
+        "db_backend": config.DB_BACKEND,
+        "mongo": "real" if mongo_uri else "mongomock",
+        "backend": config.INFERENCE_BACKEND,
+        "variant": config.MODEL_VARIANT,
+        "conf_threshold": config.CONF_THRESHOLD
+    }
+
+# -------------------------
+# MEASUREMENT
+# -------------------------
+def time_calls(fn, runs, warmup=1):
+    """Milliseconds per call of fn(), after warmup calls."""
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000.0)
+    return samples
+
+def summarize(samples_ms):
+    if not samples_ms:
+        return {"count": 0}
+    values = np.asarray(samples_ms, dtype=np.float64)
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {
+        "count": int(values.size),
+        "mean_ms": round(float(values.mean()), 3),
+        "p50_ms": round(float(p50), 3),
+        "p95_ms": round(float(p95), 3),
+        "p99_ms": round(float(p99), 3),
+        "min_ms": round(float(values.min()), 3),
+        "max_ms": round(float(values.max()), 3)
+    }
+
+# -------------------------
+# REPORTS
+# -------------------------
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=REPO_DIR,
+            capture_output=True, text=True, timeout=10
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+def report(benchmark, environment, results, args=None):
+    return {
+        "benchmark": benchmark,
+        "commit": git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "host": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count()
+        },
+        "environment": environment,
+        "args": vars(args) if args is not None else {},
+        "results": results
+    }
+
+def write_report(data, path):
+    """Writes the report to path ("-" prints it) so runs can be diffed across commits."""
+    text = json.dumps(data, indent=2)
+    if path == "-":
+        print(text)
+        return
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    with open(path, "w") as f:
+        f.write(text + "\n")
+    print(f"Report written to {path}")
@@ -0,0 +1,177 @@
+"""
+Concurrent HTTP load generator for the serving path.
+
+    # Starts benchmarks.standin_server itself and sweeps concurrency
+    python -m benchmarks.load_test --concurrency 1 8 32 --duration 15 --output bench/load.json
+
+    # Against a running server
+    python -m benchmarks.load_test --url http://127.0.0.1:8000 --scenarios predict model-health
+
+Every scenario runs for --duration seconds at each concurrency level with
+that many closed-loop clients (each sends its next request as soon as the
+previous one returns). Reports throughput and p50/p95/p99 latency.
+"""
+import argparse
+import asyncio
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+
+import httpx
+
+from benchmarks import common
+
+# name -> (method, path); POST scenarios upload a synthetic JPEG
+SCENARIOS = {
+    "predict": ("POST", "/predict"),
+    "predict-cached": ("POST", "/predict"),
+    "predict-no-annotate": ("POST", "/predict?annotate=false"),
+    "model-health": ("GET", "/model-health"),
+    "analytics-summary": ("GET", "/analytics/summary"),
+    "alerts": ("GET", "/alerts/high-risk"),
+}
+
+# -------------------------
+# SERVER
+# -------------------------
+def start_standin_server(port, workers, log_path):
+    log = open(log_path, "w")
+    process = subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.standin_server", "--port", str(port), "--workers", str(workers)],
+        cwd=common.REPO_DIR, stdout=log, stderr=subprocess.STDOUT
+    )
+    return process, log
+
+def stop_server(process):
+    process.send_signal(signal.SIGTERM)
+    try:
+        process.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+async def wait_ready(url, timeout, process=None):
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient(timeout=5.0) as client:
+        while time.monotonic() < deadline:
+            if process is not None and process.poll() is not None:
+                raise RuntimeError("server exited during startup")
+            try:
+                if (await client.get(f"{url}/ready")).status_code == 200:
+                    return
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.5)
+    raise TimeoutError(f"{url} not ready after {timeout}s")
+
+# -------------------------
+# LOAD
+# -------------------------
+async def run_level(url, scenario, concurrency, duration, images):
+    method, path = SCENARIOS[scenario]
+    latencies, statuses = [], Counter()
+    sent = 0
+    deadline = time.monotonic() + duration
+
+    async def client_loop(client):
+        nonlocal sent
+        while time.monotonic() < deadline:
+            kwargs = {}
+            if method == "POST":
+                if scenario == "predict-cached":
+                    body = images[0]
+                else:
+                    # Bytes after the JPEG end marker are ignored by decoders but
+                    # change the content hash, so no request hits the result cache
+                    body = images[sent % len(images)] + sent.to_bytes(8, "little")
+                kwargs["files"] = {"image": (f"bench_{sent}.jpg", body, "image/jpeg")}
+            sent += 1
+
+            started = time.perf_counter()
+            try:
+                response = await client.request(method, path, **kwargs)
+                statuses[response.status_code] += 1
+            except httpx.HTTPError as e:
+                statuses[type(e).__name__] += 1
+                continue
+            if response.status_code < 400:
+                latencies.append((time.perf_counter() - started) * 1000.0)
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=120.0) as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(client_loop(client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    return {
+        "concurrency": concurrency,
+        "duration_s": round(elapsed, 2),
+        "requests": sum(statuses.values()),
+        "ok": len(latencies),
+        "statuses": {str(k): v for k, v in sorted(statuses.items(), key=lambda kv: str(kv[0]))},
+        "throughput_rps": round(len(latencies) / elapsed, 2),
+        "latency": common.summarize(latencies)
+    }
+
+async def run_all(args, url, images):
+    results = {}
+    for scenario in args.scenarios:
+        results[scenario] = []
+        for concurrency in args.concurrency:
+            level = await run_level(url, scenario, concurrency, args.duration, images)
+            latency = level["latency"]
+            print(
+                f"{scenario:>20} c={concurrency:<4} {level['throughput_rps']:>8} req/s  "
+                f"p50={latency.get('p50_ms')} p95={latency.get('p95_ms')} p99={latency.get('p99_ms')} ms  "
+                f"errors={level['requests'] - level['ok']}",
+                flush=True
+            )
+            results[scenario].append(level)
+    return results
+
+# -------------------------
+# CLI
+# -------------------------
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--url", default=None, help="Target server (default: start the stand-in server)")
+    parser.add_argument("--port", type=int, default=8100, help="Port for the stand-in server")
+    parser.add_argument("--workers", type=int, default=1, help="Worker processes for the stand-in server")
+    parser.add_argument("--scenarios", nargs="+", choices=list(SCENARIOS),
+                        default=["predict", "model-health", "analytics-summary"])
+    parser.add_argument("--concurrency", nargs="+", type=int, default=[1, 8, 32])
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds per scenario and level")
+    parser.add_argument("--images", type=int, default=16, help="Synthetic images to draw uploads from")
+    parser.add_argument("--size", default="640x480")
+    parser.add_argument("--ready-timeout", type=float, default=300.0)
+    parser.add_argument("--output", default="-", help="JSON report path (- prints it)")
+    args = parser.parse_args()
+
+    width, height = common.parse_size(args.size)
+    images = [common.synthetic_jpeg(width, height, seed=i) for i in range(max(1, args.images))]
+
+    process = log = None
+    url = args.url
+    environment = {"target": url}
+    if url is None:
+        url = f"http://127.0.0.1:{args.port}"
+        log_path = os.path.join(tempfile.gettempdir(), f"civisense_standin_{args.port}.log")
+        process, log = start_standin_server(args.port, args.workers, log_path)
+        environment = {"target": "standin_server", "workers": args.workers, "server_log": log_path}
+
+    try:
+        asyncio.run(wait_ready(url, args.ready_timeout, process))
+        results = asyncio.run(run_all(args, url, images))
+    finally:
+        if process is not None:
+            stop_server(process)
+            log.close()
+
+    common.write_report(common.report("load", environment, results, args), args.output)
+
+if __name__ == "__main__":
+    main()
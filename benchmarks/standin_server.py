@@ -0,0 +1,38 @@
+"""
+The CIVISENSE API on the offline stand-ins (tiny model, mongomock,
+scratch directories), for load testing without weights or a database.
+
+    python -m benchmarks.standin_server --port 8100 --workers 2
+
+Serves through backend.serve, so --workers > 1 forks preloaded workers
+exactly as in production (each with its own in-memory Mongo).
+"""
+import argparse
+import sys
+import tempfile
+
+from benchmarks import common
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--model", default=None, help="Real weights instead of the stand-in")
+    parser.add_argument("--mongo-uri", default=None, help="Real MongoDB instead of mongomock")
+    parser.add_argument("--log-level", default="warning")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        common.setup(workdir, args.model, args.mongo_uri)
+
+        from backend import serve
+
+        sys.argv = [
+            "backend.serve", "--host", args.host, "--port", str(args.port),
+            "--workers", str(args.workers), "--log-level", args.log_level
+        ]
+        serve.main()
+
+if __name__ == "__main__":
+    main()
@@ -6,6 +6,10 @@ import pandas as pd
 
 BACKEND_URL = "http://127.0.0.1:8000"
 
+def metric_value(value):
+    # Area metrics are None when the baseline's areas are in other units
+    return "n/a" if value is None else round(value, 3)
+
 st.set_page_config(
     page_title="CIVISENSE Dashboard",
     layout="wide"
@@ -59,7 +63,7 @@ with tab1:
                         df = pd.DataFrame(result["detections"])
                         st.dataframe(df)
 
-                        if "annotated_image" in result:
+                        if result.get("annotated_image"):
                             st.image(
                                 f"{BACKEND_URL}{result['annotated_image']}",
                                 caption="Annotated Output",
@@ -94,7 +98,7 @@ with tab2:
                 )
                 col3.metric(
                     "Area Drift",
-                    round(health["area_drift"], 3)
+                    metric_value(health["area_drift"])
                 )
 
                 st.metric(
@@ -102,6 +106,21 @@ with tab2:
                     round(health["frequency_drift"], 3)
                 )
 
+                col4, col5, col6, col7 = st.columns(4)
+                col4.metric("Confidence PSI", round(health["confidence_psi"], 3))
+                col5.metric("Confidence KS", round(health["confidence_ks"], 3))
+                col6.metric("Area PSI", metric_value(health["area_psi"]))
+                col7.metric("Area KS", metric_value(health["area_ks"]))
+
+                if health.get("class_drift"):
+                    st.caption(
+                        f"Class mix distance: {health['class_drift']['distance']}"
+                    )
+                    df_classes = pd.DataFrame(
+                        health["class_drift"]["per_class"]
+                    ).T
+                    st.dataframe(df_classes)
+
                 status = health["status"]
                 if status == "STABLE":
                     st.success(" Model Stable")
@@ -0,0 +1,82 @@
+from fastapi import FastAPI, File, UploadFile
+from fastapi.testclient import TestClient
+
+from backend.admission import AdmissionController, AdmissionMiddleware
+
+def test_queue_full_is_429():
+    controller = AdmissionController(max_pending=2, deadline_ms=0)
+    assert controller.check() is None
+    controller.pending = 2
+    status, reason, retry_after = controller.check()
+    assert (status, reason) == (429, "queue_full")
+    assert retry_after >= 1
+
+def test_deadline_uses_the_wait_estimate():
+    controller = AdmissionController(max_pending=0, deadline_ms=100, estimate_wait_ms=lambda n: 40.0 * n)
+    controller.pending = 1
+    assert controller.check(100) is None
+    controller.pending = 3
+    assert controller.check(100)[:2] == (503, "deadline")
+
+def test_header_can_only_tighten_the_deadline():
+    controller = AdmissionController(deadline_ms=1000)
+    assert controller.request_deadline_ms({}) == 1000
+    assert controller.request_deadline_ms({b"x-deadline-ms": b"250"}) == 250
+    assert controller.request_deadline_ms({b"x-deadline-ms": b"5000"}) == 1000
+    assert controller.request_deadline_ms({b"x-deadline-ms": b"soon"}) == 1000
+
+def test_degraded_past_the_threshold():
+    controller = AdmissionController(max_pending=8, degrade_at=0.75)
+    controller.pending = 5
+    assert not controller.degraded()
+    controller.pending = 6
+    assert controller.degraded()
+    assert not AdmissionController(max_pending=0).degraded()
+
+def upload_app(limit):
+    app = FastAPI()
+    received = []
+
+    @app.post("/predict")
+    async def predict(image: UploadFile = File(...)):
+        received.append(len(await image.read()))
+        return {"bytes": received[-1]}
+
+    controller = AdmissionController(max_pending=0, deadline_ms=0)
+    app.add_middleware(AdmissionMiddleware, controller=controller, max_body_bytes=limit)
+    return TestClient(app), controller, received
+
+def multipart(size, chunk=4096):
+    boundary = b"civisense"
+    head = (b"--" + boundary + b'\r\nContent-Disposition: form-data; name="image"; filename="a.jpg"'
+            b"\r\nContent-Type: image/jpeg\r\n\r\n")
+    body = head + b"\xff" * size + b"\r\n--" + boundary + b"--\r\n"
+    chunks = (body[i:i + chunk] for i in range(0, len(body), chunk))
+    return chunks, {"content-type": "multipart/form-data; boundary=civisense"}
+
+def test_declared_content_length_over_the_limit_is_413():
+    client, controller, received = upload_app(limit=10000)
+    response = client.post("/predict", files={"image": ("a.jpg", b"\xff" * 20000, "image/jpeg")})
+    assert response.status_code == 413
+    assert controller.rejected["too_large"] == 1
+    assert received == []
+
+def test_chunked_body_is_cut_off_past_the_limit():
+    client, controller, received = upload_app(limit=10000)
+    chunks, headers = multipart(50000)
+    response = client.post("/predict", content=chunks, headers=headers)
+
+    assert response.status_code == 413
+    assert response.json()["max_bytes"] == 10000
+    assert controller.rejected["too_large"] == 1
+    assert controller.pending == 0
+    assert received == []
+
+def test_chunked_body_under_the_limit_is_passed_through():
+    client, controller, received = upload_app(limit=10000)
+    chunks, headers = multipart(5000)
+    response = client.post("/predict", content=chunks, headers=headers)
+
+    assert response.status_code == 200
+    assert received == [5000]
+    assert controller.rejected["too_large"] == 0
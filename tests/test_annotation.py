@@ -0,0 +1,174 @@
+import os
+
+import cv2
+import numpy as np
+
+from backend.annotation import Annotator
+from backend.storage import BlobStore
+
+def jpeg(seed=0, size=64):
+    rng = np.random.default_rng(seed)
+    ok, encoded = cv2.imencode(".jpg", rng.integers(0, 255, (size, size, 3), dtype=np.uint8))
+    return encoded.tobytes()
+
+def png(seed=0, size=64):
+    rng = np.random.default_rng(seed)
+    ok, encoded = cv2.imencode(".png", rng.integers(0, 255, (size, size, 3), dtype=np.uint8))
+    return encoded.tobytes()
+
+def detection(x1=5, y1=5, x2=40, y2=40):
+    return {"class": "pothole", "confidence": 0.9, "bbox": [x1, y1, x2, y2]}
+
+def make_annotator(tmp_path, **kwargs):
+    output_dir = str(tmp_path / "outputs")
+    sources = BlobStore(str(tmp_path / "uploads"), suffix=".jpg")
+    records = BlobStore(os.path.join(output_dir, "records"), suffix=".json")
+    return Annotator(output_dir, sources, records, **kwargs)
+
+def ann_id(url):
+    return Annotator.parse_id(os.path.basename(url))
+
+def test_register_does_not_render(tmp_path):
+    annotator = make_annotator(tmp_path)
+    url = annotator.register(jpeg(), [detection()])
+
+    assert url.startswith("/outputs/") and url.endswith(".jpg")
+    assert annotator.exists(url)
+    assert annotator.stats()["renders"] == 0
+    assert not os.path.exists(annotator._rendered_path(ann_id(url)))
+
+def test_render_draws_once_then_serves_from_cache(tmp_path):
+    annotator = make_annotator(tmp_path)
+    url = annotator.register(jpeg(), [detection()])
+
+    path = annotator.render(ann_id(url))
+    assert path == annotator._rendered_path(ann_id(url))
+    assert cv2.imread(path) is not None
+    assert annotator.render(ann_id(url)) == path
+
+    stats = annotator.stats()
+    assert stats["renders"] == 1
+    assert stats["cache_hits"] == 1
+    assert stats["rendered_bytes"] == os.path.getsize(path)
+
+def test_register_deduplicates_identical_results(tmp_path):
+    annotator = make_annotator(tmp_path)
+    contents = jpeg()
+
+    first = annotator.register(contents, [detection()])
+    assert annotator.register(contents, [detection()]) == first
+    assert annotator.register(contents, [detection(x2=50)]) != first
+    assert annotator.register(jpeg(seed=1), [detection()]) != first
+
+    assert annotator.sources.stats()["objects"] == 2
+    assert annotator.records.stats()["objects"] == 3
+    assert annotator.stats()["registered"] == 4
+
+def test_register_reuses_a_stored_source(tmp_path):
+    annotator = make_annotator(tmp_path)
+    contents = jpeg()
+    digest = annotator.sources.put(contents)
+
+    assert annotator.register(contents, [detection()], digest) == annotator.register(contents, [detection()])
+    assert annotator.sources.stats()["objects_written"] == 1
+
+def test_render_cache_evicts_least_recently_used(tmp_path):
+    # Rendering is deterministic, so measure the sizes on a scratch copy
+    scratch = make_annotator(tmp_path / "scratch")
+    sizes = [
+        os.path.getsize(scratch.render(ann_id(scratch.register(jpeg(seed=i), [detection()]))))
+        for i in range(3)
+    ]
+
+    annotator = make_annotator(tmp_path, cache_bytes=sizes[0] + sizes[1])
+    ids = [ann_id(annotator.register(jpeg(seed=i), [detection()])) for i in range(3)]
+    annotator.render(ids[0])
+    annotator.render(ids[1])
+    # Touch the first so the second is now the oldest
+    annotator.render(ids[0])
+    annotator.cache_bytes = sizes[0] + sizes[2]
+    annotator.render(ids[2])
+
+    assert os.path.exists(annotator._rendered_path(ids[0]))
+    assert not os.path.exists(annotator._rendered_path(ids[1]))
+    assert os.path.exists(annotator._rendered_path(ids[2]))
+    stats = annotator.stats()
+    assert stats["evictions"] == 1
+    assert stats["rendered_images"] == 2
+    assert stats["rendered_bytes"] <= annotator.cache_bytes
+
+    # An evicted image is drawn again on the next request
+    assert annotator.render(ids[1]) is not None
+    assert annotator.stats()["renders"] == 4
+
+def test_render_keeps_the_latest_image_over_budget(tmp_path):
+    annotator = make_annotator(tmp_path, cache_bytes=1)
+    first = ann_id(annotator.register(jpeg(seed=0), [detection()]))
+    second = ann_id(annotator.register(jpeg(seed=1), [detection()]))
+
+    annotator.render(first)
+    assert os.path.exists(annotator.render(second))
+    assert not os.path.exists(annotator._rendered_path(first))
+    assert annotator.stats()["rendered_images"] == 1
+
+def test_rendered_cache_survives_restart(tmp_path):
+    annotator = make_annotator(tmp_path)
+    url = annotator.register(jpeg(), [detection()])
+    path = annotator.render(ann_id(url))
+
+    restarted = make_annotator(tmp_path)
+    assert restarted.stats()["rendered_images"] == 1
+    assert restarted.render(ann_id(url)) == path
+    assert restarted.stats()["renders"] == 0
+
+def test_no_detections_serves_the_jpeg_upload(tmp_path):
+    annotator = make_annotator(tmp_path)
+    contents = jpeg()
+    url = annotator.register(contents, [])
+
+    path = annotator.render(ann_id(url))
+    assert path == annotator.sources.path(annotator.sources.digest(contents))
+    assert annotator.stats()["renders"] == 0
+
+def test_no_detections_still_renders_non_jpeg_uploads(tmp_path):
+    annotator = make_annotator(tmp_path)
+    path = annotator.render(ann_id(annotator.register(png(), [])))
+
+    with open(path, "rb") as f:
+        assert f.read(3) == b"\xff\xd8\xff"
+    assert annotator.stats()["renders"] == 1
+
+def test_render_returns_none_when_the_source_is_gone(tmp_path):
+    annotator = make_annotator(tmp_path)
+    contents = jpeg()
+    url = annotator.register(contents, [detection()])
+    os.remove(annotator.sources.path(annotator.sources.digest(contents)))
+
+    assert annotator.render(ann_id(url)) is None
+
+def test_legacy_output_names_are_not_annotation_ids(tmp_path):
+    # Files written before rendering was lazy sit directly in OUTPUT_DIR
+    # under other names; the /outputs route falls back to them
+    annotator = make_annotator(tmp_path)
+
+    assert Annotator.parse_id("road_20240101_120000.jpg") is None
+    assert Annotator.parse_id("../" + "a" * 64 + ".jpg") is None
+    assert not annotator.exists("/outputs/road_20240101_120000.jpg")
+    assert not annotator.exists(None)
+    assert annotator.render("0" * 64) is None
+
+def test_prerender_worker_draws_registered_images(tmp_path):
+    annotator = make_annotator(tmp_path, prerender=True)
+    annotator.start()
+    try:
+        url = annotator.register(jpeg(), [detection()])
+        path = annotator._rendered_path(ann_id(url))
+        for _ in range(100):
+            if annotator.stats()["renders"]:
+                break
+            annotator._stop.wait(0.05)
+    finally:
+        annotator.stop()
+
+    assert os.path.exists(path)
+    assert annotator.stats()["prerender_pending"] == 0
@@ -0,0 +1,196 @@
+import asyncio
+import importlib
+import io
+import json
+import os
+import sys
+import time
+import zipfile
+
+import pytest
+from fastapi.testclient import TestClient
+from starlette.requests import ClientDisconnect
+
+from benchmarks import common
+
+mongomock = pytest.importorskip("mongomock")
+
+@pytest.fixture(scope="module")
+def backend_app(tmp_path_factory):
+    import mongomock.collection
+    import pymongo
+
+    with pytest.MonkeyPatch.context() as mp:
+        # Put back what setup() patches once this module is done
+        mp.setattr(pymongo, "MongoClient", pymongo.MongoClient)
+        mp.setattr(mongomock.collection.Collection, "bulk_write",
+                   mongomock.collection.Collection.bulk_write)
+        # The backend reads its config at import time, and collecting the
+        # other test modules has already imported parts of it
+        for name in [m for m in sys.modules if m == "backend" or m.startswith("backend.")]:
+            mp.delitem(sys.modules, name)
+
+        common.setup(str(tmp_path_factory.mktemp("backend")))
+        yield importlib.import_module("backend.app")
+
+def test_outputs_serves_lazily_rendered_images(backend_app):
+    url = backend_app.annotator.register(common.synthetic_jpeg(64, 48), [
+        {"class": "pothole", "confidence": 0.9, "bbox": [4, 4, 30, 30]}
+    ])
+    client = TestClient(backend_app.app)
+
+    response = client.get(url)
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "image/jpeg"
+    assert response.content[:3] == b"\xff\xd8\xff"
+    assert backend_app.output_exists(url)
+
+def test_outputs_falls_back_to_legacy_files(backend_app):
+    name = "road_20240101_120000.jpg"
+    with open(os.path.join(backend_app.OUTPUT_DIR, name), "wb") as f:
+        f.write(b"legacy")
+    client = TestClient(backend_app.app)
+
+    response = client.get(f"/outputs/{name}")
+    assert response.status_code == 200
+    assert response.content == b"legacy"
+    assert backend_app.output_exists(f"/outputs/{name}")
+
+    # An annotation id that was never registered is not found either way
+    assert client.get(f"/outputs/{'0' * 64}.jpg").status_code == 404
+    assert client.get("/outputs/missing.jpg").status_code == 404
+    assert not backend_app.output_exists("/outputs/missing.jpg")
+
+@pytest.fixture(scope="module")
+def client(backend_app):
+    # Startup/shutdown once per module: shutdown closes the worker pools
+    with TestClient(backend_app.app) as client:
+        yield client
+
+def ndjson(response):
+    return [json.loads(line) for line in response.text.splitlines() if line]
+
+def roads_zip():
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w") as zf:
+        zf.writestr("a.jpg", common.synthetic_jpeg(320, 240, seed=1))
+        zf.writestr("b.jpg", common.synthetic_jpeg(320, 240, seed=2))
+        zf.writestr("corrupt.jpg", b"\xff\xd8\xff not really a jpeg")
+        zf.writestr("readme.txt", b"skipped")
+    return buf.getvalue()
+
+def test_ready_is_503_until_warmup_has_run(backend_app, request):
+    # Before startup nothing has been warmed up
+    response = TestClient(backend_app.app).get("/ready")
+    assert response.status_code == 503
+    assert response.json()["ready"] is False
+
+    # Startup warms up in the background and serves /ready meanwhile
+    client = request.getfixturevalue("client")
+    for _ in range(600):
+        response = client.get("/ready")
+        if response.status_code == 200:
+            break
+        time.sleep(0.1)
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["ready"] is True and body["error"] is None
+    assert body["warmup_ms"] > 0
+    assert backend_app.batcher.recent_batch_ms > 0
+    assert "civisense_ready 1" in client.get("/metrics").text.splitlines()
+
+def test_batch_job_reports_unreadable_entries_and_resumes(backend_app, client):
+    files = [("files", ("roads.zip", roads_zip(), "application/zip"))]
+
+    response = client.post("/predict/batch", files=files)
+    assert response.status_code == 200
+    job_id = response.headers["x-job-id"]
+    events = ndjson(response)
+    assert events[0] == {"event": "job", "job_id": job_id, "skipping": 0}
+    results = {e["name"]: e for e in events if e["event"] == "result"}
+    assert sorted(results) == ["roads.zip/a.jpg", "roads.zip/b.jpg", "roads.zip/corrupt.jpg"]
+    assert results["roads.zip/corrupt.jpg"]["error"] == "unreadable image"
+    assert "num_detections" in results["roads.zip/a.jpg"]
+    summary = events[-1]
+    assert (summary["event"], summary["status"]) == ("summary", "completed")
+    assert (summary["processed"], summary["failed"], summary["runs"]) == (2, 1, 1)
+    assert backend_app.jobs._jobs == {}
+
+    # Posting the same upload again skips everything already recorded
+    resumed = ndjson(client.post(f"/predict/batch?job_id={job_id}", files=files))
+    assert resumed[0]["skipping"] == 3
+    assert [e for e in resumed if e["event"] == "result"] == []
+    assert (resumed[-1]["processed"], resumed[-1]["failed"], resumed[-1]["runs"]) == (2, 1, 2)
+
+    replay = client.get(f"/predict/batch/{job_id}/results?offset=2")
+    assert [json.loads(line)["name"] for line in replay.text.splitlines()] == ["roads.zip/corrupt.jpg"]
+
+def test_batch_job_already_running_is_409(backend_app, client):
+    job = backend_app.jobs.create()
+    backend_app.jobs.start(job)
+    try:
+        files = [("files", ("a.jpg", common.synthetic_jpeg(64, 48), "image/jpeg"))]
+        response = client.post(f"/predict/batch?job_id={job.id}", files=files)
+        assert response.status_code == 409
+    finally:
+        backend_app.jobs.finish(job)
+
+    assert client.get(f"/predict/batch/{job.id}").json()["status"] == "interrupted"
+    assert client.post(f"/predict/batch?job_id={'0' * 32}", files=files).status_code == 404
+
+def test_batch_job_is_released_when_the_stream_never_starts(backend_app):
+    job = backend_app.jobs.create()
+    assert backend_app.jobs.start(job)
+
+    async def never_iterated():
+        yield "\n"
+
+    async def receive():
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        raise OSError("client went away")
+
+    response = backend_app.BatchJobResponse(never_iterated(), job, media_type="application/x-ndjson")
+    scope = {"type": "http", "asgi": {"spec_version": "2.4"}, "method": "POST", "headers": []}
+    with pytest.raises(ClientDisconnect):
+        asyncio.run(response(scope, receive, send))
+
+    assert job.id not in backend_app.jobs._jobs
+    assert backend_app.jobs.get(job.id).status == "interrupted"
+
+def test_worker_share_of_threads_is_applied_after_fork(backend_app):
+    import torch
+
+    before = torch.get_num_threads()
+    try:
+        backend_app.engine.after_fork(1)
+        assert torch.get_num_threads() == 1
+        # 0 keeps what the engine was loaded with
+        torch.set_num_threads(before)
+        backend_app.engine.after_fork(0)
+        assert torch.get_num_threads() == before
+    finally:
+        torch.set_num_threads(before)
+
+def test_model_health_reads_the_baseline_once_and_logs_once(backend_app, client, monkeypatch):
+    from backend import drift
+
+    def reparsed(*args, **kwargs):
+        raise AssertionError("baseline parsed per request")
+
+    monkeypatch.setattr(drift.DriftSummary, "from_dict", reparsed)
+    logged = []
+    monkeypatch.setattr(backend_app, "health_logger", backend_app.HealthLogger(logged.append, interval=3600))
+
+    responses = [client.get("/model-health") for _ in range(5)]
+    assert {r.status_code for r in responses} == {200}
+    assert len({r.json()["status"] for r in responses}) == 1
+    assert len(logged) == 1
+
+def test_model_health_without_a_baseline_is_503(backend_app, client, monkeypatch):
+    monkeypatch.setattr(backend_app, "baseline_summary", None)
+    response = client.get("/model-health")
+    assert response.status_code == 503
+    assert response.json() == {"error": "no baseline stats to compare against"}
@@ -0,0 +1,97 @@
+import asyncio
+import time
+
+import pytest
+
+from backend.batching import BatchScheduler, DeadlineExceeded
+
+def run(coro):
+    return asyncio.run(coro)
+
+async def with_scheduler(predict_fn, body, **kwargs):
+    scheduler = BatchScheduler(predict_fn, **kwargs)
+    await scheduler.start()
+    try:
+        return await body(scheduler)
+    finally:
+        await scheduler.stop()
+
+def test_concurrent_submits_share_a_batch_and_keep_order():
+    calls = []
+
+    def predict(images):
+        calls.append(list(images))
+        return [image * 10 for image in images]
+
+    async def body(scheduler):
+        return await asyncio.gather(*(scheduler.submit(i) for i in range(5)))
+
+    results = run(with_scheduler(predict, body, max_batch_size=8, max_wait_ms=50))
+    assert results == [0, 10, 20, 30, 40]
+    assert calls == [[0, 1, 2, 3, 4]]
+
+def test_batches_are_capped_at_max_batch_size():
+    sizes = []
+
+    def predict(images):
+        sizes.append(len(images))
+        return images
+
+    async def body(scheduler):
+        return await asyncio.gather(*(scheduler.submit(i) for i in range(7)))
+
+    assert run(with_scheduler(predict, body, max_batch_size=3, max_wait_ms=20)) == list(range(7))
+    assert max(sizes) <= 3 and sum(sizes) == 7
+
+def test_predict_error_fails_every_request_in_the_batch():
+    def predict(images):
+        raise ValueError("boom")
+
+    async def body(scheduler):
+        return await asyncio.gather(
+            *(scheduler.submit(i) for i in range(3)), return_exceptions=True
+        )
+
+    results = run(with_scheduler(predict, body, max_wait_ms=20))
+    assert all(isinstance(r, ValueError) for r in results)
+
+def test_short_result_list_fails_the_batch_instead_of_hanging():
+    def predict(images):
+        return images[:-1]
+
+    async def body(scheduler):
+        return await asyncio.wait_for(
+            asyncio.gather(*(scheduler.submit(i) for i in range(3)), return_exceptions=True),
+            timeout=2.0
+        )
+
+    results = run(with_scheduler(predict, body, max_wait_ms=20))
+    assert len(results) == 3
+    assert all(isinstance(r, RuntimeError) for r in results)
+
+def test_expired_deadline_skips_the_forward_pass():
+    calls = []
+
+    def predict(images):
+        calls.append(images)
+        return images
+
+    async def body(scheduler):
+        with pytest.raises(DeadlineExceeded):
+            await scheduler.submit(1, deadline=time.perf_counter() - 1.0)
+        return await scheduler.submit(2)
+
+    assert run(with_scheduler(predict, body, max_wait_ms=5)) == 2
+    assert calls == [[2]]
+
+def test_submit_requires_start():
+    scheduler = BatchScheduler(lambda images: images)
+    with pytest.raises(RuntimeError):
+        run(scheduler.submit(1))
+
+def test_estimated_wait_rounds_up_to_whole_batches():
+    scheduler = BatchScheduler(lambda images: images, max_batch_size=4)
+    assert scheduler.estimated_wait_ms(10) == 0.0
+    scheduler.recent_batch_ms = 20.0
+    assert scheduler.estimated_wait_ms(1) == 20.0
+    assert scheduler.estimated_wait_ms(9) == 60.0
@@ -0,0 +1,92 @@
+import json
+
+import numpy as np
+import pytest
+
+from backend.config import BASELINE_STATS_PATH
+from backend.drift import (
+    AREA_EDGES, AREA_NORMALIZATION, CONFIDENCE_EDGES, LEGACY_AREA_NORMALIZATION,
+    MIN_DRIFT_SAMPLES, DriftSummary, Histogram, compare, ks_statistic, psi
+)
+
+def histogram(values, edges=CONFIDENCE_EDGES):
+    h = Histogram(edges)
+    h.update(values)
+    return h
+
+def test_histogram_clamps_out_of_range_values():
+    h = histogram([-1.0, 0.0, 0.5, 1.0, 2.0])
+    assert h.total == 5
+    assert h.counts[0] == 2
+    assert h.counts[-1] == 2
+
+def test_merge_rejects_different_edges():
+    with pytest.raises(ValueError):
+        Histogram(CONFIDENCE_EDGES).merge(Histogram(AREA_EDGES[:5]))
+
+def test_psi_and_ks_are_zero_for_identical_distributions():
+    rng = np.random.default_rng(0)
+    values = rng.uniform(0.3, 0.9, 1000)
+    a, b = histogram(values), histogram(values)
+    assert abs(psi(a, b)) < 1e-9
+    assert ks_statistic(a, b) == 0.0
+
+def test_psi_and_ks_grow_with_a_shift():
+    rng = np.random.default_rng(0)
+    base = histogram(rng.normal(0.7, 0.05, 2000))
+    near = histogram(rng.normal(0.7, 0.05, 2000))
+    far = histogram(rng.normal(0.4, 0.05, 2000))
+    assert psi(base, near) < 0.1
+    assert psi(base, far) > 0.25
+    assert ks_statistic(base, far) > 0.9
+
+def test_empty_side_reports_no_drift():
+    assert psi(Histogram(CONFIDENCE_EDGES), histogram([0.5])) == 0.0
+    assert ks_statistic(Histogram(CONFIDENCE_EDGES), histogram([0.5])) == 0.0
+
+def summary(confidences, areas, images):
+    s = DriftSummary()
+    s.update(confidences, areas, images=images)
+    return s
+
+def test_compare_is_stable_for_the_same_data():
+    rng = np.random.default_rng(1)
+    conf, area = rng.uniform(0.5, 0.9, 500), rng.uniform(0.01, 0.05, 500)
+    report = compare(summary(conf, area, 250), summary(conf, area, 250))
+    assert report["status"] == "STABLE"
+
+def test_compare_escalates_on_psi_only_with_enough_samples():
+    rng = np.random.default_rng(2)
+    baseline = summary(rng.normal(0.8, 0.03, 500), np.full(500, 0.02), 250)
+
+    few = summary(rng.normal(0.6, 0.03, MIN_DRIFT_SAMPLES - 1), np.full(MIN_DRIFT_SAMPLES - 1, 0.02), 15)
+    many = summary(rng.normal(0.75, 0.03, 500), np.full(500, 0.02), 250)
+
+    assert compare(baseline, many)["status"] == "RETRAIN_SUGGESTED"
+    assert compare(baseline, many)["confidence_psi"] > 0.25
+    # Too few live detections: PSI is reported but doesn't drive status
+    assert compare(baseline, few)["confidence_psi"] > 0.25
+
+def test_area_normalization_round_trips_and_defaults_to_legacy():
+    s = summary([0.5], [0.1], 1)
+    assert DriftSummary.from_dict(s.to_dict()).area_normalization == AREA_NORMALIZATION
+    legacy = DriftSummary.from_dict({"total_images": 1, "confidences": [0.5], "areas": [0.1]})
+    assert legacy.area_normalization == LEGACY_AREA_NORMALIZATION
+
+def test_summaries_in_different_area_units_are_not_mixed():
+    rng = np.random.default_rng(3)
+    conf = rng.uniform(0.5, 0.9, 500)
+    frame = summary(conf, rng.uniform(0.01, 0.05, 500), 250)
+    legacy = DriftSummary(LEGACY_AREA_NORMALIZATION)
+    legacy.update(conf, rng.uniform(0.5, 2.0, 500), images=250)
+
+    report = compare(frame, legacy)
+    assert report["area_drift"] is None and report["area_psi"] is None and report["area_ks"] is None
+    assert report["status"] == "STABLE"
+
+    with pytest.raises(ValueError):
+        frame.copy().merge(legacy)
+
+def test_shipped_baseline_is_per_frame():
+    with open(BASELINE_STATS_PATH) as f:
+        assert DriftSummary.from_dict(json.load(f)).area_normalization == AREA_NORMALIZATION
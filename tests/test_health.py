@@ -0,0 +1,87 @@
+import json
+
+import pytest
+
+from backend import health
+from backend.config import BASELINE_STATS_PATH
+from backend.drift import DriftSummary
+from backend.health import HealthLogger, compute_health, load_baseline
+from backend.live_stats import LiveStatsStore
+
+def detections(n, confidence=0.8, box=(0, 0, 100, 100)):
+    return [{"class": "pothole", "confidence": confidence, "bbox": list(box)} for _ in range(n)]
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(health.time, "monotonic", lambda: now[0])
+    return now
+
+def test_load_baseline_summarizes_the_stats_file():
+    baseline = load_baseline(BASELINE_STATS_PATH)
+    with open(BASELINE_STATS_PATH) as f:
+        raw = json.load(f)
+
+    assert isinstance(baseline, DriftSummary)
+    assert baseline.to_dict() == DriftSummary.from_dict(raw).to_dict()
+    assert baseline.total_detections > 0
+
+def test_load_baseline_without_a_file_is_none(tmp_path):
+    assert load_baseline(str(tmp_path / "baseline_stats.json")) is None
+
+def test_compute_health_without_a_baseline_is_none(tmp_path):
+    live = LiveStatsStore(str(tmp_path / "live.json"))
+    live.record(detections(3), (640, 640))
+    assert compute_health(None, live) is None
+
+def test_compute_health_uses_the_recent_window(tmp_path):
+    live = LiveStatsStore(str(tmp_path / "live.json"), window=2)
+    baseline = DriftSummary()
+    baseline.update([0.8] * 4, [100 * 100 / (640 * 640)] * 4, images=2)
+
+    live.record(detections(2, confidence=0.2), (640, 640))
+    for _ in range(2):
+        live.record(detections(2), (640, 640))
+
+    result = compute_health(baseline, live)
+    # Only the last two images count towards the means
+    assert result["confidence_drift"] == 0.0
+    assert result["area_drift"] == 0.0
+    assert result["live_detections"] == 6
+    assert result["status"] == "STABLE"
+
+def test_compute_health_with_no_live_detections(tmp_path):
+    live = LiveStatsStore(str(tmp_path / "live.json"))
+    result = compute_health(load_baseline(BASELINE_STATS_PATH), live)
+
+    assert result["live_detections"] == 0
+    assert result["confidence_psi"] == 0.0
+    assert result["confidence_ks"] == 0.0
+    assert result["status"] in ("STABLE", "WARNING", "RETRAIN_SUGGESTED")
+
+def test_health_logger_logs_once_per_interval(clock):
+    logged = []
+    logger = HealthLogger(logged.append, interval=60.0)
+
+    assert logger.maybe_log({"status": "STABLE", "n": 1})
+    for n in range(2, 6):
+        clock[0] += 10
+        assert not logger.maybe_log({"status": "STABLE", "n": n})
+    assert [r["n"] for r in logged] == [1]
+
+    clock[0] += 20
+    assert logger.maybe_log({"status": "STABLE", "n": 6})
+    assert [r["n"] for r in logged] == [1, 6]
+
+def test_health_logger_logs_status_changes_at_once(clock):
+    logged = []
+    logger = HealthLogger(logged.append, interval=60.0)
+
+    logger.maybe_log({"status": "STABLE"})
+    clock[0] += 1
+    assert logger.maybe_log({"status": "WARNING"})
+    clock[0] += 1
+    assert not logger.maybe_log({"status": "WARNING"})
+    clock[0] += 1
+    assert logger.maybe_log({"status": "STABLE"})
+    assert [r["status"] for r in logged] == ["STABLE", "WARNING", "STABLE"]
@@ -0,0 +1,43 @@
+import io
+
+import cv2
+import numpy as np
+import pytest
+
+from backend.imaging import (
+    UnsupportedImage, UploadTooLarge, decode_image, decode_upload, jpeg_size,
+    read_upload, sniff_image_type
+)
+
+def jpeg(width, height):
+    image = np.full((height, width, 3), 90, dtype=np.uint8)
+    cv2.rectangle(image, (10, 10), (width // 2, height // 2), (30, 30, 30), -1)
+    return cv2.imencode(".jpg", image)[1].tobytes()
+
+def test_sniffing():
+    assert sniff_image_type(jpeg(32, 32)) == "jpeg"
+    assert sniff_image_type(b"RIFF\0\0\0\0WEBPVP8 ") == "webp"
+    assert sniff_image_type(b"%PDF-1.7") is None
+
+def test_read_upload_refuses_non_images_and_oversize():
+    with pytest.raises(UnsupportedImage):
+        read_upload(io.BytesIO(b"not an image" * 100), 0, chunk_size=16)
+    data = jpeg(64, 64)
+    with pytest.raises(UploadTooLarge):
+        read_upload(io.BytesIO(data), len(data) - 1, chunk_size=16)
+    assert bytes(read_upload(io.BytesIO(data), len(data), chunk_size=16)) == data
+
+@pytest.mark.parametrize("magic", [b"\xff\xd8\xff\xe0", b"\x89PNG\r\n\x1a\n"])
+def test_corrupt_data_behind_valid_magic_is_unsupported(magic):
+    contents = magic + b"\x00garbage" * 64
+    with pytest.raises(UnsupportedImage):
+        decode_image(contents)
+    with pytest.raises(UnsupportedImage):
+        decode_upload(contents, 640)
+
+def test_reduced_decode_reports_the_full_size():
+    data = jpeg(2000, 1400)
+    assert jpeg_size(data) == (2000, 1400)
+    image, shape = decode_upload(data, 640)
+    assert shape == (1400, 2000)
+    assert image.shape[:2] == (700, 1000)
@@ -0,0 +1,24 @@
+import numpy as np
+import pytest
+
+from backend.inference_backend import _ExportedBackend, nms
+
+def test_exported_backends_must_implement_the_runtime_hooks():
+    with pytest.raises(TypeError):
+        _ExportedBackend()
+
+    class Empty(_ExportedBackend):
+        def _load(self):
+            pass
+
+        def _run(self, batch):
+            # No candidate boxes: (N, 4 + classes, anchors)
+            return np.zeros((len(batch), 12, 0), dtype=np.float32)
+
+    assert Empty().predict([]) == []
+
+def test_nms_is_per_class():
+    boxes = np.array([[0, 0, 10, 10], [1, 1, 10, 10], [0, 0, 10, 10]], dtype=np.float32)
+    scores = np.array([0.9, 0.8, 0.7], dtype=np.float32)
+    keep = nms(boxes, scores, 0.5, classes=np.array([0, 0, 1]))
+    assert sorted(np.asarray(keep).tolist()) == [0, 2]
@@ -0,0 +1,174 @@
+import io
+import json
+import os
+import tarfile
+import threading
+import zipfile
+
+from backend.jobs import Job, JobStore, iter_uploads, take
+
+def zip_upload(entries):
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w") as zf:
+        for name, data in entries.items():
+            zf.writestr(name, data)
+    buf.seek(0)
+    return buf
+
+def tar_upload(entries, mode="w:gz"):
+    buf = io.BytesIO()
+    with tarfile.open(fileobj=buf, mode=mode) as tf:
+        for name, data in entries.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            tf.addfile(info, io.BytesIO(data))
+    buf.seek(0)
+    return buf
+
+ENTRIES = {
+    "a.jpg": b"a" * 10,
+    "dir/b.PNG": b"b" * 10,
+    "big.jpg": b"c" * 100,
+    "notes.txt": b"not an image",
+    "dir/.hidden.jpg": b"resource fork"
+}
+
+def test_zip_entries_are_streamed_with_their_archive_name():
+    entries = list(iter_uploads([("roads.zip", zip_upload(ENTRIES))], max_entry_bytes=50))
+    assert entries == [
+        ("roads.zip/a.jpg", b"a" * 10),
+        ("roads.zip/dir/b.PNG", b"b" * 10),
+        ("roads.zip/big.jpg", None)
+    ]
+
+def test_tar_entries_are_streamed_forward_only():
+    class ForwardOnly(io.RawIOBase):
+        def __init__(self, buf):
+            self.buf = buf
+
+        def readable(self):
+            return True
+
+        def readinto(self, b):
+            data = self.buf.read(len(b))
+            b[:len(data)] = data
+            return len(data)
+
+    upload = ForwardOnly(tar_upload(ENTRIES))
+    entries = list(iter_uploads([("roads.tar.gz", upload)], max_entry_bytes=50))
+    assert entries == [
+        ("roads.tar.gz/a.jpg", b"a" * 10),
+        ("roads.tar.gz/dir/b.PNG", b"b" * 10),
+        ("roads.tar.gz/big.jpg", None)
+    ]
+
+def test_plain_files_and_archives_mix():
+    uploads = [
+        ("one.jpg", io.BytesIO(b"1" * 10)),
+        ("roads.tar", tar_upload({"a.jpg": b"a"}, mode="w")),
+        ("huge.jpg", io.BytesIO(b"2" * 51))
+    ]
+    assert list(iter_uploads(uploads, max_entry_bytes=50)) == [
+        ("one.jpg", b"1" * 10),
+        ("roads.tar/a.jpg", b"a"),
+        ("huge.jpg", None)
+    ]
+
+def test_take_stops_at_n():
+    entries = iter(range(5))
+    assert take(entries, 2) == [0, 1]
+    assert take(entries, 10) == [2, 3, 4]
+    assert take(entries, 10) == []
+
+def test_job_results_and_counters_survive_a_reload(tmp_path):
+    store = JobStore(str(tmp_path))
+    job = store.create()
+    assert store.start(job)
+    job.append([{"name": "a.jpg", "num_detections": 0}, {"name": "b.jpg", "error": "unreadable image"}])
+    job.set_status("completed")
+    store.finish(job)
+
+    reloaded = store.get(job.id)
+    assert reloaded is not job
+    assert reloaded.to_dict() == job.to_dict()
+    assert (reloaded.processed, reloaded.failed, reloaded.runs) == (1, 1, 1)
+    assert reloaded.done_names() == {"a.jpg", "b.jpg"}
+    assert [json.loads(line)["name"] for line in reloaded.read_results(offset=1)] == ["b.jpg"]
+
+def test_created_jobs_are_not_tracked_until_started(tmp_path):
+    store = JobStore(str(tmp_path))
+    job = store.create()
+    # A response that never started its stream leaves nothing behind
+    assert store._jobs == {}
+    assert store.get(job.id) is None
+
+    assert store.start(job)
+    assert store.get(job.id) is job
+    store.finish(job)
+    assert store._jobs == {}
+
+def test_finish_leaves_a_cut_off_job_resumable(tmp_path):
+    store = JobStore(str(tmp_path))
+    job = store.create()
+    store.start(job)
+    job.append([{"name": "a.jpg", "num_detections": 0}])
+    store.finish(job)
+
+    resumed = store.get(job.id)
+    assert resumed.status == "interrupted"
+    assert store.start(resumed)
+    assert resumed.runs == 2
+    assert resumed.done_names() == {"a.jpg"}
+
+def test_a_running_job_cannot_be_started_twice(tmp_path):
+    store = JobStore(str(tmp_path))
+    job = store.create()
+    store.start(job)
+
+    assert not store.start(store.get(job.id))
+    # Another worker only sees the file: running, with a live pid
+    assert not JobStore(str(tmp_path)).start(Job(str(tmp_path), job.id))
+
+def test_concurrent_resumes_start_the_job_once(tmp_path):
+    store = JobStore(str(tmp_path))
+    job = store.create()
+    store.start(job)
+    store.finish(job)
+
+    barrier = threading.Barrier(8)
+    started = []
+
+    def resume():
+        candidate = store.get(job.id)
+        barrier.wait()
+        started.append(store.start(candidate))
+
+    threads = [threading.Thread(target=resume) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert started.count(True) == 1
+    assert store.get(job.id).runs == 2
+
+def test_running_job_of_a_dead_worker_reads_as_interrupted(tmp_path):
+    store = JobStore(str(tmp_path))
+    job = store.create()
+    store.start(job)
+    with open(job.meta_path) as f:
+        meta = json.load(f)
+    meta["pid"] = 2 ** 22 + 1
+    with open(job.meta_path, "w") as f:
+        json.dump(meta, f)
+
+    other = JobStore(str(tmp_path))
+    assert other.get(job.id).status == "interrupted"
+    assert other.start(other.get(job.id))
+
+def test_invalid_job_ids_are_rejected(tmp_path):
+    store = JobStore(str(tmp_path))
+    assert store.get("../etc/passwd") is None
+    assert store.get(None) is None
+    assert not os.path.exists(os.path.join(str(tmp_path), "0" * 32 + ".json"))
+    assert store.get("0" * 32) is None
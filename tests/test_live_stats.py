@@ -0,0 +1,34 @@
+import json
+
+import numpy as np
+
+from backend.live_stats import LiveStatsStore, RingBuffer
+
+def test_ring_buffer_tracks_the_last_capacity_values():
+    rng = np.random.default_rng(0)
+    ring = RingBuffer(50)
+    history = []
+    for size in (3, 20, 40, 1, 49, 7, 120, 5):
+        values = rng.uniform(0, 1, size)
+        ring.extend(values)
+        history.extend(values.tolist())
+
+        window = np.asarray(history[-50:])
+        assert len(ring) == len(window)
+        np.testing.assert_allclose(ring.values(), window)
+        assert abs(ring.mean() - window.mean()) < 1e-9
+        assert abs(ring.variance() - window.var()) < 1e-9
+
+def test_empty_ring_buffer():
+    ring = RingBuffer(4)
+    assert len(ring) == 0
+    assert ring.mean() == 0.0 and ring.variance() == 0.0
+    ring.extend([1.0, 2.0])
+    ring.clear()
+    assert len(ring) == 0 and ring.values().size == 0
+
+def test_store_restarts_from_a_file_in_legacy_area_units(tmp_path):
+    path = tmp_path / "live_stats.json"
+    path.write_text(json.dumps({"total_images": 3, "total_detections": 2, "confidences": [0.5, 0.6], "areas": [1.5, 2.0]}))
+    store = LiveStatsStore(str(path))
+    assert store.drift_summary().total_images == 0
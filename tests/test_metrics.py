@@ -0,0 +1,149 @@
+import asyncio
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from backend.metrics import (
+    CallbackCounter, Counter, Gauge, Histogram, HistogramVec, Registry, RequestMetrics, StageMetrics
+)
+
+class Shed(Exception):
+    pass
+
+def test_render_writes_help_and_type_lines():
+    registry = Registry(prefix="civisense_")
+    errors = registry.register("errors_total", "Failures by stage", Counter(["stage"]))
+    registry.register("ready", "1 once warm", Gauge(fn=lambda: True))
+    registry.register("renders_total", "Images drawn", CallbackCounter(fn=lambda: 7))
+    errors.inc("decode")
+    errors.inc("decode", amount=2)
+
+    assert registry.render().splitlines() == [
+        "# HELP civisense_errors_total Failures by stage",
+        "# TYPE civisense_errors_total counter",
+        'civisense_errors_total{stage="decode"} 3',
+        "# HELP civisense_ready 1 once warm",
+        "# TYPE civisense_ready gauge",
+        "civisense_ready 1",
+        "# HELP civisense_renders_total Images drawn",
+        "# TYPE civisense_renders_total counter",
+        "civisense_renders_total 7"
+    ]
+
+def test_histogram_buckets_are_cumulative_and_end_at_inf():
+    registry = Registry()
+    latency = registry.register("latency_ms", "Latency", HistogramVec([10, 100], ["route"]))
+    for value in (5, 10, 50, 500):
+        latency.observe("/predict", value=value)
+
+    assert registry.render().splitlines() == [
+        "# HELP latency_ms Latency",
+        "# TYPE latency_ms histogram",
+        'latency_ms_bucket{route="/predict",le="10"} 2',
+        'latency_ms_bucket{route="/predict",le="100"} 3',
+        'latency_ms_bucket{route="/predict",le="+Inf"} 4',
+        'latency_ms_sum{route="/predict"} 565',
+        'latency_ms_count{route="/predict"} 4'
+    ]
+
+def test_bare_histogram_renders_without_labels():
+    registry = Registry()
+    histogram = Histogram([1, 2.5])
+    registry.register("batch_size", "Images per pass", histogram)
+    histogram.observe(2)
+
+    lines = registry.render().splitlines()
+    assert 'batch_size_bucket{le="2.5"} 1' in lines
+    assert 'batch_size_bucket{le="+Inf"} 1' in lines
+    assert "batch_size_sum 2" in lines
+
+def test_label_values_are_escaped():
+    registry = Registry()
+    counter = registry.register("odd_total", "Odd labels", Counter(["value"]))
+    counter.inc('a "quoted"\\path\nnext')
+
+    assert 'odd_total{value="a \\"quoted\\"\\\\path\\nnext"} 1' in registry.render()
+
+def test_values_are_formatted_for_prometheus():
+    registry = Registry()
+    registry.register("ratio", "A float", Gauge(fn=lambda: 0.25))
+    registry.register("unbounded", "An infinity", Gauge(fn=lambda: float("inf")))
+
+    lines = registry.render().splitlines()
+    assert "ratio 0.25" in lines
+    assert "unbounded +Inf" in lines
+
+def test_broken_source_does_not_break_the_scrape():
+    registry = Registry()
+    registry.register("broken", "Fails", Gauge(fn=lambda: 1 / 0))
+    registry.register("fine", "Works", Gauge(fn=lambda: 1))
+
+    text = registry.render()
+    assert "# broken unavailable: division by zero" in text
+    assert "# TYPE broken" not in text
+    assert "fine 1" in text.splitlines()
+
+@pytest.fixture
+def metered_client():
+    requests = Counter(["method", "route", "status"])
+    latency = HistogramVec([10, 100], ["route"])
+    in_flight = Gauge()
+
+    app = FastAPI()
+
+    @app.get("/jobs/{job_id}")
+    def get_job(job_id: str):
+        return {"job_id": job_id}
+
+    app.add_middleware(RequestMetrics, requests=requests, latency=latency, in_flight=in_flight)
+    return TestClient(app), requests, latency, in_flight
+
+def test_requests_are_labelled_by_route_template(metered_client):
+    client, requests, latency, in_flight = metered_client
+    client.get("/jobs/a")
+    client.get("/jobs/b")
+
+    assert requests.value("GET", "/jobs/{job_id}", "200") == 2
+    assert latency.labels("/jobs/{job_id}").snapshot()["count"] == 2
+    assert in_flight.value() == 0
+
+def test_unmatched_paths_count_as_other(metered_client):
+    client, requests, latency, in_flight = metered_client
+    client.get("/no/such/path")
+    client.get("/another/one")
+
+    assert requests.value("GET", "other", "404") == 2
+    assert latency.snapshot().keys() == {"other"}
+
+def test_stage_errors_are_counted_unless_expected():
+    stages = StageMetrics([10, 100], expected=(Shed,))
+
+    with stages.time("decode"):
+        pass
+    with pytest.raises(ValueError):
+        with stages.time("decode"):
+            raise ValueError("corrupt")
+    with pytest.raises(Shed):
+        with stages.time("admission"):
+            raise Shed()
+
+    assert stages.errors.value("decode") == 1
+    assert stages.errors.value("admission") == 0
+    # Expected failures still count towards the stage's timing
+    assert stages.durations.labels("decode").snapshot()["count"] == 2
+    assert stages.durations.labels("admission").snapshot()["count"] == 1
+
+def test_cancelled_stages_are_not_errors():
+    stages = StageMetrics([10, 100])
+
+    async def cancelled():
+        task = asyncio.ensure_future(stages.timed("inference", asyncio.sleep(10)))
+        await asyncio.sleep(0)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(cancelled())
+    assert stages.errors.value("inference") == 0
+    assert stages.snapshot()["duration_ms"]["inference"]["count"] == 1
@@ -0,0 +1,60 @@
+from datetime import datetime
+
+import pytest
+
+mongomock = pytest.importorskip("mongomock")
+
+import mongomock.collection
+
+from benchmarks.common import standin_bulk_write
+from backend.db import PREDICTIONS, MongoStore, batch_id, rollup_increments
+
+@pytest.fixture
+def store(monkeypatch):
+    monkeypatch.setattr(mongomock.collection.Collection, "bulk_write", standin_bulk_write)
+    store = MongoStore("mongodb://localhost", "civisense_test")
+    store._db = mongomock.MongoClient()["civisense_test"]
+    return store
+
+def predictions(n):
+    return [
+        (PREDICTIONS, {
+            "image_name": f"{i}.jpg",
+            "timestamp": datetime(2026, 3, 1, i % 24),
+            "detections": [{"class": "pothole", "confidence": 0.9, "severity": 0.8, "risk_level": "HIGH"}]
+        })
+        for i in range(n)
+    ]
+
+def test_retried_batch_is_counted_once(store):
+    batch = predictions(10)
+    docs = [doc for _, doc in batch]
+    store.write(list(batch))
+    # The acknowledgement was lost: the writer retries the same documents
+    store.write(list(batch))
+
+    summary = store.analytics_summary()
+    assert summary["total_images_processed"] == 10
+    assert summary["high_risk_detections"] == 10
+    assert store.predictions_col.count_documents({}) == 10
+    assert store.alerts_col.count_documents({}) == 10
+    assert batch_id(docs) == batch_id([doc for _, doc in batch])
+
+def test_partially_applied_rollup_is_completed_not_doubled(store):
+    batch = predictions(5)
+    docs = [doc for _, doc in batch]
+    store._insert(PREDICTIONS, docs)
+    # Only the "total" bucket made it before the failure
+    increments = rollup_increments(docs)
+    store.apply_rollup({"total": increments["total"]}, batch_id(docs))
+
+    store.write(list(batch))
+    assert store.analytics_summary()["total_images_processed"] == 5
+    assert sum(b["images"] for b in store.analytics_timeseries("day")) == 5
+    assert sum(b["images"] for b in store.analytics_timeseries("hour")) == 5
+
+def test_rebuild_matches_incremental_counters(store):
+    store.write(predictions(30))
+    before = store.analytics_summary()
+    store.rebuild_analytics_counters()
+    assert store.analytics_summary() == before
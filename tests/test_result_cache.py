@@ -0,0 +1,35 @@
+import os
+
+from backend.result_cache import ResultCache
+
+def write(path, data, mtime):
+    path.write_bytes(data)
+    os.utime(path, (mtime, mtime))
+    return str(path)
+
+def test_key_separates_variants_and_follows_each_model_artifact(tmp_path):
+    model = write(tmp_path / "model.pt", b"fp32", 1000)
+    int8 = write(tmp_path / "model.int8.onnx", b"int8-a", 1000)
+    cache = ResultCache(model, {"conf": 0.25})
+
+    full = cache.key(b"image")
+    assert cache.key(b"image", "|reduced") != full
+    degraded = cache.key(b"image", "|int8", int8)
+    assert degraded != cache.key(b"image", "|int8")
+
+    # Re-quantized int8 artifact: its old results must not be served
+    write(tmp_path / "model.int8.onnx", b"int8-b", 2000)
+    assert cache.key(b"image", "|int8", int8) != degraded
+    assert cache.key(b"image") == full
+
+def test_replacing_the_model_clears_the_memory_tier(tmp_path):
+    model = write(tmp_path / "model.pt", b"v1", 1000)
+    cache = ResultCache(model, {})
+    key = cache.key(b"image")
+    cache.put(key, {"detections": []})
+    assert cache.get(key) == {"detections": []}
+
+    write(tmp_path / "model.pt", b"v2", 2000)
+    assert cache.key(b"image") != key
+    assert cache.get(key) is None
+    assert cache.invalidations == 1
@@ -0,0 +1,67 @@
+import numpy as np
+
+from backend.config import CIVISENSE_CLASSES
+from backend.inference_backend import Detections, empty_detections
+from backend.risk_engine import CLASS_WEIGHTS, compute_severity, score_results, severity_arrays
+
+def random_detections(rng, n, shape):
+    height, width = shape
+    x1 = rng.uniform(0, width * 0.4, n)
+    y1 = rng.uniform(0, height * 0.4, n)
+    # Sides up to 60% of the frame, so every risk level shows up
+    x2 = x1 + rng.uniform(1, width * 0.6, n)
+    y2 = y1 + rng.uniform(1, height * 0.6, n)
+    return Detections(
+        np.stack([x1, y1, x2, y2], axis=1).astype(np.float32),
+        rng.uniform(0.25, 1.0, n).astype(np.float32),
+        # Every class, round robin
+        (np.arange(n) % len(CIVISENSE_CLASSES)).astype(np.int64)
+    )
+
+def per_box(result, shape):
+    return [
+        compute_severity(float(conf), [float(v) for v in box], CIVISENSE_CLASSES[int(cls)], shape)
+        for box, conf, cls in zip(result.xyxy, result.conf, result.cls)
+    ]
+
+def test_every_class_has_a_weight():
+    assert set(CIVISENSE_CLASSES.values()) == set(CLASS_WEIGHTS)
+
+def test_batch_scoring_matches_per_box_scoring_across_image_sizes():
+    rng = np.random.default_rng(0)
+    shapes = [(640, 640), (1080, 1920), (375, 1075), (480, 640), (2000, 3000)]
+    results = [random_detections(rng, 40, shape) for shape in shapes]
+    # An image with nothing detected in the middle of the batch
+    results.insert(2, empty_detections())
+    shapes.insert(2, (720, 1280))
+
+    scored = score_results(results, shapes)
+    assert len(scored) == len(results)
+    for (severity, levels), result, shape in zip(scored, results, shapes):
+        expected = per_box(result, shape)
+        assert len(severity) == len(levels) == len(expected)
+        np.testing.assert_allclose(severity, [s for s, _ in expected], atol=1e-4)
+        assert list(levels) == [level for _, level in expected]
+
+    levels = {level for _, lv in scored for level in lv}
+    assert levels == {"LOW", "MEDIUM", "HIGH"}
+
+def test_level_boundaries_match():
+    # pothole, confidence 1: severity is exactly the area fraction
+    for area, level in ((499, "LOW"), (500, "MEDIUM"), (1500, "HIGH")):
+        box = [0.0, 0.0, float(area) / 20, 20.0]
+        assert compute_severity(1.0, box, "pothole", (100, 100))[1] == level
+        assert severity_arrays([box], [1.0], [7], (100, 100))[1][0] == level
+
+def test_empty_inputs():
+    assert score_results([], []) == []
+    severity, levels = score_results([empty_detections()], [(640, 640)])[0]
+    assert severity.size == 0 and levels.size == 0
+    severity, levels = severity_arrays(np.zeros((0, 4)), [], [])
+    assert severity.size == 0 and levels.size == 0
+
+def test_unknown_class_ids_use_the_default_weight():
+    box = [0.0, 0.0, 320.0, 320.0]
+    severity, _ = severity_arrays([box, box], [1.0, 1.0], [-1, 99])
+    expected, _ = compute_severity(1.0, box, "unknown")
+    np.testing.assert_allclose(severity, [expected, expected])
@@ -0,0 +1,73 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from backend.sqlite_store import SQLiteStore
+
+T0 = datetime(2026, 3, 1)
+
+def prediction(i, levels):
+    return ("predictions", {
+        "image_name": f"{i}.jpg",
+        "timestamp": T0 + timedelta(minutes=30 * i),
+        "detections": [
+            {"class": "pothole" if j % 2 else "crack", "confidence": 0.5, "severity": 0.7,
+             "risk_level": level, "bbox": [0, 0, 10, 10]}
+            for j, level in enumerate(levels)
+        ]
+    })
+
+@pytest.fixture
+def store(tmp_path):
+    store = SQLiteStore(str(tmp_path / "civisense.db"))
+    batch = [prediction(i, ["HIGH", "LOW"] if i % 3 else ["HIGH"]) for i in range(100)]
+    store.write(batch)
+    assert batch == []
+    return store
+
+def test_summary_counts_every_write(store):
+    summary = store.analytics_summary()
+    assert summary["total_images_processed"] == 100
+    assert summary["high_risk_detections"] == 100
+    assert {row["_id"]: row["count"] for row in summary["damage_distribution"]} == {"crack": 100, "pothole": 66}
+
+def test_timeseries_buckets_and_bounds(store):
+    days = store.analytics_timeseries("day")
+    assert [b["bucket"] for b in days] == ["2026-03-01", "2026-03-02", "2026-03-03"]
+    assert sum(b["images"] for b in days) == 100
+
+    hours = store.analytics_timeseries("hour", T0 + timedelta(hours=2), T0 + timedelta(hours=4))
+    assert [b["bucket"] for b in hours] == ["2026-03-01T02", "2026-03-01T03", "2026-03-01T04"]
+    assert all(b["images"] == 2 for b in hours)
+
+def test_alert_pages_cover_everything_once_newest_first(store):
+    seen, after = [], None
+    while True:
+        page = store.high_risk_alerts(7, after)
+        seen += page["alerts"]
+        after = page["next_cursor"]
+        if after is None:
+            break
+
+    assert len(seen) == 100
+    assert len({a["image_name"] for a in seen}) == 100
+    timestamps = [a["timestamp"] for a in seen]
+    assert timestamps == sorted(timestamps, reverse=True)
+
+def test_alerts_respect_the_time_window(store):
+    page = store.high_risk_alerts(50, None, T0, T0 + timedelta(hours=2))
+    assert [a["image_name"] for a in page["alerts"]] == ["4.jpg", "3.jpg", "2.jpg", "1.jpg", "0.jpg"]
+    assert page["next_cursor"] is None
+
+def test_rebuild_matches_incremental_counters(store):
+    before = store.analytics_summary()
+    store.rebuild_analytics_counters()
+    store.rebuild_alerts()
+    assert store.analytics_summary() == before
+    assert len(store.high_risk_alerts(200)["alerts"]) == 100
+
+def test_failed_batch_is_not_partially_applied(store):
+    bad = [prediction(200, ["HIGH"]), ("unknown", {"timestamp": T0})]
+    with pytest.raises(ValueError):
+        store.write(bad)
+    assert store.analytics_summary()["total_images_processed"] == 100
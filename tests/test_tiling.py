@@ -0,0 +1,36 @@
+import numpy as np
+
+from backend.inference_backend import Detections, empty_detections
+from backend.tiling import make_tiles, merge_tiles, tile_windows
+
+def detections(boxes, conf, cls):
+    return Detections(
+        np.asarray(boxes, dtype=np.float32).reshape(-1, 4),
+        np.asarray(conf, dtype=np.float32),
+        np.asarray(cls, dtype=np.int64)
+    )
+
+def test_tiles_cover_the_frame_flush_with_the_edges():
+    windows = tile_windows(1000, 1500, 640, 0.2)
+    assert max(x1 for _, _, x1, _ in windows) == 1500
+    assert max(y1 for _, _, _, y1 in windows) == 1000
+    assert all(x1 - x0 == 640 and y1 - y0 == 640 for x0, y0, x1, y1 in windows)
+
+def test_make_tiles_adds_the_full_frame():
+    image = np.zeros((1000, 1500, 3), dtype=np.uint8)
+    crops, offsets = make_tiles(image, 640, 0.2, include_full=True)
+    assert crops[-1] is image and offsets[-1] == (0, 0)
+    assert len(crops) == len(tile_windows(1000, 1500, 640, 0.2)) + 1
+
+def test_merge_shifts_to_frame_coordinates_and_dedups_overlap():
+    # The same object seen by two overlapping tiles, plus one elsewhere
+    left = detections([[500, 100, 600, 200]], [0.9], [1])
+    right = detections([[100, 100, 200, 200], [300, 300, 350, 350]], [0.8, 0.7], [1, 2])
+    merged = merge_tiles([left, right, empty_detections()], [(0, 0), (400, 0), (0, 0)], 0.5)
+
+    assert len(merged.conf) == 2
+    np.testing.assert_allclose(merged.xyxy[0], [500, 100, 600, 200])
+    np.testing.assert_allclose(merged.xyxy[1], [700, 300, 750, 350])
+
+def test_merge_of_nothing_is_empty():
+    assert len(merge_tiles([empty_detections()], [(0, 0)], 0.5).conf) == 0
@@ -0,0 +1,86 @@
+import cv2
+import numpy as np
+import pytest
+
+from backend.video import FrameReader, IoUTracker
+
+def detection(box, confidence=0.8, severity=0.5, cls="pothole"):
+    return {"class": cls, "confidence": confidence, "severity": severity, "bbox": list(box)}
+
+def run_tracker(tracker, samples):
+    ended = []
+    for frame, t, detections in samples:
+        ended += tracker.update(frame, t, detections)
+    return ended + tracker.finish()
+
+def test_stationary_box_at_the_slowest_sample_rate_is_one_track():
+    # Samples 2 s apart (VIDEO_MIN_FPS=0.5) are further apart than max_age_s
+    tracker = IoUTracker(0.3, max_age_s=1.0, max_misses=2)
+    samples = [(i * 60, i * 2.0, [detection((100, 100, 200, 200))]) for i in range(5)]
+
+    tracks = [tr for tr in run_tracker(tracker, samples) if tr.hits >= 2]
+    assert len(tracks) == 1
+    assert tracks[0].hits == 5
+    assert tracks[0].to_dict()["last_time_s"] == 8.0
+
+def test_track_ends_after_max_age_and_max_misses():
+    tracker = IoUTracker(0.3, max_age_s=1.0, max_misses=2)
+    box = (100, 100, 200, 200)
+    assert tracker.update(0, 0.0, [detection(box)]) == []
+    assert tracker.update(1, 0.2, []) == []
+    # Two misses, but only 0.4 s unseen
+    assert tracker.update(2, 0.4, []) == []
+    ended = tracker.update(3, 1.5, [detection(box)])
+    assert [tr.id for tr in ended] == [1]
+    assert tracker.active[0].id == 2
+
+def test_best_detection_and_class_separation():
+    tracker = IoUTracker(0.3)
+    box = (100, 100, 200, 200)
+    first = [detection(box, severity=0.2), detection(box, cls="crack")]
+    second = [detection(box, severity=0.9), detection(box, cls="crack")]
+    tracks = run_tracker(tracker, [(0, 0.0, first), (1, 0.2, second)])
+
+    assert len(tracks) == 2
+    pothole = next(tr for tr in tracks if tr.best["class"] == "pothole")
+    assert pothole.best["severity"] == 0.9
+    assert first[0]["track_id"] == second[0]["track_id"] == pothole.id
+
+@pytest.fixture
+def static_video(tmp_path):
+    path = str(tmp_path / "static.avi")
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), 10, (128, 72))
+    if not writer.isOpened():
+        pytest.skip("no MJPG writer in this OpenCV build")
+    for _ in range(40):
+        writer.write(np.full((72, 128, 3), 100, dtype=np.uint8))
+    writer.release()
+    return path
+
+def frames(reader):
+    out = []
+    while True:
+        item = reader.get(timeout=5)
+        if item is None:
+            return out
+        out.append(item[0])
+
+def test_unchanging_scene_is_sampled_at_min_fps(static_video):
+    reader = FrameReader(static_video, max_fps=5.0, min_fps=1.0, queue_size=4).start()
+    try:
+        assert frames(reader) == [0, 10, 20, 30]
+    finally:
+        reader.stop()
+    assert reader.stats()["frames_read"] == 40
+
+def test_boost_takes_effect_on_the_next_frame(static_video):
+    # Queue deeper than the clip: the reader has decoded everything ahead
+    reader = FrameReader(static_video, max_fps=5.0, min_fps=1.0, queue_size=64).start()
+    try:
+        assert reader.get(timeout=5)[0] == 0
+        reader.boost = True
+        assert reader.get(timeout=5)[0] == 2
+        reader.boost = False
+        assert frames(reader) == [12, 22, 32]
+    finally:
+        reader.stop()
@@ -0,0 +1,95 @@
+import threading
+
+import pytest
+
+from backend.writer import BufferedWriter
+
+class Sink:
+    """flush_fn that records batches; fails the first `failures` calls."""
+
+    def __init__(self, failures=0, partial=0):
+        self.batches = []
+        self.calls = 0
+        self.failures = failures
+        self.partial = partial
+
+    def __call__(self, batch):
+        self.calls += 1
+        if self.calls <= self.failures:
+            # Fully write the first `partial` items, then fail
+            written = batch[:self.partial]
+            self.batches.append([doc for _, doc in written])
+            del batch[:self.partial]
+            raise RuntimeError("sink down")
+        self.batches.append([doc for _, doc in batch])
+
+    @property
+    def docs(self):
+        return [doc for batch in self.batches for doc in batch]
+
+def test_unknown_policy_is_rejected():
+    with pytest.raises(ValueError):
+        BufferedWriter(Sink(), policy="drop_everything")
+
+def test_drop_newest_refuses_when_full():
+    sink = Sink()
+    writer = BufferedWriter(sink, max_queue=2, policy="drop_newest")
+    assert [writer.submit("c", i) for i in range(3)] == [True, True, False]
+    writer.flush()
+    assert sink.docs == [0, 1]
+    assert writer.stats()["dropped"] == 1
+
+def test_drop_oldest_evicts_to_make_room():
+    sink = Sink()
+    writer = BufferedWriter(sink, max_queue=2, policy="drop_oldest")
+    assert all(writer.submit("c", i) for i in range(3))
+    writer.flush()
+    assert sink.docs == [1, 2]
+    assert writer.stats()["dropped"] == 1
+
+def test_block_gives_up_after_the_timeout():
+    writer = BufferedWriter(Sink(), max_queue=1, policy="block", block_timeout=0.05)
+    assert writer.submit("c", 0)
+    assert not writer.submit("c", 1)
+    assert writer.stats()["dropped"] == 1
+
+def test_block_waits_for_room():
+    sink = Sink()
+    writer = BufferedWriter(sink, max_queue=1, policy="block", block_timeout=2.0)
+    writer.submit("c", 0)
+    threading.Timer(0.05, writer.flush).start()
+    assert writer.submit("c", 1)
+    writer.flush()
+    assert sink.docs == [0, 1]
+
+def test_failed_batch_is_retried():
+    sink = Sink(failures=1)
+    writer = BufferedWriter(sink, retries=2)
+    for i in range(3):
+        writer.submit("c", i)
+    writer.flush()
+    assert sink.calls == 2
+    assert sink.docs == [0, 1, 2]
+    stats = writer.stats()
+    assert (stats["flushed"], stats["failed"], stats["batches"]) == (3, 0, 1)
+
+def test_retry_only_repeats_what_flush_fn_left_in_the_list():
+    sink = Sink(failures=3, partial=1)
+    writer = BufferedWriter(sink, retries=2)
+    for i in range(5):
+        writer.submit("c", i)
+    writer.flush()
+    # Each attempt writes one document and fails; the last two are dropped
+    assert sink.docs == [0, 1, 2]
+    stats = writer.stats()
+    assert (stats["flushed"], stats["failed"]) == (3, 2)
+
+def test_stop_drains_the_queue():
+    sink = Sink()
+    writer = BufferedWriter(sink, batch_size=100, flush_interval=60.0)
+    writer.start()
+    for i in range(10):
+        writer.submit("c", i)
+    writer.stop()
+    assert sorted(sink.docs) == list(range(10))
+    assert writer.stats()["pending"] == 0